@@ -36,6 +36,43 @@ MEDIA_URL = "charts_app/media/charts_app/"
 MEDIA_ROOT = BASE_DIR / "charts_app/media/charts_app/"
 
 
+# Number of worker processes drawing charts in parallel;
+# 0 draws charts in the process handling the request
+CHARTS_RENDER_WORKERS = int(os.environ.get("CHARTS_RENDER_WORKERS", 0))
+
+# Charts drawn by the server ("server") or by the browser ("client")
+CHARTS_RENDER_MODE = os.environ.get("CHARTS_RENDER_MODE", "server")
+
+# Number of threads rendering charts in background (async mode)
+CHARTS_JOB_WORKERS = int(os.environ.get("CHARTS_JOB_WORKERS", 2))
+
+# Charts libraries (matplotlib, pandas...) imported when the server starts,
+# e.g. in the master process of gunicorn --preload, so its workers share
+# them; otherwise they're imported on the first chart
+CHARTS_PRELOAD = os.environ.get("CHARTS_PRELOAD", "0") != "0"
+
+# Charts are drawn without a display, on matplotlib's Agg (and SVG)
+# canvases; chosen before matplotlib is imported, in render workers too
+os.environ.setdefault("MPLBACKEND", "agg")
+
+# Timings of chart stages, cache hits and upstream latencies are exported
+# at /metrics (CHARTS_METRICS=0 turns them off) and logged when
+# CHARTS_METRICS_LOG_LEVEL is DEBUG
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "charts_app.metrics": {
+            "handlers": ["console"],
+            "level": os.environ.get("CHARTS_METRICS_LOG_LEVEL", "WARNING"),
+        },
+        # charts failed in background: details stay in the log
+        "charts_app.jobs": {"handlers": ["console"], "level": "ERROR"},
+    },
+}
+
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -90,6 +127,25 @@ DATABASES = {
 }
 
 
+# Cache shared by all workers: scraped seasons, weather and rendered charts.
+# Point CACHE_BACKEND/CACHE_LOCATION to e.g. redis or memcached to share it
+# between servers.
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"
+        ),
+        "LOCATION": os.environ.get(
+            "CACHE_LOCATION", str(BASE_DIR / "charts_app/utils/cache/django")
+        ),
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": 1000},
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -0,0 +1,68 @@
+# Render time of a grid of seasons (plot_chart with compare_to) against a
+# chart per season (plot_chart called for each), offline, for grids of 2 to
+# 9 seasons. Both are run once before timing, so seasons are memoized.
+#
+# python -m benchmarks.bench_comparison [--last YEAR] [--repeat N] [--format FORMAT]
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from charts_app.utils.MotoGP_utils import EXPORT_FORMATS, plot_chart
+
+SEASONS = (2, 5, 9)
+
+
+def best_time(render, repeat: int) -> float:
+    render()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--last", type=int, default=2023)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--format", default="svg", choices=list(EXPORT_FORMATS))
+    args = parser.parse_args()
+
+    print(f"{'seasons':>7} {'grid ms':>8} {'charts ms':>10} {'ratio':>6}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "chart"
+        for seasons in SEASONS:
+            first = args.last - seasons + 1
+
+            def grid():
+                plot_chart(
+                    first,
+                    False,
+                    [1, 5],
+                    output_path=path,
+                    output_format=args.format,
+                    compare_to=args.last,
+                )
+
+            def charts():
+                for year in range(first, args.last + 1):
+                    plot_chart(
+                        year,
+                        False,
+                        [1, 5],
+                        output_path=path,
+                        output_format=args.format,
+                    )
+
+            grid_time = best_time(grid, args.repeat)
+            charts_time = best_time(charts, args.repeat)
+            print(
+                f"{seasons:>7} {grid_time * 1000:>8.0f} {charts_time * 1000:>10.0f} "
+                f"{grid_time / charts_time:>6.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# File size and render time of a chart in every export format (and
+# resolution of raster formats), for the largest chart: 20 riders with
+# history.
+#
+# python -m benchmarks.bench_export_formats [--year YEAR] [--riders N] [--repeat N]
+import argparse
+import gzip
+import tempfile
+import time
+from pathlib import Path
+
+from charts_app.utils.formats import RASTER_DPIS
+from charts_app.utils.MotoGP_utils import EXPORT_FORMATS, plot_chart
+
+
+def variants() -> list:
+    # (format, dpi) of every file the site can serve
+    result = []
+    for output_format, export in EXPORT_FORMATS.items():
+        if export["extension"] == "svg":
+            result.append((output_format, 72))
+        else:
+            result += [(output_format, dpi) for dpi in RASTER_DPIS]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--year", type=int, default=2019)
+    parser.add_argument("--riders", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # data is gathered (and memoized) before timing
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        plot_chart(args.year, True, [1, args.riders], output_path=Path(tmp_dir) / "x")
+
+        print(f"{'format':>8} {'dpi':>4} {'kB':>7} {'gzip kB':>8} {'render ms':>10}")
+        for output_format, dpi in variants():
+            path = Path(tmp_dir) / f"{output_format}-{dpi}"
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                plot_chart(
+                    args.year,
+                    True,
+                    [1, args.riders],
+                    output_path=path,
+                    output_format=output_format,
+                    dpi=dpi,
+                )
+                times.append(time.perf_counter() - start)
+
+            content = path.read_bytes()
+            print(
+                f"{output_format:>8} {dpi:>4} {len(content) / 1024:>7.0f} "
+                f"{len(gzip.compress(content)) / 1024:>8.0f} {min(times) * 1000:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
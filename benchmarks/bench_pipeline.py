@@ -0,0 +1,197 @@
+# Stages of plot_chart for every cached season, offline: Cleaning of the
+# scraped table, history() of previous seasons, weather parsing and
+# Plotting (all riders, with history). For each stage: best wall time,
+# peak memory and memory blocks still allocated after it (leaks, retained
+# figures). Totals of all seasons can be saved as a baseline and compared
+# with one, failing (exit code 1) when a stage got slower or bigger than
+# allowed.
+#
+# python -m benchmarks.bench_pipeline [--repeat N] [--from YEAR] [--to YEAR]
+#                                     [--save FILE] [--compare FILE]
+# python -m benchmarks.bench_pipeline --profile plotting [--year YEAR]
+import argparse
+import cProfile
+import gc
+import json
+import pstats
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.fixtures import CACHE_DIR, cached_seasons, raw_riders
+from charts_app.utils.MotoGP_utils import (
+    MIN_YEAR,
+    Cleaning,
+    GatheringReasultsFrom,
+    Plotting,
+    weather_series,
+)
+from charts_app.utils.weather_table import normalize_weather
+
+STAGES = ("cleaning", "history", "weather", "plotting")
+
+# allowed growth against baseline; times are machine specific, so the
+# baseline has to be saved on the machine it's compared on
+MAX_SLOWDOWN = 1.5
+MAX_MEMORY_GROWTH = 1.25
+MIN_SLOWDOWN = 0.005  # seconds; smaller differences are noise
+
+
+def stage_runs(year: int, output_path: Path) -> dict:
+    # {stage: function running it once} of a season
+    season = GatheringReasultsFrom(year)
+    raw = raw_riders(year)
+    standings = Cleaning(raw.copy())
+    weather_file = CACHE_DIR / f"{year}-MotoGP-weather.json"
+    weather = normalize_weather(json.loads(weather_file.read_text()))
+
+    runs = {
+        "cleaning": lambda: Cleaning(raw.copy()),
+        "weather": lambda: weather_series(
+            normalize_weather(json.loads(weather_file.read_text()))
+        ),
+    }
+    if year >= MIN_YEAR + 3:
+        history = season.history(standings)  # previous seasons memoized
+        runs["history"] = lambda: season.history(standings)
+        runs["plotting"] = lambda: Plotting(
+            standings.copy(),
+            weather,
+            year,
+            [1, min(20, len(standings))],
+            history.copy(),
+            output_path=output_path,
+        )
+    return runs
+
+
+def measure(run, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    run()
+    gc.collect()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "time": min(times),
+        "peak_bytes": peak,
+        "blocks": max(0, sys.getallocatedblocks() - blocks),
+    }
+
+
+def run_suite(years, repeat: int) -> dict:
+    # {stage: {"seasons": {year: measures}, "total": summed measures}}
+    results = {stage: {"seasons": {}} for stage in STAGES}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for year in years:
+            runs = stage_runs(year, Path(tmp_dir) / "plot.svg")
+            for stage, run in runs.items():
+                results[stage]["seasons"][year] = measure(run, repeat)
+
+    for stage in STAGES:
+        seasons = results[stage]["seasons"].values()
+        results[stage]["total"] = {
+            "time": sum(s["time"] for s in seasons),
+            "peak_bytes": max((s["peak_bytes"] for s in seasons), default=0),
+            "blocks": sum(s["blocks"] for s in seasons),
+        }
+    return results
+
+
+def regressions(results: dict, baseline: dict) -> list:
+    # descriptions of stages slower or bigger than allowed, over seasons
+    # measured in both
+    found = []
+    for stage in STAGES:
+        now = {str(year): m for year, m in results[stage]["seasons"].items()}
+        before = baseline.get(stage, {}).get("seasons", {})
+        years = now.keys() & before.keys()
+        if not years:
+            continue
+
+        time_now = sum(now[year]["time"] for year in years)
+        time_before = sum(before[year]["time"] for year in years)
+        if (
+            time_now > time_before * MAX_SLOWDOWN
+            and time_now - time_before > MIN_SLOWDOWN
+        ):
+            found.append(
+                f"{stage}: {time_now * 1000:.0f} ms, was {time_before * 1000:.0f} ms"
+            )
+
+        peak_now = max(now[year]["peak_bytes"] for year in years)
+        peak_before = max(before[year]["peak_bytes"] for year in years)
+        if peak_now > peak_before * MAX_MEMORY_GROWTH:
+            found.append(
+                f"{stage}: peak {peak_now / 1024:.0f} kB, "
+                f"was {peak_before / 1024:.0f} kB"
+            )
+    return found
+
+
+def report(results: dict):
+    print(f"{'stage':>9} {'year':>5} {'ms':>8} {'peak kB':>8} {'blocks':>7}")
+    for stage in STAGES:
+        rows = [*results[stage]["seasons"].items(), ("all", results[stage]["total"])]
+        for year, m in rows:
+            print(
+                f"{stage:>9} {year:>5} {m['time'] * 1000:>8.1f} "
+                f"{m['peak_bytes'] / 1024:>8.0f} {m['blocks']:>7}"
+            )
+
+
+def profile(stage: str, year: int):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run = stage_runs(year, Path(tmp_dir) / "plot.svg")[stage]
+        profiler = cProfile.Profile()
+        profiler.runcall(run)
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--from", type=int, default=MIN_YEAR, dest="year_from")
+    parser.add_argument("--to", type=int, default=None, dest="year_to")
+    parser.add_argument("--save", help="save results as baseline")
+    parser.add_argument("--compare", help="fail on regression against baseline")
+    parser.add_argument("--profile", choices=STAGES, help="profile one stage")
+    parser.add_argument("--year", type=int, default=2019, help="season to profile")
+    args = parser.parse_args()
+
+    if args.profile:
+        profile(args.profile, args.year)
+        return
+
+    years = [
+        year
+        for year in cached_seasons()
+        if year >= max(args.year_from, MIN_YEAR)
+        and (args.year_to is None or year <= args.year_to)
+    ]
+    results = run_suite(years, args.repeat)
+    report(results)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+
+    if args.compare:
+        found = regressions(results, json.loads(Path(args.compare).read_text()))
+        if found:
+            print("\nRegressions:\n" + "\n".join(found))
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Render time, number of artists and SVG size of a chart (with history) at
+# 5, 10 and 20 riders, offline. Data is gathered before timing, so only
+# Plotting (drawing and saving) is measured.
+#
+# python -m benchmarks.bench_plotting [--year YEAR] [--repeat N] [--format FORMAT]
+import argparse
+import gzip
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from benchmarks.fixtures import raw_riders
+from charts_app.utils import MotoGP_utils
+from charts_app.utils.MotoGP_utils import (
+    EXPORT_FORMATS,
+    Cleaning,
+    GatheringReasultsFrom,
+    Plotting,
+)
+
+RIDERS = (5, 10, 20)
+
+
+def drawn_artists(artist) -> int:
+    # artists drawn: visible ones with their children
+    if not artist.get_visible():
+        return 0
+    return 1 + sum(drawn_artists(child) for child in artist.get_children())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--year", type=int, default=2019)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--format", default="svg", choices=list(EXPORT_FORMATS))
+    args = parser.parse_args()
+
+    gathering = GatheringReasultsFrom(args.year)
+    results = Cleaning(raw_riders(args.year))
+    history = gathering.history(results)
+    weather = gathering.weather_table(fetch=False)
+
+    # artists drawn, counted when the figure is saved
+    artists = []
+    save_figure = MotoGP_utils.save_figure
+
+    def counting_save_figure(fig, *args, **kwargs):
+        artists.append(drawn_artists(fig))
+        return save_figure(fig, *args, **kwargs)
+
+    print(f"{'riders':>6} {'artists':>8} {'kB':>7} {'gzip kB':>8} {'render ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir, mock.patch.object(
+        MotoGP_utils, "save_figure", side_effect=counting_save_figure
+    ):
+        for riders in RIDERS:
+            path = Path(tmp_dir) / f"{riders}"
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                Plotting(
+                    df=results.copy(),
+                    weather=weather,
+                    year=args.year,
+                    show_riders_pos=[1, riders],
+                    df_hist=history.copy(),
+                    output_path=path,
+                    output_format=args.format,
+                )
+                times.append(time.perf_counter() - start)
+
+            content = path.read_bytes()
+            print(
+                f"{riders:>6} {artists[-1]:>8} {len(content) / 1024:>7.0f} "
+                f"{len(gzip.compress(content)) / 1024:>8.0f} {min(times) * 1000:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
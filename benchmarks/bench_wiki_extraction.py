@@ -0,0 +1,71 @@
+# Riders standings extraction from season pages: previous path (full
+# BeautifulSoup tree, <sup> removal, read_html of every wikitable) vs
+# extract_riders_table (lxml, only standings table converted).
+#
+# python -m benchmarks.bench_wiki_extraction [--repeat N]
+import argparse
+import time
+from io import StringIO
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from benchmarks.fixtures import cached_seasons, wiki_page
+from charts_app.utils.MotoGP_utils import Cleaning, extract_riders_table
+
+
+def soup_riders_table(content: bytes) -> pd.DataFrame:
+    # extraction used by GatheringReasultsFrom.riders() before
+    soup = BeautifulSoup(content, "html.parser")
+    for sup in soup.select("sup"):
+        sup.extract()
+    df_tables = pd.read_html(StringIO(str(soup)), attrs={"class": "wikitable"})
+    for _ in df_tables:
+        if "Bike" in _.columns:
+            return _
+    return pd.DataFrame()
+
+
+def best_time(function, content: bytes, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(content)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'year':>4} {'page kB':>8} {'soup ms':>8} {'lxml ms':>8} {'speedup':>8}")
+    total_soup = total_lxml = 0
+
+    for year in cached_seasons():
+        content = wiki_page(year)
+
+        # both paths have to find the same table
+        pd.testing.assert_frame_equal(
+            Cleaning(extract_riders_table(content)),
+            Cleaning(soup_riders_table(content)),
+        )
+
+        soup = best_time(soup_riders_table, content, args.repeat)
+        lxml = best_time(extract_riders_table, content, args.repeat)
+        total_soup += soup
+        total_lxml += lxml
+        print(
+            f"{year:>4} {len(content) / 1024:>8.0f} {soup * 1000:>8.1f} "
+            f"{lxml * 1000:>8.1f} {soup / lxml:>7.1f}x"
+        )
+
+    print(
+        f"{'all':>4} {'':>8} {total_soup * 1000:>8.1f} {total_lxml * 1000:>8.1f} "
+        f"{total_soup / total_lxml:>7.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
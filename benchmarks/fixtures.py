@@ -0,0 +1,132 @@
+import html
+from pathlib import Path
+
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+CACHE_DIR = ROOT_DIR / "charts_app" / "utils" / "cache"
+
+# saved pages, e.g.
+# curl https://en.wikipedia.org/wiki/2019_MotoGP_World_Championship > fixtures/wiki/2019.html
+WIKI_FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "wiki"
+
+
+def cached_seasons() -> list:
+    # years with riders standings stored in cache
+    return sorted(
+        int(file.name.split("-")[0]) for file in CACHE_DIR.glob("*-MotoGP-riders.pkl")
+    )
+
+
+def raw_riders(year: int) -> pd.DataFrame:
+    return pd.read_pickle(CACHE_DIR / f"{year}-MotoGP-riders.pkl")
+
+
+def wiki_page(year: int) -> bytes:
+    # saved season page, or one rebuilt from cached standings table
+    saved = WIKI_FIXTURES_DIR / f"{year}.html"
+    if saved.exists():
+        return saved.read_bytes()
+    return synthetic_wiki_page(raw_riders(year))
+
+
+def _table(header: list, rows: list, css_class="wikitable") -> str:
+    head = "".join(f"<th>{cell}</th>" for cell in header)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{cell}</td>" for cell in row) + "</tr>" for row in rows
+    )
+    return f'<table class="{css_class}"><tbody><tr>{head}</tr>{body}</tbody></table>'
+
+
+def synthetic_wiki_page(df_riders: pd.DataFrame) -> bytes:
+    #
+    # page laid out like a season article: navigation, entry list, calendar
+    # and results tables first, then riders standings (with <sup> notes on
+    # results), then constructors and teams standings and references
+    races = [c for c in df_riders.columns if c.isupper() and len(c) == 3]
+    riders = [str(r) for r in df_riders["Rider"] if pd.notna(r)]
+
+    def link(text):
+        return f'<a href="/wiki/{html.escape(text)}" title="{html.escape(text)}">{html.escape(text)}</a>'
+
+    def note(text):
+        return f'{text}<sup id="cite_ref-{text}" class="reference"><a href="#cite_note">[{len(text)}]</a></sup>'
+
+    navigation = "".join(
+        f'<div class="navbox"><ul>{"".join(f"<li>{link(r)}</li>" for r in riders)}</ul></div>'
+        for _ in range(10)
+    )
+    entry_list = _table(
+        ["Team", "Constructor", "Motorcycle", "No.", "Rider", "Rounds"],
+        [
+            [link("Team"), "Honda", "RC213V", nr, link(r), "All"]
+            for nr, r in enumerate(riders)
+        ],
+    )
+    calendar = _table(
+        ["Round", "Date", "Grand Prix", "Circuit"],
+        [
+            [nr, "1 May", link(f"{r} Grand Prix"), link(f"{r} Circuit")]
+            for nr, r in enumerate(races)
+        ],
+    )
+    race_results = _table(
+        [
+            "Round",
+            "Grand Prix",
+            "Pole position",
+            "Fastest lap",
+            "Winning rider",
+            "Report",
+        ],
+        [
+            [nr, link(r), link(riders[0]), link(riders[1]), link(riders[2]), "Report"]
+            for nr, r in enumerate(races)
+        ],
+    )
+
+    standings_header = "".join(
+        f"<th>{html.escape(str(c))}</th>" for c in df_riders.columns
+    )
+    standings_rows = []
+    for _, row in df_riders.iterrows():
+        cells = []
+        for column, value in row.items():
+            value = "" if pd.isna(value) else html.escape(str(value))
+            if column in races and value.isdigit():
+                value = note(value)
+            elif column == "Rider":
+                value = link(value)
+            cells.append(f"<td>{value}</td>")
+        standings_rows.append(f"<tr>{''.join(cells)}</tr>")
+    standings = (
+        f'<table class="wikitable" style="font-size:85%"><tbody>'
+        f"<tr>{standings_header}</tr>{''.join(standings_rows)}</tbody></table>"
+    )
+
+    constructors = _table(
+        ["Pos.", "Constructor"] + races + ["Pts"],
+        [
+            [nr, link(c)] + [nr] * len(races) + [100]
+            for nr, c in enumerate(
+                ["Honda", "Ducati", "Yamaha", "Suzuki", "KTM", "Aprilia"]
+            )
+        ],
+    )
+    teams = _table(
+        ["Pos.", "Team"] + races + ["Pts"],
+        [[nr, link(f"Team {nr}")] + [nr] * len(races) + [100] for nr in range(12)],
+    )
+    references = (
+        "<ol>"
+        + "".join(f"<li>{link(f'Reference {nr}')}</li>" for nr in range(300))
+        + "</ol>"
+    )
+
+    page = (
+        "<!DOCTYPE html><html><head><meta charset='UTF-8'><title>Season</title></head><body>"
+        f"{navigation}<p>Season article.</p>{entry_list}{calendar}{race_results}"
+        f"<h2>Riders' standings</h2>{standings}{constructors}{teams}{references}"
+        "</body></html>"
+    )
+    return page.encode()
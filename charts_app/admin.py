@@ -1,3 +1,30 @@
 from django.contrib import admin
 
-# Register your models here.
+from charts_app.models import Race, RaceWeather, Result, Rider, Season
+
+
+@admin.register(Season)
+class SeasonAdmin(admin.ModelAdmin):
+    list_display = ["year", "data_version"]
+
+
+@admin.register(Rider)
+class RiderAdmin(admin.ModelAdmin):
+    search_fields = ["name"]
+
+
+@admin.register(Race)
+class RaceAdmin(admin.ModelAdmin):
+    list_display = ["season", "number", "code", "circuit"]
+    list_filter = ["season", "circuit"]
+
+
+@admin.register(Result)
+class ResultAdmin(admin.ModelAdmin):
+    list_display = ["season", "race", "rider", "standing", "position"]
+    list_filter = ["season"]
+    list_select_related = ["race", "rider"]
+    raw_id_fields = ["race", "rider"]
+
+
+admin.site.register(RaceWeather)
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ChartsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "charts_app"
+
+    def ready(self):
+        if settings.CHARTS_PRELOAD:
+            from charts_app.preload import preload
+
+            preload()
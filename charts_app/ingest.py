@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+
+from charts_app.models import Race, RaceWeather, Result, Rider, Season
+from charts_app.utils import tracks
+from charts_app.utils.results_index import cleaned_with_entries
+from charts_app.utils.weather_analysis import races_weather
+from charts_app.utils.weather_table import CLOUDS, TRACK_CONDITIONS, label
+
+BATCH_SIZE = 1000
+
+
+def ingest_season(
+    year: int,
+    data_version: str,
+    standings,
+    weather,
+    batch_size: int = BATCH_SIZE,
+) -> bool:
+    #
+    # stores standings() (riders table as cached, cleaned here) and
+    # weather() of a season, replacing what was stored of it before; nothing
+    # is loaded when the same data version is stored already. Results are
+    # stored of races entered only. Rows are inserted with bulk_create in
+    # batches, in one transaction, so readers see either the old or the new
+    # season.
+    if Season.objects.filter(year=year, data_version=data_version).exists():
+        return False
+    standings, entered = cleaned_with_entries(standings())
+    weather = weather()
+
+    with transaction.atomic():
+        # races, results and weather of the season go with it
+        Season.objects.filter(year=year).delete()
+        season = Season.objects.create(year=year, data_version=data_version)
+
+        races = Race.objects.bulk_create(
+            [
+                Race(season=season, number=number, code=str(code), circuit=circuit)
+                for number, (code, circuit) in enumerate(
+                    zip(standings.columns, tracks.circuit_ids(standings.columns, year))
+                )
+            ],
+            batch_size=batch_size,
+        )
+
+        # riders already stored (other seasons) are kept
+        names = [str(name) for name in standings.index]
+        Rider.objects.bulk_create(
+            [Rider(name=name) for name in names],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        rider_ids = dict(Rider.objects.filter(name__in=names).values_list("name", "id"))
+
+        positions = standings.to_numpy(dtype=float)
+        Result.objects.bulk_create(
+            (
+                Result(
+                    season=season,
+                    race=race,
+                    rider_id=rider_ids[name],
+                    standing=standing,
+                    position=None if np.isnan(position) else float(position),
+                )
+                for standing, (name, row, row_entered) in enumerate(
+                    zip(names, positions, entered.to_numpy(dtype=bool)), start=1
+                )
+                for race, position, race_entered in zip(races, row, row_entered)
+                if race_entered
+            ),
+            batch_size=batch_size,
+        )
+
+        weather_df = races_weather(year, standings.columns, weather)
+        RaceWeather.objects.bulk_create(
+            [
+                RaceWeather(
+                    race=race,
+                    track_wet=label(int(conditions["track"]), TRACK_CONDITIONS),
+                    clouds=label(int(conditions["clouds"]), CLOUDS),
+                    **{
+                        column: (
+                            None
+                            if np.isnan(conditions[column])
+                            else float(conditions[column])
+                        )
+                        for column in ("air_temp", "ground_temp", "humidity")
+                    },
+                )
+                for race, (_, conditions) in zip(races, weather_df.iterrows())
+                # races without weather data
+                if pd.notna(conditions["track"])
+            ],
+            batch_size=batch_size,
+        )
+    return True
+
+
+def top_riders(year: int, places=5) -> list:
+    # names of riders in first places of a season's standings
+    return list(
+        Rider.objects.filter(results__season__year=year, results__standing__lte=places)
+        .distinct()
+        .order_by("results__standing")
+        .values_list("name", flat=True)
+    )
+
+
+def rider_history(riders, circuits, seasons=None) -> pd.DataFrame:
+    #
+    # finishes (rider, season, race, circuit, position) of given riders at
+    # given circuits, optionally in given seasons only, in season and race
+    # order; NaN for races entered but not finished
+    results = Result.objects.filter(rider__name__in=riders, race__circuit__in=circuits)
+    if seasons is not None:
+        results = results.filter(season__year__in=seasons)
+    rows = results.order_by("season__year", "race__number", "standing").values_list(
+        "rider__name", "season__year", "race__code", "race__circuit", "position"
+    )
+    df = pd.DataFrame(
+        list(rows), columns=["rider", "season", "race", "circuit", "position"]
+    )
+    df["position"] = df["position"].astype(float)
+    return df
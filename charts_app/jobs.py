@@ -0,0 +1,103 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from charts_app.utils.shared_cache import KEY_PREFIX, shared_cache
+
+# how long finished jobs can be asked about
+JOB_TIMEOUT = 60 * 60
+
+logger = logging.getLogger("charts_app.jobs")
+
+
+# Charts rendered in the background. Job state is kept in the shared Django
+# cache, so any worker can report it, and identical jobs (same chart key)
+# already in flight in any worker are not started again.
+class ChartJobs:
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # threads are started on first job
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="chart-job"
+                )
+            return self._executor
+
+    @staticmethod
+    def _new_job(status: str = "queued", chart_file=None) -> dict:
+        return {
+            "id": uuid.uuid4().hex,
+            "status": status,
+            "stage": None,
+            "chart_file": chart_file,
+            "error": None,
+        }
+
+    def done(self, chart_file: str) -> dict:
+        # job of a chart that's already rendered
+        job = self._new_job("done", chart_file)
+        self._save(job)
+        return job
+
+    def submit(self, key: str, render) -> dict:
+        # render(progress) has to return chart's media name;
+        # progress(stage) may be called to report what's being done
+        cache = shared_cache()
+        job = self._new_job()
+        job_key = f"{KEY_PREFIX}:job-key:{key}"
+
+        # job's state is stored before the job is published under the
+        # chart key, so a worker finding the key finds the job too
+        self._save(job)
+        if not cache.add(job_key, job["id"], JOB_TIMEOUT):
+            in_flight = self.get(cache.get(job_key, ""))
+            if in_flight is not None:
+                cache.delete(f"{KEY_PREFIX}:job:{job['id']}")
+                return in_flight
+            # state of the job in flight expired: this one takes its place
+            cache.set(job_key, job["id"], JOB_TIMEOUT)
+
+        self._get_executor().submit(self._run, job, key, render)
+        return job
+
+    def _run(self, job: dict, key: str, render):
+        def progress(stage):
+            job["stage"] = stage
+            self._save(job)
+
+        job["status"] = "running"
+        self._save(job)
+        try:
+            job["chart_file"] = render(progress)
+            job["status"] = "done"
+        except ValueError:
+            job.update(status="failed", error="error in input data")
+        except Exception:
+            # details (paths, upstream errors) are logged, not sent to clients
+            logger.exception("Chart job %s failed", job["id"])
+            job.update(status="failed", error="chart could not be drawn")
+        finally:
+            self._save(job)
+            # unless a later job took its place meanwhile
+            job_key = f"{KEY_PREFIX}:job-key:{key}"
+            if shared_cache().get(job_key) == job["id"]:
+                shared_cache().delete(job_key)
+
+    def _save(self, job: dict):
+        shared_cache().set(f"{KEY_PREFIX}:job:{job['id']}", dict(job), JOB_TIMEOUT)
+
+    def get(self, job_id: str):
+        # job's state, or None if there's no such job
+        return shared_cache().get(f"{KEY_PREFIX}:job:{job_id}")
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
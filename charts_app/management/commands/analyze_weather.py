@@ -0,0 +1,39 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from charts_app.utils.weather_analysis import (
+    ANALYSIS_FILE,
+    WeatherPerformance,
+    refresh_weather_performance,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Analyse riders' performance in wet and dry races and at different "
+        "track temperatures over all cached seasons."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=ANALYSIS_FILE, type=Path)
+
+    def handle(self, *args, **options):
+        analysis = WeatherPerformance(options["path"])
+
+        start = time.perf_counter()
+        analysed = refresh_weather_performance(analysis)
+        elapsed = time.perf_counter() - start
+
+        if not analysed:
+            self.stdout.write("No season changed since last analysis")
+            return
+
+        riders = analysis.riders()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Analysed {len(riders)} riders in {elapsed:.2f}s, "
+                f"saved to {options['path']}"
+            )
+        )
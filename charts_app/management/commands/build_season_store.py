@@ -0,0 +1,53 @@
+import json
+import os
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from charts_app.utils.MotoGP_utils import (
+    MIN_YEAR,
+    Cleaning,
+    GatheringReasultsFrom,
+    file_version,
+)
+from charts_app.utils.season_store import CURRENT_YEAR, STORE_PATH, SeasonStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Build consolidated store of cleaned riders standings and weather "
+        "of all cached past seasons."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=STORE_PATH, type=Path)
+
+    def handle(self, *args, **options):
+        results = {}
+        weather = {}
+        sources = {}
+
+        # only past seasons with cached files; the in-progress season
+        # keeps changing, so it's always read from per-year cache
+        for year in range(MIN_YEAR, CURRENT_YEAR):
+            gathering = GatheringReasultsFrom(year)
+            riders_file, weather_file = gathering.cache_files()
+
+            # seasons cached before they ended are left out, until refreshed;
+            # each part is stored with version of the file it's made from
+            if os.path.exists(riders_file) and not gathering.is_stale("riders"):
+                sources.setdefault(year, {})["riders"] = file_version(riders_file)
+                results[year] = Cleaning(gathering.riders())
+            if os.path.exists(weather_file) and not gathering.is_stale("weather"):
+                sources.setdefault(year, {})["weather"] = file_version(weather_file)
+                with open(weather_file, "r") as file:
+                    weather[year] = json.load(file)
+
+        SeasonStore.build(results, weather, path=options["path"], sources=sources)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored {len(results)} seasons of results and "
+                f"{len(weather)} seasons of weather in {options['path']}"
+            )
+        )
@@ -0,0 +1,38 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from charts_app.utils.results_index import (
+    INDEX_PATH,
+    ResultsIndex,
+    refresh_results_index,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Index results of all cached seasons by rider and by circuit, for "
+        "careers and circuits' pages."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=INDEX_PATH, type=Path)
+
+    def handle(self, *args, **options):
+        index = ResultsIndex(options["path"])
+
+        start = time.perf_counter()
+        indexed = refresh_results_index(index)
+        elapsed = time.perf_counter() - start
+
+        if not indexed:
+            self.stdout.write("No season changed since last indexed")
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Indexed {len(indexed)} seasons in {elapsed:.2f}s, "
+                f"saved to {options['path']}"
+            )
+        )
@@ -0,0 +1,55 @@
+import os
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from charts_app.ingest import BATCH_SIZE, ingest_season
+from charts_app.utils.MotoGP_utils import MIN_YEAR, GatheringReasultsFrom
+from charts_app.utils.season_store import CURRENT_YEAR
+
+
+class Command(BaseCommand):
+    help = (
+        "Store cleaned riders standings and weather of cached seasons in the "
+        "database (seasons stored before are replaced when their data changed)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="year_from", type=int, default=MIN_YEAR)
+        parser.add_argument("--to", dest="year_to", type=int, default=CURRENT_YEAR)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="rows inserted in one query",
+        )
+
+    def handle(self, *args, **options):
+        year_from = max(options["year_from"], MIN_YEAR)
+        year_to = min(options["year_to"], CURRENT_YEAR)
+        if year_from > year_to:
+            raise CommandError(f"No seasons between {year_from} and {year_to}")
+
+        ingested = 0
+        for year in range(year_from, year_to + 1):
+            gathering = GatheringReasultsFrom(year)
+            riders_file = gathering.cache_files()[0]
+
+            # only cached seasons, nothing is scraped
+            if not os.path.exists(riders_file):
+                self.stdout.write(f"{year}: not cached, skipped")
+                continue
+
+            if ingest_season(
+                year,
+                gathering.data_version(),
+                lambda: pd.read_pickle(riders_file),
+                lambda: gathering.weather_table(fetch=False),
+                batch_size=max(options["batch_size"], 1),
+            ):
+                ingested += 1
+                self.stdout.write(f"{year}: stored")
+            else:
+                self.stdout.write(f"{year}: unchanged, skipped")
+
+        self.stdout.write(self.style.SUCCESS(f"Stored {ingested} seasons"))
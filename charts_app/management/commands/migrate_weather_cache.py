@@ -0,0 +1,52 @@
+import glob
+import json
+import os
+
+from django.core.management.base import BaseCommand
+
+from charts_app.utils.MotoGP_utils import CACHE_PATH, file_version
+from charts_app.utils.weather_table import (
+    load_weather_table,
+    normalize_weather,
+    save_weather_table,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Normalize weather of seasons cached as fetched (*-MotoGP-weather.json) "
+        "into typed weather files (*-MotoGP-weather.npz), once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default=CACHE_PATH)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="make typed weather again, even when it's up to date",
+        )
+
+    def handle(self, *args, **options):
+        migrated = 0
+        for weather_file in sorted(
+            glob.glob(os.path.join(options["path"], "*-MotoGP-weather.json"))
+        ):
+            table_file = f"{weather_file[: -len('.json')]}.npz"
+            version = file_version(weather_file)
+
+            if not options["force"] and (
+                load_weather_table(table_file, source=version) is not None
+            ):
+                continue
+            try:
+                with open(weather_file, "r") as file:
+                    table = normalize_weather(json.load(file))
+            except (json.JSONDecodeError, AttributeError) as e:
+                self.stderr.write(f"{os.path.basename(weather_file)}: skipped: {e}")
+                continue
+
+            save_weather_table(table_file, table, source=version)
+            migrated += 1
+            self.stdout.write(f"{os.path.basename(table_file)}: {len(table)} races")
+
+        self.stdout.write(self.style.SUCCESS(f"Migrated {migrated} weather files"))
@@ -0,0 +1,89 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from charts_app.utils.MotoGP_utils import MIN_YEAR, GatheringReasultsFrom
+from charts_app.utils.results_index import refresh_results_index
+from charts_app.utils.season_store import CURRENT_YEAR
+from charts_app.utils.weather_analysis import refresh_weather_performance
+
+
+def warm_season(year: int) -> dict:
+    # fetch (if needed), clean and store one season; returns timings
+    gathering = GatheringReasultsFrom(year)
+    timings = {}
+
+    start = time.perf_counter()
+    gathering.standings()
+    timings["riders"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    gathering.weather()
+    timings["weather"] = time.perf_counter() - start
+
+    return timings
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetch, clean and cache riders standings and weather of many seasons "
+        "in parallel, e.g. at deploy time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="year_from", type=int, default=MIN_YEAR)
+        parser.add_argument("--to", dest="year_to", type=int, default=CURRENT_YEAR)
+        parser.add_argument(
+            "--jobs", type=int, default=4, help="seasons fetched in parallel"
+        )
+        parser.add_argument(
+            "--skip-store",
+            action="store_true",
+            help="don't rebuild season store, results index and analyses afterwards",
+        )
+
+    def handle(self, *args, **options):
+        year_from = max(options["year_from"], MIN_YEAR)
+        year_to = min(options["year_to"], CURRENT_YEAR)
+        if year_from > year_to:
+            raise CommandError(f"No seasons between {year_from} and {year_to}")
+
+        years = []
+        for year in range(year_from, year_to + 1):
+            if GatheringReasultsFrom(year).is_fresh():
+                self.stdout.write(f"{year}: fresh, skipped")
+            else:
+                years.append(year)
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(options["jobs"], 1)) as executor:
+            futures = {executor.submit(warm_season, year): year for year in years}
+
+            for future in as_completed(futures):
+                year = futures[future]
+                try:
+                    timings = future.result()
+                # riders() exits when scraped table is corrupted
+                except (Exception, SystemExit) as e:
+                    failed.append(year)
+                    self.stderr.write(f"{year}: failed: {str(e).strip()}")
+                    continue
+
+                self.stdout.write(
+                    f"{year}: riders {timings['riders']:.2f}s, "
+                    f"weather {timings['weather']:.2f}s"
+                )
+
+        if years and not options["skip_store"]:
+            call_command("build_season_store", stdout=self.stdout)
+            reindexed = refresh_results_index()
+            self.stdout.write(f"Results index: {len(reindexed)} seasons indexed again")
+            if refresh_weather_performance():
+                self.stdout.write("Weather performance: analysed again")
+
+        if failed:
+            raise CommandError(f"Failed seasons: {', '.join(map(str, sorted(failed)))}")
+
+        self.stdout.write(self.style.SUCCESS(f"Warmed up {len(years)} seasons"))
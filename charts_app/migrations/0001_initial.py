@@ -0,0 +1,177 @@
+# Generated by Django 5.0.2 on 2026-10-17 00:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Race",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("number", models.PositiveSmallIntegerField()),
+                ("code", models.CharField(max_length=10)),
+                ("circuit", models.CharField(max_length=40)),
+            ],
+            options={
+                "ordering": ["season", "number"],
+            },
+        ),
+        migrations.CreateModel(
+            name="Rider",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="Season",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField(unique=True)),
+                ("data_version", models.CharField(max_length=40)),
+            ],
+            options={
+                "ordering": ["year"],
+            },
+        ),
+        migrations.CreateModel(
+            name="RaceWeather",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("track_wet", models.CharField(blank=True, max_length=10)),
+                ("clouds", models.CharField(blank=True, max_length=20)),
+                ("air_temp", models.FloatField(null=True)),
+                ("ground_temp", models.FloatField(null=True)),
+                ("humidity", models.FloatField(null=True)),
+                (
+                    "race",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="weather",
+                        to="charts_app.race",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="race",
+            name="season",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="races",
+                to="charts_app.season",
+            ),
+        ),
+        migrations.CreateModel(
+            name="Result",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("standing", models.PositiveSmallIntegerField()),
+                ("position", models.FloatField(null=True)),
+                (
+                    "race",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results",
+                        to="charts_app.race",
+                    ),
+                ),
+                (
+                    "rider",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results",
+                        to="charts_app.rider",
+                    ),
+                ),
+                (
+                    "season",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="results",
+                        to="charts_app.season",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["season", "rider"],
+                        name="charts_app__season__e0af47_idx",
+                    ),
+                    models.Index(
+                        fields=["season", "standing"],
+                        name="charts_app__season__a97343_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="result",
+            constraint=models.UniqueConstraint(
+                fields=("race", "rider"), name="result_race_rider"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="race",
+            index=models.Index(
+                fields=["circuit", "season"], name="charts_app__circuit_8df2c4_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="race",
+            constraint=models.UniqueConstraint(
+                fields=("season", "number"), name="race_season_number"
+            ),
+        ),
+    ]
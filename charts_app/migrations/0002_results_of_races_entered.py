@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def drop_seasons(apps, schema_editor):
+    # seasons stored before had results of races not entered too (as not
+    # finished); dropped, so "manage.py ingest_seasons" stores them again
+    apps.get_model("charts_app", "Season").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("charts_app", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_seasons, migrations.RunPython.noop),
+    ]
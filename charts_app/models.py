@@ -1,3 +1,75 @@
 from django.db import models
 
-# Create your models here.
+
+# Cleaned seasons, ingested from cached files by "manage.py ingest_seasons"
+# (see charts_app/ingest.py), so standings and history can be read with
+# indexed queries instead of loading and cleaning whole seasons.
+class Season(models.Model):
+    year = models.PositiveSmallIntegerField(unique=True)
+    # version of cached data ingested (GatheringReasultsFrom.data_version)
+    data_version = models.CharField(max_length=40)
+
+    class Meta:
+        ordering = ["year"]
+
+    def __str__(self):
+        return str(self.year)
+
+
+class Rider(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class Race(models.Model):
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="races")
+    number = models.PositiveSmallIntegerField()  # order in the season, from 0
+    code = models.CharField(max_length=10)  # e.g. "RSM", as in standings
+    circuit = models.CharField(max_length=40)  # canonical, see utils/tracks.py
+
+    class Meta:
+        ordering = ["season", "number"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["season", "number"], name="race_season_number"
+            )
+        ]
+        indexes = [models.Index(fields=["circuit", "season"])]
+
+    def __str__(self):
+        return f"{self.season_id}: {self.code}"
+
+
+class Result(models.Model):
+    # season is repeated from race, so a season's results of riders are
+    # read from one index
+    season = models.ForeignKey(Season, on_delete=models.CASCADE, related_name="results")
+    race = models.ForeignKey(Race, on_delete=models.CASCADE, related_name="results")
+    rider = models.ForeignKey(Rider, on_delete=models.CASCADE, related_name="results")
+    standing = models.PositiveSmallIntegerField()  # rider's place in season
+    # of races entered only; None: race not finished
+    position = models.FloatField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["race", "rider"], name="result_race_rider")
+        ]
+        indexes = [
+            models.Index(fields=["season", "rider"]),
+            models.Index(fields=["season", "standing"]),
+        ]
+
+
+class RaceWeather(models.Model):
+    race = models.OneToOneField(Race, on_delete=models.CASCADE, related_name="weather")
+    track_wet = models.CharField(max_length=10, blank=True)  # "Wet", "Dry"...
+    clouds = models.CharField(max_length=20, blank=True)
+    # None for corrupted values
+    air_temp = models.FloatField(null=True)
+    ground_temp = models.FloatField(null=True)
+    humidity = models.FloatField(null=True)
@@ -0,0 +1,23 @@
+import gc
+import importlib
+
+# modules charts and their data are made with, and all they import
+# (matplotlib, pandas, numpy, requests, lxml)
+PRELOADED = [
+    "charts_app.utils.MotoGP_utils",
+    "charts_app.utils.career_chart",
+    "charts_app.utils.data_export",
+    "charts_app.utils.results_index",
+    "charts_app.utils.weather_analysis",
+]
+
+
+def preload():
+    #
+    # imports charts' modules at server start. In the master process of a
+    # forking server (gunicorn --preload) it's done once and workers share
+    # these pages copy-on-write; objects made so far are frozen, so garbage
+    # collection in workers doesn't write to (and copy) them.
+    for module in PRELOADED:
+        importlib.import_module(module)
+    gc.freeze()
@@ -0,0 +1,69 @@
+// Async mode: the form is sent in background, the chart is swapped in when
+// its job is done, and the page shows what is being done meanwhile.
+// Without JavaScript (or EventSource) the form is posted as usual.
+(function () {
+    const form = document.querySelector("#controls form");
+    let chart = document.querySelector("#chart");
+    const status = document.querySelector("#status");
+
+    if (!form || !window.EventSource || !window.fetch) {
+        return;
+    }
+
+    function show(job) {
+        if (job.status === "done") {
+            if (!chart) {
+                // chart was drawn in browser before
+                chart = document.createElement("img");
+                chart.id = "chart";
+                document.querySelector("#chart-canvas").replaceWith(chart);
+            }
+            chart.src = job.chart_url;
+            status.textContent = "";
+        } else if (job.status === "failed") {
+            status.textContent = job.error;
+        } else {
+            status.textContent = job.stage ? `${job.status}: ${job.stage}…` : `${job.status}…`;
+        }
+    }
+
+    form.addEventListener("submit", async function (event) {
+        // charts drawn in browser come with the page
+        if (form.elements.render_mode && form.elements.render_mode.value === "client") {
+            return;
+        }
+        event.preventDefault();
+
+        const data = new FormData(form);
+        data.append("async", "1");
+
+        let job;
+        try {
+            const response = await fetch(form.action || window.location.href, {
+                method: "POST",
+                body: data,
+            });
+            job = await response.json();
+        } catch (error) {
+            form.submit();
+            return;
+        }
+
+        show(job);
+        if (job.status === "done" || job.status === "failed") {
+            return;
+        }
+
+        const events = new EventSource(job.events_url);
+        events.onmessage = function (message) {
+            job = JSON.parse(message.data);
+            show(job);
+            if (job.status === "done" || job.status === "failed") {
+                events.close();
+            }
+        };
+        events.onerror = function () {
+            events.close();
+        };
+    });
+})();
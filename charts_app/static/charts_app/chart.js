@@ -0,0 +1,204 @@
+// Chart drawn in browser from data embedded in the page (render mode
+// "client"): riders' standings on the top, weather (or riders' weather
+// performance) on the bottom, like the chart drawn by the server.
+(function () {
+    const SVG = "http://www.w3.org/2000/svg";
+    const WIDTH = 1000;
+    const LEFT = 110;
+    const RIGHT = 980;
+    const TAB10 = [
+        "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+        "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+    ];
+    // colormap has 10 colors, so for 11-th rider line style changes
+    const DASHES = ["", "8 3 2 3", "2 3"];
+
+    const canvas = document.querySelector("#chart-canvas");
+    const data = JSON.parse(document.querySelector("#chart-data").textContent);
+
+    function element(name, attrs, parent, text) {
+        const el = document.createElementNS(SVG, name);
+        for (const [key, value] of Object.entries(attrs)) {
+            el.setAttribute(key, value);
+        }
+        if (text !== undefined) {
+            el.textContent = text;
+        }
+        (parent || canvas).appendChild(el);
+        return el;
+    }
+
+    // x position of n-th race
+    function xOf(n, count) {
+        return count > 1 ? LEFT + (n * (RIGHT - LEFT)) / (count - 1) : (LEFT + RIGHT) / 2;
+    }
+
+    // polyline broken on missing values (unfinished races)
+    function path(values, x, y) {
+        let d = "";
+        let pen = "M";
+        values.forEach(function (value, n) {
+            if (value === null) {
+                pen = "M";
+                return;
+            }
+            d += `${pen}${x(n).toFixed(1)},${y(value).toFixed(1)} `;
+            pen = "L";
+        });
+        return d;
+    }
+
+    function series(values, x, y, style, parent) {
+        const group = element("g", { opacity: style.opacity || 1 }, parent);
+        element("path", {
+            d: path(values, x, y),
+            fill: "none",
+            stroke: style.color,
+            "stroke-width": style.width,
+            "stroke-dasharray": style.dash || "",
+        }, group);
+        values.forEach(function (value, n) {
+            if (value === null) {
+                return;
+            }
+            element("circle", { cx: x(n), cy: y(value), r: style.radius, fill: style.color }, group);
+            if (style.labels) {
+                element("text", {
+                    x: x(n), y: y(value), "font-size": style.labels, fill: "white",
+                    "text-anchor": "middle", "dominant-baseline": "central",
+                }, group, Math.round(value));
+            }
+        });
+    }
+
+    function grid(count, top, bottom, labels, parent) {
+        labels.forEach(function (label, n) {
+            element("line", {
+                x1: xOf(n, count), x2: xOf(n, count), y1: top, y2: bottom,
+                stroke: "#000", "stroke-opacity": 0.1,
+            }, parent);
+        });
+    }
+
+    function riders() {
+        const top = 50;
+        const bottom = 400;
+        const races = data.races;
+        const x = (n) => xOf(n, races.length);
+        const y = (place) => top + ((place - 0.5) * (bottom - top)) / 20;
+        const panel = element("g", { class: "riders" });
+
+        element("text", { x: WIDTH / 2, y: 30, "font-size": 22, "text-anchor": "middle" },
+            panel, `Riders' standings ${data.year}`);
+        grid(races.length, top, bottom, races, panel);
+
+        for (let place = 1; place <= 20; place++) {
+            element("text", { x: LEFT - 60, y: y(place), "font-size": 9, "text-anchor": "end",
+                "dominant-baseline": "central" }, panel, place);
+        }
+        races.forEach(function (race, n) {
+            element("text", { x: x(n), y: bottom + 16, "font-size": 9, "text-anchor": "middle" },
+                panel, race);
+        });
+
+        data.riders.forEach(function (rider, n) {
+            const style = { color: TAB10[n % 10], dash: DASHES[Math.min(2, Math.floor(n / 10))] };
+            if (rider.history) {
+                series(rider.history, x, y,
+                    Object.assign({ width: 4, radius: 7, opacity: 0.1 }, style), panel);
+            }
+            series(rider.results, x, y, Object.assign({ width: 1.5, radius: 5.5, labels: 7 }, style), panel);
+
+            // rider's name next to the first race, when it was finished
+            if (rider.results[0] !== null) {
+                element("text", { x: x(0) - 12, y: y(rider.results[0]), "font-size": 7,
+                    "text-anchor": "end", "dominant-baseline": "central" },
+                    panel, `${rider.position}. ${rider.name.split(" ").pop()}`);
+            }
+            // legend
+            element("text", { x: RIGHT - 150, y: 60 + n * 12, "font-size": 9, fill: style.color },
+                panel, `${rider.position}. ${rider.name}`);
+        });
+    }
+
+    function weather() {
+        const top = 450;
+        const bottom = 530;
+        const weather = data.weather;
+        const temps = weather.air_temp.concat(weather.ground_temp).filter((t) => t !== null);
+        const low = Math.min(...temps, 0);
+        const high = Math.max(...temps, 1);
+        const x = (n) => xOf(n, weather.labels.length);
+        const y = (temp) => bottom - ((temp - low) * (bottom - top)) / (high - low);
+        const panel = element("g", { class: "weather" });
+
+        element("text", { x: WIDTH / 2, y: top - 14, "font-size": 16, "text-anchor": "middle" },
+            panel, "Weather");
+        grid(weather.labels.length, top, bottom, weather.labels, panel);
+
+        weather.labels.forEach(function (label, n) {
+            const text = element("text", { x: x(n), y: bottom + 12, "font-size": 8 }, panel);
+            label.split("\n").forEach(function (line, row) {
+                element("tspan", { x: x(n), dy: row ? 9 : 0 }, text, line);
+            });
+        });
+
+        series(weather.ground_temp, x, y,
+            { color: "lightslategrey", width: 1.5, radius: 5, labels: 6 }, panel);
+        series(weather.air_temp, x, y,
+            { color: "deepskyblue", width: 1.5, radius: 5, labels: 6 }, panel);
+
+        element("text", { x: RIGHT - 150, y: top, "font-size": 9, fill: "lightslategrey" },
+            panel, "ground temp");
+        element("text", { x: RIGHT - 150, y: top + 12, "font-size": 9, fill: "deepskyblue" },
+            panel, "air temp");
+    }
+
+    // riders' mean place in dry and wet races over all seasons, with places
+    // lost per +10ºC of track temperature
+    function weatherPerformance() {
+        const top = 450;
+        const bottom = 530;
+        const performance = data.weather_performance;
+        const places = performance.mean_dry.concat(performance.mean_wet).filter((p) => p !== null);
+        const high = Math.max(...places, 1);
+        const slot = (RIGHT - LEFT) / data.riders.length;
+        const x = (n) => LEFT + slot * (n + 0.5);
+        const height = (place) => (place * (bottom - top)) / high;
+        const panel = element("g", { class: "weather-performance" });
+
+        element("text", { x: WIDTH / 2, y: top - 14, "font-size": 16, "text-anchor": "middle" },
+            panel, "Mean place in dry and wet races, all seasons");
+
+        data.riders.forEach(function (rider, n) {
+            [["mean_dry", "deepskyblue", -1], ["mean_wet", "lightslategrey", 0]].forEach(
+                function ([column, color, side]) {
+                    const place = performance[column][n];
+                    if (place === null) {
+                        return;
+                    }
+                    element("rect", { x: x(n) + side * slot * 0.4, y: top, width: slot * 0.4,
+                        height: height(place), fill: color }, panel);
+                });
+            if (performance.temp_slope[n] !== null) {
+                const slope = performance.temp_slope[n];
+                element("text", { x: x(n), y: top + 10, "font-size": 7, "text-anchor": "middle" },
+                    panel, `${slope >= 0 ? "+" : ""}${slope.toFixed(1)} / +10ºC`);
+            }
+            element("text", { x: x(n), y: bottom + 12, "font-size": 8, "text-anchor": "middle" },
+                panel, `${rider.position}. ${rider.name.split(" ").pop()}`);
+        });
+
+        element("text", { x: LEFT - 60, y: top + 8, "font-size": 9, fill: "deepskyblue" },
+            panel, "dry");
+        element("text", { x: LEFT - 60, y: top + 20, "font-size": 9, fill: "lightslategrey" },
+            panel, "wet");
+    }
+
+    riders();
+    if (data.weather_performance) {
+        weatherPerformance();
+    } else {
+        weather();
+    }
+})();
@@ -1,3 +1,2093 @@
-from django.test import TestCase
+import inspect
+import json
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime
+import tempfile
+import threading
+import time
+from io import BytesIO, StringIO
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import SimpleTestCase, TestCase, override_settings
+from requests.exceptions import RequestException
+from django.urls import reverse
+
+from charts_app import views
+from charts_app.ingest import ingest_season, rider_history, top_riders
+from charts_app.jobs import JOB_TIMEOUT, ChartJobs
+from charts_app.management.commands import warm_cache
+from charts_app.models import Race, RaceWeather, Result, Season
+from charts_app.utils.chart_cache import ChartCache
+from charts_app.utils.memo import LRUMemo
+from charts_app.utils.metrics import Metrics, metrics
+from charts_app.utils.pulselive import PulseliveClient
+from charts_app.utils import MotoGP_utils
+from charts_app.utils.MotoGP_utils import (
+    Cleaning,
+    GatheringReasultsFrom,
+    chart_key,
+    extract_riders_table,
+    plot_chart,
+)
+from charts_app.utils.render_pool import RenderPool
+from charts_app.utils.results_index import (
+    ResultsIndex,
+    cleaned_with_entries,
+    entries,
+)
+from charts_app.utils.season_store import SeasonStore
+from charts_app.utils.shared_cache import (
+    KEY_PREFIX,
+    _file_lock,
+    get_or_set_locked,
+    shared_cache,
+)
+from charts_app.utils.tracks import circuit_id
+from charts_app.utils.weather_analysis import (
+    WeatherPerformance,
+    race_records,
+    refresh_weather_performance,
+    rider_performance,
+)
+from charts_app.utils.weather_table import (
+    WEATHER_FORMAT_VERSION,
+    load_weather_table,
+    normalize_weather,
+    save_weather_table,
+    weather_labels,
+)
+
+CACHE_DIR = Path(__file__).resolve().parent / "utils" / "cache"
+
+UNFINISHED = [
+    "C",
+    "DNA",
+    "DNP",
+    "DNPQ",
+    "DNQ",
+    "DNS",
+    "DSQ",
+    "EX",
+    "NC",
+    "Ret",
+    "Ret†",
+    "WD",
+]
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class ChartsTestCase(SimpleTestCase):
+    # every test starts with empty shared cache, not touching the real one
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+class TempDirMixin:
+    # a temporary directory of every test (self.tmp_dir), removed after it
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+
+class ChartCacheMixin(TempDirMixin):
+    # charts of the views are cached in the test's temporary directory
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(views, "chart_cache", ChartCache(self.tmp_dir.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+def cached_seasons() -> list:
+    # years with riders standings stored in cache
+    return sorted(
+        int(file.name.split("-")[0]) for file in CACHE_DIR.glob("*-MotoGP-riders.pkl")
+    )
+
+
+def raw_riders(year: int) -> pd.DataFrame:
+    return pd.read_pickle(CACHE_DIR / f"{year}-MotoGP-riders.pkl")
+
+
+def numeric_riders(df: pd.DataFrame) -> pd.DataFrame:
+    # Cleaning steps done before merging duplicated riders
+    columns_to_remove = ["Bike", "CRT", "Open", "Pos.", "Pos", "Pts", "Team"]
+    df = df.drop(columns=[c for c in columns_to_remove if c in df.columns])
+    df = df.drop(df.tail(2).index)
+    df = df.replace(UNFINISHED, np.nan).set_index("Rider")
+    return df.apply(pd.to_numeric)
+
+
+def legacy_cleaning(df: pd.DataFrame) -> pd.DataFrame:
+    # reference: per-rider merge loop used before vectorized Cleaning
+    df = numeric_riders(df)
+
+    def choose_one(series):
+        if not series.dropna().empty:
+            return series.dropna().iloc[0]
+        else:
+            return np.nan
+
+    riders_list = []
+    merged_rows_list = []
+    for rider in df.index.unique():
+        current_rows = df.loc[rider]
+        if isinstance(current_rows, pd.DataFrame):
+            merged_row = current_rows.apply(choose_one)
+        else:
+            merged_row = current_rows
+        merged_rows_list.append(merged_row)
+        riders_list.append(rider)
+
+    df_cleaned = pd.concat(merged_rows_list, axis=1).transpose()
+    df_cleaned.index = riders_list
+    df_cleaned.columns = df.columns
+    return df_cleaned
+
+
+def legacy_history(year: int, results: pd.DataFrame) -> pd.DataFrame:
+    # reference: per-cell average of 3 previous seasons used before, with
+    # tracks matched by circuit (mean of a season's races at the circuit)
+    results_hist = [(year - n, Cleaning(raw_riders(year - n))) for n in (3, 2, 1)]
+    results_hist_avrg = results.map(lambda x: np.nan)
+
+    for rider in results_hist_avrg.index:
+        for track in results_hist_avrg.columns:
+            circuit = circuit_id(track, year)
+            extracted = []
+            for prev_year, prev in results_hist:
+                same_circuit = [
+                    c for c in prev.columns if circuit_id(c, prev_year) == circuit
+                ]
+                if rider not in prev.index or not same_circuit:
+                    break
+                values = prev.loc[rider, same_circuit].dropna()
+                extracted.append(values.mean() if len(values) else np.nan)
+            else:
+                mean_list = [_ for _ in extracted if pd.notna(_)]
+                if len(mean_list) > 1:
+                    results_hist_avrg.at[rider, track] = np.mean(mean_list)
+
+    return results_hist_avrg
+
+
+def legacy_weather_series(weather: dict) -> tuple:
+    # reference: weather parsed from strings on every render, used before
+    x, y_air_temp, y_ground_temp = [], [], []
+    for w in weather:
+        clouds = weather[w]["clouds"]
+        clouds = "Hv-Rain" if clouds == "Heavy-Rain" else clouds
+        clouds = "Lt-Rain" if clouds == "Light-Rain" else clouds
+        clouds = "Prt-Cloud" if clouds == "Partly-Cloudy" else clouds
+        x.append(
+            f"{w}\n{clouds}\n{weather[w]['humidity']}\n{weather[w]['track_wet']}"
+        )
+        for values, field in [(y_ground_temp, "ground_temp"), (y_air_temp, "air_temp")]:
+            try:
+                values.append(int(weather[w][field][:-1]))
+            except ValueError:
+                values.append(np.nan)
+    return x, y_air_temp, y_ground_temp
+
+
+class CleaningTests(ChartsTestCase):
+    def test_matches_legacy_merge_for_all_cached_seasons(self):
+        for year in cached_seasons():
+            with self.subTest(year=year):
+                cleaned = Cleaning(raw_riders(year))
+                expected = legacy_cleaning(raw_riders(year))
+
+                pd.testing.assert_frame_equal(cleaned, expected, check_dtype=False)
+                self.assertTrue(cleaned.index.is_unique)
+
+    def test_keeps_numeric_dtypes(self):
+        for year in cached_seasons():
+            with self.subTest(year=year):
+                cleaned = Cleaning(raw_riders(year))
+                expected = numeric_riders(raw_riders(year)).dtypes
+
+                pd.testing.assert_series_equal(cleaned.dtypes, expected)
+
+
+class HistoryTests(ChartsTestCase):
+    def test_matches_legacy_average_for_all_cached_seasons(self):
+        seasons = cached_seasons()
+        for year in seasons:
+            if not all(year - n in seasons for n in (1, 2, 3)):
+                continue
+            with self.subTest(year=year):
+                results = Cleaning(raw_riders(year))
+                hist = GatheringReasultsFrom(year).history(results)
+
+                pd.testing.assert_frame_equal(hist, legacy_history(year, results))
+
+    def test_matches_races_by_circuit(self):
+        # British GP moved from Donington to Silverstone in 2010
+        results = Cleaning(raw_riders(2010))
+        hist = GatheringReasultsFrom(2010).history(results)
+        self.assertEqual(hist["GBR"].count(), 0)
+        self.assertGreater(hist["ITA"].count(), 0)
+
+    def test_configurable_window(self):
+        results = Cleaning(raw_riders(2019))
+        hist_5 = GatheringReasultsFrom(2019).history(results, seasons=5)
+        hist_5_strict = GatheringReasultsFrom(2019).history(
+            results, seasons=5, min_finished=5
+        )
+
+        self.assertEqual(hist_5.shape, results.shape)
+        self.assertLessEqual(hist_5_strict.count().sum(), hist_5.count().sum())
+        self.assertTrue(((hist_5 >= 1) | hist_5.isna()).all().all())
+
+
+class ExtractRidersTableTests(ChartsTestCase):
+    PAGE = """<html><body>
+        <table class="wikitable"><tr><th>Team</th><th>Rider</th></tr>
+            <tr><td>Ducati</td><td>Andrea Dovizioso</td></tr></table>
+        <table class="infobox"><tr><th>Bike</th></tr><tr><td>none</td></tr></table>
+        <table class="wikitable sortable">
+            <tr><th>Pos.</th><th>Rider</th><th><a href="#">Bike</a></th>
+                <th>QAT</th><th>ARG</th><th>Pts</th></tr>
+            <tr><td>1</td><td>Marc Márquez</td><td>Honda</td>
+                <td>2<sup>P</sup></td><td>1<sup>F</sup></td><td>45</td></tr>
+            <tr><td>2</td><td>Álex Rins</td><td>Suzuki</td>
+                <td>Ret</td><td>5</td><td>11</td></tr>
+        </table>
+    </body></html>"""
+
+    def test_finds_standings_table(self):
+        df_riders = extract_riders_table(self.PAGE.encode())
+
+        self.assertEqual(
+            list(df_riders.columns), ["Pos.", "Rider", "Bike", "QAT", "ARG", "Pts"]
+        )
+        self.assertEqual(list(df_riders["Rider"]), ["Marc Márquez", "Álex Rins"])
+        # <sup> notes are not glued to the results
+        self.assertEqual(list(df_riders["QAT"].astype(str)), ["2", "Ret"])
+        self.assertEqual(list(df_riders["ARG"]), [1, 5])
+
+    def test_no_standings_table(self):
+        self.assertTrue(extract_riders_table(b"<html><p>none</p></html>").empty)
+
+
+class SeasonStoreTests(TempDirMixin, ChartsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.results = {year: Cleaning(raw_riders(year)) for year in cached_seasons()}
+        self.weather = {}
+        for file in CACHE_DIR.glob("*-MotoGP-weather.json"):
+            with open(file, "r") as f:
+                self.weather[int(file.name.split("-")[0])] = json.load(f)
+
+        self.store = SeasonStore.build(self.results, self.weather, self.tmp_dir.name)
+
+    def test_results_round_trip(self):
+        self.assertEqual(
+            self.store.seasons(), sorted(set(self.results) | set(self.weather))
+        )
+        for year, expected in self.results.items():
+            with self.subTest(year=year):
+                pd.testing.assert_frame_equal(self.store.results(year), expected)
+
+    def test_weather_round_trip(self):
+        for year, expected in self.weather.items():
+            with self.subTest(year=year):
+                self.assertEqual(self.store.weather(year), expected)
+
+    def test_missing_season(self):
+        self.assertIsNone(self.store.results(1990))
+        self.assertIsNone(self.store.weather(1990))
+        self.assertIsNone(SeasonStore(self.tmp_dir.name + "/missing").results(2019))
+
+    def test_rebuild_is_switched_to_at_once(self):
+        self.store.results(2019)
+        SeasonStore.build({2019: self.results[2018]}, {}, self.tmp_dir.name)
+        SeasonStore.build({2019: self.results[2017]}, {}, self.tmp_dir.name)
+
+        # index and results of one build, never of two
+        pd.testing.assert_frame_equal(self.store.results(2019), self.results[2017])
+        self.assertIsNone(self.store.results(2018))
+        # current and previous builds are kept
+        self.assertEqual(len(list(Path(self.tmp_dir.name).glob("build-*"))), 2)
+
+    def test_rebuilds_are_read_whole_by_threads(self):
+        # 2019 stored from tables of other sizes, rebuilt while read
+        tables = [self.results[2018], self.results[2017]]
+        stop = threading.Event()
+
+        def read():
+            read_tables = []
+            while not stop.is_set():
+                read_tables.append(self.store.results(2019))
+            return read_tables
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            readers = [executor.submit(read) for _ in range(4)]
+            for nr in range(40):
+                SeasonStore.build({2019: tables[nr % 2]}, {}, self.tmp_dir.name)
+            stop.set()
+
+        # each read is a table of one build (or none, while switching)
+        tables.append(self.results[2019])
+        for reader in readers:
+            for df in reader.result():
+                self.assertTrue(df is None or any(df.equals(t) for t in tables))
+
+    def test_season_changed_since_built_is_not_read(self):
+        store = SeasonStore.build(
+            {2019: self.results[2019]},
+            {2019: self.weather[2019]},
+            self.tmp_dir.name,
+            sources={2019: {"riders": "v1", "weather": "v1"}},
+        )
+
+        self.assertIsNotNone(store.results(2019, source="v1"))
+        self.assertIsNotNone(store.weather(2019, source="v1"))
+        self.assertIsNone(store.results(2019, source="v2"))
+        self.assertIsNone(store.weather(2019, source="v2"))
+
+        # standings are read from cached riders, not from older store
+        with mock.patch.object(SeasonStore, "default", return_value=store):
+            MotoGP_utils.standings_memo.clear()
+            self.addCleanup(MotoGP_utils.standings_memo.clear)
+            with mock.patch.object(
+                MotoGP_utils, "Cleaning", side_effect=MotoGP_utils.Cleaning
+            ) as cleaning:
+                GatheringReasultsFrom(2019).standings()
+        cleaning.assert_called_once()
+
+
+class ChartCacheTests(TempDirMixin, ChartsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ChartCache(self.tmp_dir.name, max_entries=2)
+
+    def render(self, content):
+        return lambda path: Path(path).write_text(content)
+
+    def test_key_is_normalized(self):
+        self.assertEqual(chart_key(2019, "on", [5, 1]), chart_key(2019, True, [1, 5]))
+        self.assertNotEqual(
+            chart_key(2019, True, [1, 5]), chart_key(2019, False, [1, 5])
+        )
+        # historical results are never shown for first seasons
+        self.assertEqual(chart_key(2005, True, [1, 5]), chart_key(2005, False, [1, 5]))
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.cache.get("a"))
+        chart_file = self.cache.put("a", self.render("<svg>a</svg>"))
+
+        self.assertEqual(self.cache.get("a"), chart_file)
+        self.assertEqual(
+            (Path(self.tmp_dir.name) / chart_file).read_text(), "<svg>a</svg>"
+        )
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.put("a", self.render("a"))
+        self.cache.put("b", self.render("b"))
+        os.utime(self.cache._file("a"), ns=(1, 1))
+        os.utime(self.cache._file("b"), ns=(2, 2))
+
+        self.cache.get("a")  # "b" is now the least recently used
+        self.cache.put("c", self.render("c"))
+
+        self.assertTrue(self.cache._file("a").exists())
+        self.assertFalse(self.cache._file("b").exists())
+        self.assertTrue(self.cache._file("c").exists())
+
+    def test_chart_is_shared_between_workers(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        other_worker = ChartCache(tmp_dir.name)
+        render = mock.Mock(side_effect=self.render("<svg>a</svg>"))
+
+        self.cache.put("a", render)
+        chart_file = other_worker.get("a")
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual((Path(tmp_dir.name) / chart_file).read_text(), "<svg>a</svg>")
+
+    def test_shared_chart_expires(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        worker = ChartCache(self.tmp_dir.name, shared_timeout=0.2)
+
+        worker.put("a", self.render("<svg>a</svg>"))
+        time.sleep(0.3)
+
+        # evicted charts don't come back from the shared cache
+        self.assertIsNone(ChartCache(tmp_dir.name).get("a"))
+
+    def test_failed_render_leaves_nothing(self):
+        def render(path):
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            self.cache.put("a", render)
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(list(self.cache.path.iterdir()), [])
+
+
+class IndexViewTests(ChartCacheMixin, ChartsTestCase):
+    def test_chart_is_rendered_once_per_parameters(self):
+        data = {"year_chosen": 2019, "places_from": 1, "places_to": 5}
+        with mock.patch.object(
+            views, "plot_chart", side_effect=views.plot_chart
+        ) as plot_chart:
+            first = self.client.post(reverse("index"), data)
+            second = self.client.post(reverse("index"), data)
+
+        self.assertEqual(plot_chart.call_count, 1)
+        self.assertEqual(first.context["chart_file"], second.context["chart_file"])
+        self.assertTrue(
+            (Path(self.tmp_dir.name) / first.context["chart_file"]).exists()
+        )
+
+
+class ExportFormatsTests(ChartCacheMixin, ChartsTestCase):
+    def post(self, **data):
+        data = dict({"year_chosen": 2019, "places_from": 1, "places_to": 5}, **data)
+        return self.client.post(reverse("index"), data)
+
+    def test_each_format_is_cached_separately(self):
+        files = {
+            (output_format, dpi): self.post(output_format=output_format, dpi=dpi)
+            .context["chart_file"]
+            for output_format, dpi in [
+                ("svg", 72),
+                ("svg-min", 72),
+                ("png", 72),
+                ("png", 144),
+                ("webp", 72),
+            ]
+        }
+        self.assertEqual(len(set(files.values())), len(files))
+
+        def content(output_format, dpi=72):
+            return (Path(self.tmp_dir.name) / files[output_format, dpi]).read_bytes()
+
+        self.assertTrue(files["png", 72].endswith(".png"))
+        self.assertTrue(content("png").startswith(b"\x89PNG"))
+        self.assertEqual(content("webp")[8:12], b"WEBP")
+        self.assertGreater(len(content("png", 144)), len(content("png")))
+
+        # optimized SVG has text as text, and is smaller
+        self.assertIn(b"Riders' standings 2019</text>", content("svg-min"))
+        self.assertLess(len(content("svg-min")), len(content("svg")))
+
+    def test_optimized_svg_follows_matplotlib_svg_backend(self):
+        # optimized SVG's canvas and renderer are made from these methods of
+        # matplotlib's SVG backend, some of them private; fails when they're
+        # changed by an upgrade of matplotlib
+        from matplotlib.backends.backend_svg import FigureCanvasSVG, RendererSVG
+
+        def parameters(method):
+            return list(inspect.signature(method).parameters)
+
+        self.assertEqual(
+            parameters(FigureCanvasSVG.print_svg),
+            ["self", "filename", "bbox_inches_restore", "metadata"],
+        )
+        self.assertEqual(
+            parameters(RendererSVG.__init__),
+            [
+                "self",
+                "width",
+                "height",
+                "svgwriter",
+                "basename",
+                "image_dpi",
+                "metadata",
+            ],
+        )
+        self.assertEqual(
+            parameters(RendererSVG.draw_text),
+            ["self", "gc", "x", "y", "s", "prop", "angle", "ismath", "mtext"],
+        )
+        self.assertEqual(
+            parameters(RendererSVG._draw_text_as_text),
+            ["self", "gc", "x", "y", "s", "prop", "angle", "ismath", "mtext"],
+        )
+        self.assertEqual(parameters(RendererSVG._get_clip_attrs), ["self", "gc"])
+
+    def test_wrong_format(self):
+        for data in [
+            {"output_format": "gif"},
+            {"output_format": "png", "dpi": 100},
+            {"output_format": "png", "dpi": "x"},
+        ]:
+            with self.subTest(**data):
+                self.assertEqual(
+                    self.post(**data).context["error_msg"], "error in input data"
+                )
+
+
+class PlottingTests(TempDirMixin, ChartsTestCase):
+    def plot(self, year, riders_pos, name, **kwargs):
+        path = Path(self.tmp_dir.name) / name
+        plot_chart(year, True, riders_pos, output_path=path, **kwargs)
+        return path.read_bytes()
+
+    def test_markers_and_numbers_are_batched(self):
+        figures = []
+        save_figure = MotoGP_utils.save_figure
+
+        def saved_figure(fig, *args, **kwargs):
+            # artists of the render, before they're removed
+            ax_riders = fig.axes[0]
+            figures.append(
+                (
+                    [len(c.get_offsets()) for c in ax_riders.collections],
+                    [
+                        a
+                        for a in ax_riders.artists
+                        if isinstance(a, MotoGP_utils.MarkerNumbers)
+                    ],
+                    len(ax_riders.texts),
+                )
+            )
+            return save_figure(fig, *args, **kwargs)
+
+        with mock.patch.object(MotoGP_utils, "save_figure", side_effect=saved_figure):
+            svg = self.plot(2019, [1, 20], "chart.svg", output_format="svg-min")
+
+        markers, numbers, texts = figures[0]
+        standings = GatheringReasultsFrom(2019).standings().iloc[:20]
+        finished = standings.stack().dropna()
+        # history and season: one collection each, a marker per finish
+        self.assertEqual(len(markers), 2)
+        self.assertEqual(markers[1], len(finished))
+        # numbers in markers are one artist, text artists are riders' names
+        self.assertEqual(len(numbers), 1)
+        self.assertEqual(texts, standings.iloc[:, 0].count())
+        # but every number in a marker (white) is still drawn as text
+        _, air_temp, ground_temp = MotoGP_utils.weather_series(
+            GatheringReasultsFrom(2019).weather_table()
+        )
+        temps = np.concatenate([air_temp, ground_temp])
+        self.assertEqual(
+            len(re.findall(rb"fill: #ffffff[^>]*>\d+</text>", svg)),
+            len(finished) + np.count_nonzero(~np.isnan(temps)),
+        )
+
+    def test_renders_are_independent(self):
+        first = self.plot(2019, [1, 5], "first.png", output_format="png")
+        self.plot(2019, [1, 5], "first.svg")
+        self.plot(2018, [2, 12], "other.png", output_format="png")
+        self.assertEqual(
+            self.plot(2019, [1, 5], "again.png", output_format="png"), first
+        )
+
+        # no data is left in the figure drawn on
+        with MotoGP_utils.ChartTemplate.acquire() as template:
+            for ax in template.fig.axes:
+                self.assertEqual(len([*ax.lines, *ax.collections, *ax.patches]), 0)
+                self.assertEqual(len([*ax.texts, *ax.artists]), 0)
+                self.assertIsNone(ax.get_legend())
+
+
+class ComparisonTests(ChartCacheMixin, ChartsTestCase):
+    def test_seasons_are_drawn_in_one_grid(self):
+        figures = []
+        with mock.patch.object(
+            MotoGP_utils,
+            "save_figure",
+            side_effect=lambda fig, *args, **kwargs: figures.append(fig),
+        ):
+            plot_chart(
+                2021,
+                False,
+                [1, 5],
+                output_path=Path(self.tmp_dir.name) / "grid.svg",
+                compare_to=2018,
+            )
+
+        self.assertEqual(len(figures), 1)
+        panels = [ax for ax in figures[0].axes if ax.get_visible()]
+        self.assertEqual(
+            [ax.get_title() for ax in panels], ["2018", "2019", "2020", "2021"]
+        )
+        # places are shared by all panels
+        self.assertTrue(all(ax.get_ylim() == panels[0].get_ylim() for ax in panels))
+
+        # a rider has the same color in every season
+        colors = {}
+        for ax in panels:
+            for line in ax.lines:
+                colors.setdefault(line.get_label(), set()).add(line.get_color())
+        self.assertTrue(all(len(color) == 1 for color in colors.values()))
+        self.assertEqual(
+            [text.get_text() for text in figures[0].legends[0].texts], list(colors)
+        )
+
+    def test_seasons_are_gathered_in_parallel(self):
+        threads = set()
+        standings = GatheringReasultsFrom.standings
+
+        def gathered(season):
+            threads.add(threading.current_thread().name)
+            time.sleep(0.05)
+            return standings(season)
+
+        with mock.patch.object(
+            GatheringReasultsFrom, "standings", autospec=True, side_effect=gathered
+        ):
+            seasons = MotoGP_utils.gather_seasons([2017, 2018, 2019])
+
+        self.assertEqual(list(seasons), [2017, 2018, 2019])
+        self.assertGreater(len(threads), 1)
+        pd.testing.assert_frame_equal(
+            seasons[2018], GatheringReasultsFrom(2018).standings()
+        )
+
+    def test_key_is_of_the_range(self):
+        key = chart_key(2019, False, [1, 5], compare_to=2021)
+        self.assertEqual(chart_key(2021, False, [1, 5], compare_to=2019), key)
+        self.assertNotEqual(chart_key(2019, False, [1, 5], compare_to=2020), key)
+        self.assertNotEqual(chart_key(2019, False, [1, 5]), key)
+        # one season is not a comparison
+        self.assertEqual(
+            chart_key(2019, False, [1, 5], compare_to=2019),
+            chart_key(2019, False, [1, 5]),
+        )
+        with self.assertRaises(ValueError):
+            chart_key(2010, False, [1, 5], compare_to=2023)
+
+    def test_view_draws_grid_on_server(self):
+        data = {
+            "year_chosen": 2019,
+            "compare_to": 2020,
+            "places_from": 1,
+            "places_to": 3,
+            "render_mode": "client",
+        }
+        with mock.patch.object(
+            views, "plot_chart", side_effect=views.plot_chart
+        ) as plot_chart:
+            response = self.client.post(reverse("index"), data)
+            too_many = self.client.post(
+                reverse("index"), {**data, "year_chosen": 2010, "compare_to": 2023}
+            )
+            not_a_year = self.client.post(reverse("index"), {**data, "compare_to": "x"})
+
+        self.assertIn("chart_file", response.context)
+        self.assertEqual(plot_chart.call_args.kwargs["compare_to"], 2020)
+        self.assertEqual(too_many.context["error_msg"], "error in input data")
+        self.assertEqual(not_a_year.context["error_msg"], "error in input data")
+
+
+class ClientRenderingTests(ChartsTestCase):
+    DATA = {
+        "year_chosen": 2019,
+        "hist_results": "on",
+        "places_from": 2,
+        "places_to": 4,
+        "render_mode": "client",
+    }
+
+    def test_browser_gets_data_instead_of_chart(self):
+        with mock.patch.object(views, "plot_chart") as plot_chart, mock.patch.object(
+            views, "chart_data", side_effect=views.chart_data
+        ) as chart_data:
+            first = self.client.post(reverse("index"), self.DATA)
+            second = self.client.post(reverse("index"), self.DATA)
+
+        plot_chart.assert_not_called()
+        self.assertEqual(chart_data.call_count, 1)
+        self.assertEqual(first.context["chart_data"], second.context["chart_data"])
+        self.assertContains(first, 'id="chart-data"')
+        self.assertNotContains(first, 'id="chart"')
+
+    def test_data_is_what_server_chart_draws(self):
+        data = self.client.post(reverse("index"), self.DATA).context["chart_data"]
+
+        season = GatheringReasultsFrom(2019)
+        standings = season.standings()
+        history = season.history(standings)
+        self.assertEqual(data["races"], standings.columns.tolist())
+        self.assertEqual(
+            [rider["name"] for rider in data["riders"]], standings.index[1:4].tolist()
+        )
+        self.assertEqual([rider["position"] for rider in data["riders"]], [2, 3, 4])
+        for rider in data["riders"]:
+            np.testing.assert_array_equal(
+                np.array(rider["results"], dtype=float), standings.loc[rider["name"]]
+            )
+            np.testing.assert_array_equal(
+                np.array(rider["history"], dtype=float), history.loc[rider["name"]]
+            )
+        self.assertEqual(len(data["weather"]["labels"]), len(season.weather()))
+
+        # NaN isn't valid JSON
+        json.loads(json.dumps(data, allow_nan=False))
+
+
+class ChartJobsTests(ChartCacheMixin, ChartsTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(views, "chart_jobs", ChartJobs(max_workers=2))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(views.chart_jobs.shutdown)
+
+    def wait_for(self, job_id, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = views.chart_jobs.get(job_id)
+            if job["status"] in ("done", "failed"):
+                return job
+            time.sleep(0.05)
+        self.fail(f"job {job_id} not finished")
+
+    def test_identical_jobs_in_flight_are_started_once(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def render(progress):
+            started.set()
+            release.wait(10)
+            return "charts/x.svg"
+
+        first = views.chart_jobs.submit("key", render)
+        started.wait(10)
+        second = views.chart_jobs.submit("key", mock.Mock())
+        release.set()
+
+        self.assertEqual(first["id"], second["id"])
+        self.assertEqual(self.wait_for(first["id"])["chart_file"], "charts/x.svg")
+
+    def test_job_is_stored_before_it_is_published(self):
+        add = shared_cache().add
+
+        def checked_add(key, value, *args, **kwargs):
+            if ":job-key:" in key:
+                self.assertIsNotNone(views.chart_jobs.get(value))
+            return add(key, value, *args, **kwargs)
+
+        with mock.patch.object(shared_cache(), "add", side_effect=checked_add) as added:
+            job = views.chart_jobs.submit("key", lambda progress: "charts/x.svg")
+        added.assert_called()
+        self.assertEqual(self.wait_for(job["id"])["status"], "done")
+
+    def test_job_with_expired_state_is_replaced(self):
+        cache = shared_cache()
+        cache.set(f"{KEY_PREFIX}:job-key:key", "expired", JOB_TIMEOUT)
+
+        release = threading.Event()
+        job = views.chart_jobs.submit(
+            "key", lambda progress: release.wait(10) and "charts/x.svg"
+        )
+        self.assertEqual(cache.get(f"{KEY_PREFIX}:job-key:key"), job["id"])
+        release.set()
+        self.assertEqual(self.wait_for(job["id"])["chart_file"], "charts/x.svg")
+        self.assertIsNone(cache.get(f"{KEY_PREFIX}:job-key:key"))
+
+    def test_failed_job_reports_error(self):
+        def render(progress):
+            raise ValueError("bad season")
+
+        job = views.chart_jobs.submit("key", render)
+
+        self.assertEqual(
+            self.wait_for(job["id"]),
+            dict(job, status="failed", error="error in input data"),
+        )
+
+    def test_unexpected_error_is_logged_not_reported(self):
+        def render(progress):
+            raise OSError("/srv/motogp/cache/2019-MotoGP-riders.pkl is locked")
+
+        with self.assertLogs("charts_app.jobs", "ERROR") as logs:
+            job = views.chart_jobs.submit("key", render)
+            state = self.wait_for(job["id"])
+
+        self.assertEqual(state["error"], "chart could not be drawn")
+        self.assertIn("riders.pkl is locked", "\n".join(logs.output))
+
+    def test_async_post_returns_job_to_follow(self):
+        data = {"year_chosen": 2019, "places_from": 1, "places_to": 5, "async": 1}
+        response = self.client.post(reverse("index"), data)
+
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertIn(job["status"], ("queued", "running", "done"))
+        self.wait_for(job["id"])
+
+        status = self.client.get(job["status_url"]).json()
+        self.assertEqual(status["status"], "done")
+        self.assertTrue(status["chart_url"].endswith(".svg"))
+        chart_file = status["chart_url"].split("/charts_app/media/charts_app/")[1]
+        self.assertTrue((Path(self.tmp_dir.name) / chart_file).exists())
+
+        # chart is cached now, so the next job is done at once
+        again = self.client.post(reverse("index"), data).json()
+        self.assertEqual(again["status"], "done")
+        self.assertEqual(again["chart_url"], status["chart_url"])
+
+    async def test_events_stream_ends_when_job_is_done(self):
+        data = {"year_chosen": 2018, "places_from": 2, "places_to": 6, "async": 1}
+        job = (await self.async_client.post(reverse("index"), data)).json()
+
+        response = await self.async_client.get(job["events_url"])
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        events = [
+            json.loads(line[len("data: ") :])
+            for line in content.decode().splitlines()
+            if line.startswith("data: ")
+        ]
+
+        self.assertEqual(events[-1]["status"], "done")
+        self.assertEqual(
+            [event["status"] for event in events[:-1]],
+            [event["status"] for event in events[:-1] if event["status"] != "done"],
+        )
+
+    def test_unknown_job_is_not_found(self):
+        self.assertEqual(
+            self.client.get(reverse("job_status", args=["nope"])).status_code, 404
+        )
+        self.assertEqual(
+            self.client.get(reverse("job_events", args=["nope"])).status_code, 404
+        )
+
+
+class SeasonDataTests(ChartsTestCase):
+    def test_standings_are_sliced_by_riders_and_races(self):
+        response = self.client.get(
+            reverse("season_data", args=[2019, "standings"]),
+            {"riders": "5-2", "races": "3-6"},
+        )
+        standings = GatheringReasultsFrom(2019).standings().iloc[1:5, 2:6]
+
+        data = response.json()
+        self.assertEqual(data["index"], standings.index.tolist())
+        self.assertEqual(data["columns"], standings.columns.tolist())
+        expected = [
+            [None if np.isnan(value) else value for value in standings[column]]
+            for column in standings.columns
+        ]
+        self.assertEqual(data["data"], expected)
+
+    def test_history_matches_chart_data_as_csv(self):
+        response = self.client.get(
+            reverse("season_data", args=[2019, "history"]), {"format": "csv"}
+        )
+        season = GatheringReasultsFrom(2019)
+        history = season.history(season.standings())
+
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        df = pd.read_csv(StringIO(response.content.decode()), index_col=0)
+        pd.testing.assert_frame_equal(df, history, check_names=False)
+
+    def test_repeated_request_is_not_modified(self):
+        url = reverse("season_data", args=[2019, "weather"])
+        first = self.client.get(url, {"races": "1-3"})
+        again = self.client.get(url, {"races": "1-3"}, HTTP_IF_NONE_MATCH=first["ETag"])
+        other = self.client.get(url, {"races": "1-4"}, HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(len(first.json()["index"]), 3)
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(other.status_code, 200)
+
+    def test_response_is_gzipped_on_request(self):
+        response = self.client.get(
+            reverse("season_data", args=[2019, "standings"]),
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertTrue(response["ETag"].startswith('W/"'))
+
+    def test_wrong_parameters(self):
+        url = reverse("season_data", args=[2019, "standings"])
+        self.assertEqual(self.client.get(url, {"riders": "x"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"format": "xml"}).status_code, 400)
+        self.assertEqual(
+            self.client.get(reverse("season_data", args=[2019, "bikes"])).status_code,
+            404,
+        )
+        self.assertEqual(
+            self.client.get(reverse("season_data", args=[2005, "history"])).status_code,
+            400,
+        )
+
+
+class ConcurrentRenderingTests(TempDirMixin, ChartsTestCase):
+    YEARS = [2016, 2017, 2018, 2019, 2020, 2021, 2022, 2023]
+
+    def assertChartOf(self, path, year, riders_pos):
+        # every chart has to show its own year and riders only
+        svg = Path(path).read_text()
+        self.assertEqual(svg.count("Riders' standings"), 1)
+        self.assertIn(f"Riders' standings {year}", svg)
+
+        riders = GatheringReasultsFrom(year).standings().index
+        first, last = riders_pos
+        self.assertIn(f"{first}. {riders[first - 1]}", svg)
+        self.assertIn(f"{last}. {riders[last - 1]}", svg)
+        self.assertNotIn(f"{last + 1}. {riders[last]}", svg)
+
+    def test_threads_dont_cross_contaminate(self):
+        jobs = [
+            (year, [1 + nr % 3, 4 + nr % 5], Path(self.tmp_dir.name) / f"{nr}.svg")
+            for nr, year in enumerate(self.YEARS * 2)
+        ]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(
+                executor.map(
+                    lambda job: plot_chart(job[0], True, job[1], output_path=job[2]),
+                    jobs,
+                )
+            )
+
+        for year, riders_pos, path in jobs:
+            with self.subTest(year=year, riders_pos=riders_pos):
+                self.assertChartOf(path, year, riders_pos)
+
+    def test_formats_are_saved_at_once(self):
+        # options of optimized SVG don't leak into other renders
+        jobs = [
+            (year, output_format, Path(self.tmp_dir.name) / f"{nr}.svg")
+            for nr, (year, output_format) in enumerate(
+                (year, output_format)
+                for year in self.YEARS[:4]
+                for output_format in ("svg", "svg-min")
+            )
+        ]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(
+                executor.map(
+                    lambda job: plot_chart(
+                        job[0], False, [1, 5], output_path=job[2], output_format=job[1]
+                    ),
+                    jobs,
+                )
+            )
+
+        for year, output_format, path in jobs:
+            with self.subTest(year=year, output_format=output_format):
+                self.assertChartOf(path, year, [1, 5])
+                self.assertEqual(
+                    "<text" in path.read_text(), output_format == "svg-min"
+                )
+
+    def test_process_pool(self):
+        pool = RenderPool(workers=2)
+        self.addCleanup(pool.shutdown)
+
+        futures = {
+            year: pool.submit(
+                Path(self.tmp_dir.name) / f"{year}.svg", year, False, [1, 5]
+            )
+            for year in self.YEARS[:4]
+        }
+        for year, future in futures.items():
+            future.result()
+            with self.subTest(year=year):
+                self.assertChartOf(
+                    Path(self.tmp_dir.name) / f"{year}.svg", year, [1, 5]
+                )
+
+
+class StubPulselive(ThreadingHTTPServer):
+    # local server replaying API responses recorded in cached weather files
+
+    def __init__(self, years):
+        super().__init__(("127.0.0.1", 0), StubPulseliveHandler)
+        self.responses = {"/seasons": []}
+        self.requests = []
+        self.failures = {}  # path: number of 503 responses before success
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+        for year in years:
+            with open(CACHE_DIR / f"{year}-MotoGP-weather.json", "r") as file:
+                races_weather = json.load(file)
+
+            self.responses["/seasons"].append({"id": f"s{year}", "year": year})
+            self.responses[f"/categories?seasonUuid=s{year}"] = [
+                {"id": f"c{year}-moto2", "name": "Moto2™"},
+                {"id": f"c{year}", "name": "MotoGP™"},
+            ]
+            events = [{"id": f"e{year}-test", "short_name": "JT1"}]
+            for short_name, weather in races_weather.items():
+                events.append({"id": f"e{year}-{short_name}", "short_name": short_name})
+                self.responses[
+                    f"/sessions?eventUuid=e{year}-{short_name}&categoryUuid=c{year}"
+                ] = [
+                    {"type": "FP1", "condition": {}},
+                    {
+                        "type": "RAC",
+                        "condition": {
+                            "track": weather["track_wet"],
+                            "air": weather["air_temp"],
+                            "humidity": weather["humidity"],
+                            "ground": weather["ground_temp"],
+                            "weather": weather["clouds"],
+                        },
+                    },
+                ]
+            self.responses[f"/events?seasonUuid=s{year}&isFinished=true"] = events
+
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/"
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StubPulseliveHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            failing = server.failures.get(self.path, 0)
+            if failing:
+                server.failures[self.path] -= 1
+
+        time.sleep(0.02)  # network latency
+        if failing:
+            self.send_response(503)
+            body = b""
+        elif self.path in server.responses:
+            self.send_response(200)
+            body = json.dumps(server.responses[self.path]).encode()
+        else:
+            self.send_response(404)
+            body = b""
+
+        with server.lock:
+            server.in_flight -= 1
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PulseliveClientTests(ChartsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = StubPulselive([2019, 2021])
+        self.addCleanup(self.server.stop)
+        self.client = PulseliveClient(self.server.url, max_workers=4, backoff=0)
+
+    def cached_weather(self, year):
+        with open(CACHE_DIR / f"{year}-MotoGP-weather.json", "r") as file:
+            return json.load(file)
+
+    def test_season_weather_matches_recorded(self):
+        for year in (2019, 2021):
+            with self.subTest(year=year):
+                races_weather = self.client.season_weather(year)
+
+                self.assertEqual(races_weather, self.cached_weather(year))
+                self.assertEqual(list(races_weather), list(self.cached_weather(year)))
+
+    def test_concurrency_is_bounded(self):
+        self.client.season_weather(2019)
+
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(self.server.max_in_flight, 4)
+
+    def test_seasons_and_categories_are_fetched_once(self):
+        self.client.season_weather(2019)
+        self.client.season_weather(2019)
+        self.client.season_weather(2021)
+
+        self.assertEqual(self.server.requests.count("/seasons"), 1)
+        self.assertEqual(self.server.requests.count("/categories?seasonUuid=s2019"), 1)
+
+    def test_retries_failed_requests(self):
+        path = "/sessions?eventUuid=e2019-QAT&categoryUuid=c2019"
+        self.server.failures[path] = 2
+
+        races_weather = self.client.season_weather(2019)
+
+        self.assertEqual(races_weather["QAT"], self.cached_weather(2019)["QAT"])
+        self.assertEqual(self.server.requests.count(path), 3)
+
+    def test_gives_up_after_retries(self):
+        client = PulseliveClient(self.server.url, retries=1, backoff=0)
+        self.server.failures["/seasons"] = 5
+
+        with self.assertRaises(RequestException):
+            client.season_weather(2019)
+
+    def test_unknown_season(self):
+        with self.assertRaises(ValueError):
+            self.client.season_weather(1990)
+
+
+class WarmCacheTests(ChartsTestCase):
+    def warm_cache(self, *args):
+        stdout = StringIO()
+        call_command("warm_cache", *args, "--skip-store", stdout=stdout, stderr=stdout)
+        return stdout.getvalue()
+
+    def test_skips_cached_seasons(self):
+        with mock.patch.object(warm_cache, "warm_season") as warm_season:
+            output = self.warm_cache("--from", "2018", "--to", "2019")
+
+        warm_season.assert_not_called()
+        self.assertIn("2018: fresh, skipped", output)
+        self.assertIn("2019: fresh, skipped", output)
+
+    def test_warms_missing_seasons_in_parallel(self):
+        missing = [
+            year
+            for year in range(2004, 2031)
+            if not GatheringReasultsFrom(year).is_fresh()
+        ]
+        timings = {"riders": 1.5, "weather": 0.25}
+
+        with mock.patch.object(
+            warm_cache, "warm_season", return_value=timings
+        ) as warm_season, mock.patch.object(warm_cache, "CURRENT_YEAR", 2030):
+            output = self.warm_cache("--from", "2004", "--to", "2030", "--jobs", "3")
+
+        self.assertEqual(
+            sorted(call.args[0] for call in warm_season.call_args_list), missing
+        )
+        self.assertIn(f"{missing[0]}: riders 1.50s, weather 0.25s", output)
+
+    def test_reports_failed_seasons(self):
+        with mock.patch.object(
+            warm_cache, "warm_season", side_effect=ValueError("no table")
+        ), mock.patch.object(warm_cache, "CURRENT_YEAR", 2030):
+            with self.assertRaisesMessage(CommandError, "2029, 2030"):
+                self.warm_cache("--from", "2029", "--to", "2030")
+
+
+class CurrentSeasonRefreshTests(ChartsTestCase):
+    YEAR = 2019
+
+    def setUp(self):
+        super().setUp()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+
+        self.gathering = GatheringReasultsFrom(self.YEAR)
+        self.gathering.CACHE_PATH = f"{tmp_dir.name}/"
+        self.riders_file, self.weather_file = self.gathering.cache_files()
+
+        with open(CACHE_DIR / f"{self.YEAR}-MotoGP-weather.json", "r") as file:
+            self.races_weather = json.load(file)
+
+        # pretend season is in progress
+        patcher = mock.patch.object(MotoGP_utils, "CURRENT_YEAR", self.YEAR)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def response(self, status_code, headers=None):
+        response = mock.Mock(status_code=status_code, headers=headers or {})
+        response.raise_for_status.return_value = None
+        return response
+
+    def test_riders_not_checked_again_within_ttl(self):
+        raw_riders(self.YEAR).to_pickle(self.riders_file)
+        self.gathering._update_meta(riders_checked=time.time())
+
+        with mock.patch.object(MotoGP_utils.requests, "get") as get:
+            self.gathering.riders()
+
+        get.assert_not_called()
+
+    def test_stale_riders_are_checked_with_conditional_request(self):
+        raw_riders(self.YEAR).to_pickle(self.riders_file)
+        self.gathering._update_meta(
+            riders_checked=time.time() - MotoGP_utils.CURRENT_SEASON_TTL - 1,
+            riders_etag='"abc"',
+            riders_last_modified="Sun, 01 Sep 2019 10:00:00 GMT",
+        )
+
+        with mock.patch.object(
+            MotoGP_utils.requests, "get", return_value=self.response(304)
+        ) as get:
+            df_riders = self.gathering.riders()
+
+        headers = get.call_args.kwargs["headers"]
+        self.assertEqual(headers["If-None-Match"], '"abc"')
+        self.assertEqual(headers["If-Modified-Since"], "Sun, 01 Sep 2019 10:00:00 GMT")
+        pd.testing.assert_frame_equal(df_riders, raw_riders(self.YEAR))
+        self.assertFalse(self.gathering.is_stale("riders"))
+
+    def test_served_version_changes_when_data_is_due_to_be_checked(self):
+        raw_riders(self.YEAR).to_pickle(self.riders_file)
+        with open(self.weather_file, "w") as file:
+            json.dump(self.races_weather, file)
+        checked = time.time()
+        self.gathering._update_meta(riders_checked=checked, weather_checked=checked)
+        fresh = self.gathering.served_version()
+        self.assertEqual(fresh, self.gathering.data_version())
+
+        # a chart (or ETag) made before isn't served past the TTL
+        with mock.patch.object(
+            MotoGP_utils.time,
+            "time",
+            return_value=checked + MotoGP_utils.CURRENT_SEASON_TTL + 1,
+        ):
+            stale = self.gathering.served_version()
+        self.assertNotEqual(stale, fresh)
+
+        # checked again, data unchanged: same version as before
+        self.gathering._update_meta(riders_checked=time.time())
+        self.gathering._update_meta(weather_checked=time.time())
+        self.assertEqual(self.gathering.served_version(), fresh)
+
+    def test_stale_riders_served_when_page_is_unavailable(self):
+        raw_riders(self.YEAR).to_pickle(self.riders_file)
+
+        with mock.patch.object(
+            MotoGP_utils.requests, "get", side_effect=RequestException
+        ):
+            df_riders = self.gathering.riders()
+
+        pd.testing.assert_frame_equal(df_riders, raw_riders(self.YEAR))
+
+    def test_past_season_is_never_refetched(self):
+        raw_riders(self.YEAR).to_pickle(self.riders_file)
+        self.gathering._update_meta(riders_checked=time.time() - 10**8)
+
+        with mock.patch.object(MotoGP_utils, "CURRENT_YEAR", self.YEAR + 1):
+            self.assertFalse(self.gathering.is_stale("riders"))
+
+        # unless it was cached while still in progress
+        self.gathering._update_meta(
+            riders_checked=datetime(self.YEAR, 6, 1).timestamp()
+        )
+        with mock.patch.object(MotoGP_utils, "CURRENT_YEAR", self.YEAR + 1):
+            self.assertTrue(self.gathering.is_stale("riders"))
+
+    def test_only_new_races_weather_is_fetched(self):
+        server = StubPulselive([self.YEAR])
+        self.addCleanup(server.stop)
+        client = PulseliveClient(server.url)
+
+        # cache holds first 5 races of the season
+        known = dict(list(self.races_weather.items())[:5])
+        with open(self.weather_file, "w") as file:
+            json.dump(known, file)
+
+        with mock.patch.object(
+            MotoGP_utils.pulselive, "default_client", return_value=client
+        ):
+            races_weather = self.gathering.weather()
+
+        sessions = [path for path in server.requests if path.startswith("/sessions")]
+        self.assertEqual(len(sessions), len(self.races_weather) - 5)
+        self.assertFalse(
+            any(f"-{race}&" in path for race in known for path in sessions)
+        )
+        self.assertEqual(list(races_weather), list(self.races_weather))
+        with open(self.weather_file, "r") as file:
+            self.assertEqual(json.load(file), self.races_weather)
+
+        # typed weather is made when weather is cached
+        table = load_weather_table(
+            self.gathering.weather_table_file(),
+            source=MotoGP_utils.file_version(self.weather_file),
+        )
+        self.assertEqual(table["race"].tolist(), list(self.races_weather))
+
+
+class LRUMemoTests(ChartsTestCase):
+    def test_hits_misses_and_eviction(self):
+        memo = LRUMemo(max_entries=2)
+        compute = mock.Mock(side_effect=lambda: {"value": compute.call_count})
+
+        self.assertEqual(memo.get("a", compute), {"value": 1})
+        self.assertEqual(memo.get("a", compute), {"value": 1})
+        memo.get("b", compute)
+        memo.get("a", compute)  # "b" is now the least recently used
+        memo.get("c", compute)
+        memo.get("b", compute)
+
+        self.assertEqual(compute.call_count, 4)
+        self.assertEqual(memo.stats(), {"entries": 2, "hits": 2, "misses": 4})
+
+    def test_returns_copies(self):
+        memo = LRUMemo()
+        memo.get("a", lambda: {"value": [1]})["value"].append(2)
+
+        self.assertEqual(memo.get("a", mock.Mock()), {"value": [1]})
+
+
+class SeasonMemoTests(ChartsTestCase):
+    def setUp(self):
+        super().setUp()
+        MotoGP_utils.standings_memo.clear()
+        MotoGP_utils.weather_memo.clear()
+
+    def test_season_is_cleaned_once(self):
+        with mock.patch.object(
+            MotoGP_utils, "Cleaning", side_effect=MotoGP_utils.Cleaning
+        ) as cleaning, mock.patch.object(
+            MotoGP_utils.SeasonStore, "default", return_value=SeasonStore("/missing")
+        ):
+            first = GatheringReasultsFrom(2019).standings()
+            first.drop(index=first.index[5:], inplace=True)
+            second = GatheringReasultsFrom(2019).standings()
+
+        self.assertEqual(cleaning.call_count, 1)
+        pd.testing.assert_frame_equal(second, Cleaning(raw_riders(2019)))
+        self.assertEqual(MotoGP_utils.standings_memo.stats()["hits"], 1)
+
+    def test_consecutive_history_requests_share_seasons(self):
+        for year in (2019, 2020):
+            GatheringReasultsFrom(year).history(GatheringReasultsFrom(year).standings())
+
+        # 2016-2019 and 2017-2020: 2017, 2018 and 2019 loaded once
+        self.assertEqual(
+            MotoGP_utils.standings_memo.stats(),
+            {"entries": 5, "hits": 3, "misses": 5},
+        )
+
+    def test_weather_is_memoized(self):
+        first = GatheringReasultsFrom(2019).weather()
+        first["QAT"]["air_temp"] = "99º"
+
+        self.assertEqual(
+            GatheringReasultsFrom(2019).weather()["QAT"]["air_temp"], "18º"
+        )
+        self.assertEqual(MotoGP_utils.weather_memo.stats()["hits"], 1)
+
+
+class SharedCacheTests(ChartsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.workers = []
+        for _ in range(5):
+            tmp_dir = tempfile.TemporaryDirectory()
+            self.addCleanup(tmp_dir.cleanup)
+            gathering = GatheringReasultsFrom(2019)
+            gathering.CACHE_PATH = f"{tmp_dir.name}/"
+            self.workers.append(gathering)
+
+    def test_only_one_worker_scrapes_missing_season(self):
+        def scrape(df_cached):
+            time.sleep(0.3)
+            content = BytesIO()
+            raw_riders(2019).to_pickle(content)
+            return content.getvalue()
+
+        with mock.patch.object(
+            GatheringReasultsFrom, "_scrape_riders", side_effect=scrape, autospec=False
+        ) as scrape_riders:
+            with ThreadPoolExecutor(max_workers=5) as executor:
+                results = list(executor.map(lambda w: w.riders(), self.workers))
+
+        self.assertEqual(scrape_riders.call_count, 1)
+        for df_riders, worker in zip(results, self.workers):
+            pd.testing.assert_frame_equal(df_riders, raw_riders(2019))
+            # every worker keeps its own copy, with the same data version
+            self.assertEqual(
+                worker.data_version().split(":")[0],
+                self.workers[0].data_version().split(":")[0],
+            )
+
+    def test_weather_fetched_by_other_worker(self):
+        races_weather = {"QAT": {"air_temp": "18º"}}
+        with mock.patch.object(
+            GatheringReasultsFrom,
+            "_fetch_weather",
+            return_value=json.dumps(races_weather).encode(),
+        ) as fetch_weather:
+            self.assertEqual(self.workers[0].weather(), races_weather)
+            self.assertEqual(self.workers[1].weather(), races_weather)
+
+        self.assertEqual(fetch_weather.call_count, 1)
+        with open(self.workers[1].cache_files()[1], "r") as file:
+            self.assertEqual(json.load(file), races_weather)
+
+    def file_cache(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        return override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": tmp_dir.name,
+                }
+            }
+        )
+
+    def test_file_cache_is_locked_by_one_worker(self):
+        computed = []
+        barrier = threading.Barrier(5)
+
+        def compute():
+            computed.append(threading.current_thread().name)
+            time.sleep(0.3)
+            return b"season"
+
+        def worker(_):
+            barrier.wait()
+            return get_or_set_locked("2019-MotoGP-riders.pkl", compute, poll=0.05)
+
+        # FileBasedCache.add() isn't atomic: has_key() and set() apart
+        has_key = FileBasedCache.has_key
+
+        def slow_has_key(cache, *args, **kwargs):
+            result = has_key(cache, *args, **kwargs)
+            time.sleep(0.05)
+            return result
+
+        with self.file_cache(), mock.patch.object(
+            FileBasedCache, "has_key", slow_has_key
+        ):
+            with ThreadPoolExecutor(max_workers=5) as executor:
+                results = list(executor.map(worker, range(5)))
+
+        self.assertEqual(len(computed), 1)
+        self.assertEqual(results, [b"season"] * 5)
+
+    def test_file_lock_of_killed_worker_is_broken(self):
+        with self.file_cache():
+            cache = shared_cache()
+            release = _file_lock(cache, "motogp:a:lock", lock_timeout=60)
+            self.assertIsNone(_file_lock(cache, "motogp:a:lock", lock_timeout=60))
+
+            # holder never released it
+            lock_file = next(Path(cache._dir).glob("*.lock"))
+            os.utime(lock_file, (time.time() - 120, time.time() - 120))
+            self.assertEqual(
+                get_or_set_locked("a", lambda: 1, lock_timeout=60, poll=0.01), 1
+            )
+            release()
+
+
+class MetricsTests(ChartsTestCase):
+    def test_prometheus_format(self):
+        registry = Metrics(buckets=(0.1, 1))
+        registry.cache("riders", True)
+        registry.cache("riders", True)
+        registry.cache("riders", False)
+        registry.observe("motogp_stage_seconds", 0.5, stage="plotting")
+        registry.observe("motogp_stage_seconds", 2, stage="plotting")
+
+        self.assertEqual(
+            registry.render([("motogp_memo_entries", {"memo": "weather"}, 3)]),
+            "# HELP motogp_stage_seconds Time spent in a stage of chart pipeline\n"
+            "# TYPE motogp_stage_seconds histogram\n"
+            'motogp_stage_seconds_bucket{stage="plotting",le="0.1"} 0\n'
+            'motogp_stage_seconds_bucket{stage="plotting",le="1"} 1\n'
+            'motogp_stage_seconds_bucket{stage="plotting",le="+Inf"} 2\n'
+            'motogp_stage_seconds_sum{stage="plotting"} 2.5\n'
+            'motogp_stage_seconds_count{stage="plotting"} 2\n'
+            "# HELP motogp_cache_total Cache lookups by layer and result\n"
+            "# TYPE motogp_cache_total counter\n"
+            'motogp_cache_total{layer="riders",result="hit"} 2\n'
+            'motogp_cache_total{layer="riders",result="miss"} 1\n'
+            "# TYPE motogp_memo_entries gauge\n"
+            'motogp_memo_entries{memo="weather"} 3\n',
+        )
+
+    def test_disabled_records_nothing(self):
+        registry = Metrics(enabled=False)
+        with registry.stage("plotting"), registry.upstream("wikipedia"):
+            registry.cache("riders", True)
+
+        self.assertIs(registry.stage("plotting"), registry.stage("history"))
+        self.assertEqual(registry.render(), "\n")
+
+    def test_chart_stages_are_exported(self):
+        metrics.clear()
+        self.addCleanup(metrics.clear)
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+
+        with self.assertLogs("charts_app.metrics", "DEBUG") as logs:
+            plot_chart(2019, True, [1, 5], output_path=Path(tmp_dir.name) / "x.svg")
+        content = self.client.get(reverse("metrics")).content.decode()
+
+        for stage in ["weather", "riders", "history", "plotting"]:
+            self.assertIn(f'motogp_stage_seconds_count{{stage="{stage}"}} 1', content)
+        self.assertIn("motogp_memo_hits", content)
+        self.assertTrue(
+            any("stage=plotting" in line for line in logs.output), logs.output
+        )
+
+
+class ResultsIndexTests(ChartCacheMixin, ChartsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.index = ResultsIndex(self.tmp_dir.name)
+        self.standings = {year: Cleaning(raw_riders(year)) for year in cached_seasons()}
+
+    def update(self, versions):
+        standings = mock.Mock(side_effect=raw_riders)
+        return self.index.update(versions, standings, self.weather), standings
+
+    @staticmethod
+    def weather(year):
+        return GatheringReasultsFrom(year).weather_table(fetch=False)
+
+    def test_career_matches_season_tables(self):
+        self.update({year: "v1" for year in self.standings})
+
+        career = self.index.career("Valentino Rossi")
+        expected = [
+            (year, race, position)
+            for year, df in sorted(self.standings.items())
+            if "Valentino Rossi" in df.index
+            for race, position in df.loc["Valentino Rossi"].items()
+            if entries(raw_riders(year)).at["Valentino Rossi", race]
+        ]
+        self.assertEqual(
+            [
+                (season, race, None if np.isnan(position) else position)
+                for season, race, position in career.itertuples(index=False)
+            ],
+            [
+                (year, race, None if np.isnan(position) else position)
+                for year, race, position in expected
+            ],
+        )
+        self.assertIsNone(self.index.career("Nobody"))
+
+    def test_only_changed_seasons_are_indexed_again(self):
+        versions = {year: "v1" for year in self.standings}
+        self.update(versions)
+        rossi = self.index.career("Valentino Rossi")
+
+        changed, standings = self.update({**versions, 2019: "v2"})
+        self.assertEqual(changed, [2019])
+        standings.assert_called_once_with(2019)
+        pd.testing.assert_frame_equal(self.index.career("Valentino Rossi"), rossi)
+
+        changed, standings = self.update(versions)
+        self.assertEqual(changed, [2019])
+
+        # season no longer cached
+        del versions[2021]
+        self.assertEqual(self.update(versions)[0], [])
+        self.assertNotIn(2021, self.index.seasons())
+        self.assertNotIn(2021, set(self.index.career("Valentino Rossi")["season"]))
+
+    def test_career_has_races_entered_only(self):
+        # 2019: Bradl raced a wildcard and stood in for Lorenzo in 3 races
+        self.update({2019: "v1"})
+        career = self.index.career("Stefan Bradl")
+        self.assertEqual(list(career["race"]), ["SPA", "GER", "CZE", "AUT"])
+        self.assertEqual(list(career["position"]), [10, 10, 15, 13])
+
+    def test_rebuild_is_switched_to_at_once(self):
+        self.update({2019: "v1"})
+        self.index.career("Valentino Rossi")
+        self.update({2018: "v1"})
+        self.update({2017: "v1"})
+
+        # index and postings of one build, never of two
+        self.assertEqual(set(self.index.career("Valentino Rossi")["season"]), {2017})
+        # current and previous builds are kept
+        self.assertEqual(len(list(Path(self.tmp_dir.name).glob("build-*"))), 2)
+
+    def test_rider_view(self):
+        self.update({year: "v1" for year in self.standings})
+        with mock.patch.object(ResultsIndex, "_default", self.index):
+            page = self.client.get(reverse("rider"), {"name": "Valentino Rossi"})
+            data = self.client.get(
+                reverse("rider"), {"name": "Valentino Rossi", "format": "json"}
+            ).json()
+            missing = self.client.get(reverse("rider"), {"name": "Nobody"})
+
+        self.assertContains(page, '<option value="Marc Márquez">')
+        self.assertTrue(page.context["chart_url"].endswith(".svg"))
+        self.assertEqual(data["index"][0], min(self.standings))
+        self.assertEqual(data["columns"], ["race", "position"])
+        self.assertEqual(missing.status_code, 404)
+
+    def test_circuit_results_match_season_tables(self):
+        self.update({year: "v1" for year in self.standings})
+
+        results = self.index.circuit_results("misano", since=2008)
+        expected = [
+            (rider, year, race, position)
+            for year, df in sorted(self.standings.items())
+            if year >= 2008
+            for race in df.columns
+            if circuit_id(race, year) == "misano"
+            for rider, position in df[race].sort_index().items()
+            if entries(raw_riders(year)).at[rider, race]
+        ]
+        self.assertEqual(
+            sorted(
+                (r, s, race, None if np.isnan(p) else p)
+                for r, s, race, p in results.itertuples(index=False)
+            ),
+            sorted(
+                (r, s, race, None if np.isnan(p) else p)
+                for r, s, race, p in expected
+            ),
+        )
+        self.assertEqual(results["season"].iloc[0], 2008)
+        self.assertTrue(results["season"].is_monotonic_increasing)
+        self.assertIsNone(self.index.circuit_results("nowhere"))
+
+    def test_circuit_aggregates(self):
+        self.update({year: "v1" for year in self.standings})
+        mugello = self.index.circuits()["mugello"]
+
+        positions = pd.concat(
+            [
+                df[race][entries(raw_riders(year))[race]]
+                for year, df in self.standings.items()
+                for race in df.columns
+                if circuit_id(race, year) == "mugello"
+            ]
+        )
+        self.assertEqual(mugello["entries"], len(positions))
+        self.assertAlmostEqual(mugello["mean_position"], positions.mean())
+        self.assertAlmostEqual(mugello["dnf_rate"], positions.isna().mean())
+        self.assertLessEqual(mugello["air_temp"][0], mugello["air_temp"][1])
+        self.assertEqual(mugello["name"], "Autodromo Internazionale del Mugello")
+
+    def test_riders_not_entered_are_not_counted(self):
+        # 2019 ITA: 28 riders in the table, 5 of them not entered (blank)
+        # and 6 retired
+        self.update({2019: "v1"})
+        mugello = self.index.circuits()["mugello"]
+        self.assertEqual(mugello["entries"], 23)
+        self.assertAlmostEqual(mugello["dnf_rate"], 6 / 23)
+
+        results = self.index.circuit_results("mugello")
+        self.assertNotIn("Stefan Bradl", set(results["rider"]))
+        self.assertIn("Johann Zarco", set(results["rider"]))
+
+    def test_circuit_view(self):
+        self.update({year: "v1" for year in self.standings})
+        with mock.patch.object(ResultsIndex, "_default", self.index):
+            data = self.client.get(
+                reverse("circuit", args=["mugello"]), {"since": 2015}
+            ).json()
+            circuits = self.client.get(reverse("circuits")).json()["circuits"]
+            missing = self.client.get(reverse("circuit", args=["nowhere"]))
+            bad = self.client.get(reverse("circuit", args=["mugello"]), {"since": "x"})
+
+        self.assertEqual(data["results"]["index"][0], 2015)
+        self.assertEqual(data["results"]["columns"], ["rider", "race", "position"])
+        self.assertIn("misano", circuits)
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(bad.status_code, 400)
+
+    def test_views_only_read_index_built(self):
+        with mock.patch.object(
+            ResultsIndex, "_default", self.index
+        ), mock.patch.object(ResultsIndex, "update") as update:
+            page = self.client.get(reverse("rider"))
+            rider = self.client.get(reverse("rider"), {"name": "Valentino Rossi"})
+            circuits = self.client.get(reverse("circuits")).json()["circuits"]
+            circuit = self.client.get(reverse("circuit", args=["mugello"]))
+
+        # index is built in batch, never while serving a request
+        update.assert_not_called()
+        self.assertEqual(page.context["riders"], [])
+        self.assertEqual(rider.status_code, 404)
+        self.assertEqual(circuits, {})
+        self.assertEqual(circuit.status_code, 404)
+
+    def test_command_indexes_changed_seasons(self):
+        out = StringIO()
+        call_command("index_results", path=self.tmp_dir.name, stdout=out)
+        self.assertIn("Indexed", out.getvalue())
+        self.assertIn(2019, self.index.seasons())
+
+        out = StringIO()
+        call_command("index_results", path=self.tmp_dir.name, stdout=out)
+        self.assertIn("No season changed", out.getvalue())
+
+
+class TracksTests(SimpleTestCase):
+    def test_codes_of_same_circuit(self):
+        self.assertEqual(circuit_id("SMR", 2010), circuit_id("RSM", 2019))
+        self.assertEqual(circuit_id("QAT", 2021), circuit_id("DOH", 2021))
+        self.assertEqual(circuit_id("EUR", 2020), "valencia")
+
+    def test_codes_moved_between_circuits(self):
+        self.assertEqual(circuit_id("GBR", 2009), "donington")
+        self.assertEqual(circuit_id("GBR", 2010), "silverstone")
+        self.assertEqual(circuit_id("POR", 2006), "estoril")
+        self.assertEqual(circuit_id("POR", 2021), "portimao")
+        self.assertEqual(circuit_id("XYZ", 2021), "code:XYZ")
+
+
+class WeatherPerformanceTests(ChartCacheMixin, ChartsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.analysis = WeatherPerformance(Path(self.tmp_dir.name) / "analysis.pkl")
+
+    def test_races_joined_with_weather_by_circuit(self):
+        # standings name Misano "SMR", weather "RSM"
+        with open(GatheringReasultsFrom(2007).cache_files()[1], "r") as file:
+            weather = json.load(file)
+        records = race_records(
+            2007, Cleaning(raw_riders(2007)), normalize_weather(weather)
+        )
+
+        misano = records[records["race"] == "SMR"]
+        self.assertFalse(misano.empty)
+        self.assertEqual(misano["wet"].iloc[0], weather["RSM"]["track_wet"] == "Wet")
+        self.assertEqual(
+            misano["ground_temp"].iloc[0], int(weather["RSM"]["ground_temp"][:-1])
+        )
+
+    def test_rider_performance(self):
+        # 4 dry races, 3 wet ones (one retired); in the dry rider loses a
+        # place per 5ºC of track temperature
+        records = pd.DataFrame(
+            {
+                "rider": "A",
+                "season": 2019,
+                "race": list("abcdefg"),
+                "position": [2.0, 3.0, 4.0, 5.0, 6.0, 8.0, np.nan],
+                "wet": [0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 1.0],
+                "air_temp": np.nan,
+                "ground_temp": [20.0, 25.0, 30.0, 35.0, 15.0, 15.0, 15.0],
+            }
+        )
+        with mock.patch("charts_app.utils.weather_analysis.MIN_TEMP_RACES", 4):
+            performance = rider_performance(records).loc["A"]
+
+        self.assertEqual(performance["mean_dry"], 3.5)
+        self.assertTrue(np.isnan(performance["mean_wet"]))  # 2 finished only
+        self.assertEqual(performance["finished_dry"], 1.0)
+        self.assertAlmostEqual(performance["temp_slope"], 2.0)
+
+        records.loc[7] = ["A", 2019, "h", 4.0, 1.0, np.nan, 15.0]
+        performance = rider_performance(records).loc["A"]
+        self.assertEqual(performance["mean_wet"], 6.0)
+        self.assertEqual(performance["wet_delta"], 2.5)
+        self.assertEqual(performance["finished_wet"], 0.75)
+
+    def test_races_not_entered_are_left_out(self):
+        # 2019: Bradl raced a wildcard and stood in for Lorenzo in 3 races,
+        # finishing all of them
+        with mock.patch(
+            "charts_app.utils.weather_analysis.season_versions",
+            return_value={2019: "v1"},
+        ):
+            refresh_weather_performance(self.analysis)
+
+        bradl = self.analysis.riders(["Stefan Bradl"]).loc["Stefan Bradl"]
+        self.assertEqual(bradl["races"], 4)
+        self.assertEqual(bradl["finished_dry"], 1.0)
+
+    def test_analysed_again_only_when_seasons_change(self):
+        self.assertTrue(refresh_weather_performance(self.analysis))
+        self.assertFalse(refresh_weather_performance(self.analysis))
+        version = self.analysis.data_version()
+
+        with mock.patch(
+            "charts_app.utils.weather_analysis.season_versions",
+            return_value={2019: "v2"},
+        ):
+            self.assertTrue(refresh_weather_performance(self.analysis))
+        self.assertNotEqual(self.analysis.data_version(), version)
+        self.assertEqual(
+            set(self.analysis.riders().index),
+            set(Cleaning(raw_riders(2019)).index),
+        )
+
+    def test_chart_option(self):
+        refresh_weather_performance(self.analysis)
+        data = {
+            "year_chosen": 2019,
+            "places_from": 1,
+            "places_to": 3,
+            "output_format": "svg-min",
+        }
+        with mock.patch.object(WeatherPerformance, "_default", self.analysis):
+            weather = self.client.post(reverse("index"), data)
+            performance = self.client.post(
+                reverse("index"), dict(data, weather_performance="on")
+            )
+            client = self.client.post(
+                reverse("index"),
+                dict(data, weather_performance="on", render_mode="client"),
+            ).context["chart_data"]
+
+        self.assertNotEqual(
+            weather.context["chart_file"], performance.context["chart_file"]
+        )
+        svg = (Path(self.tmp_dir.name) / performance.context["chart_file"]).read_text()
+        self.assertIn("Mean place in dry and wet races", svg)
+
+        riders = [rider["name"] for rider in client["riders"]]
+        np.testing.assert_array_equal(
+            np.array(client["weather_performance"]["mean_wet"], dtype=float),
+            self.analysis.riders(riders)["mean_wet"],
+        )
+
+    def test_weather_is_shown_until_analysed(self):
+        data = {"year_chosen": 2019, "places_from": 1, "places_to": 3}
+        with mock.patch.object(
+            WeatherPerformance, "_default", self.analysis
+        ), mock.patch.object(WeatherPerformance, "update") as update:
+            weather = self.client.post(reverse("index"), data)
+            performance = self.client.post(
+                reverse("index"), dict(data, weather_performance="on")
+            )
+
+        # analysis is never made while serving a request
+        update.assert_not_called()
+        self.assertEqual(performance.status_code, 200)
+        self.assertEqual(
+            weather.context["chart_file"], performance.context["chart_file"]
+        )
+
+
+class IngestTests(TestCase):
+    def ingest(self, year, version="v1"):
+        standings = mock.Mock(return_value=raw_riders(year))
+        weather = mock.Mock(
+            return_value=GatheringReasultsFrom(year).weather_table(fetch=False)
+        )
+        return ingest_season(year, version, standings, weather, batch_size=100)
+
+    def test_season_tables_are_stored(self):
+        self.assertTrue(self.ingest(2007))
+        standings = Cleaning(raw_riders(2007))
+
+        self.assertEqual(
+            Result.objects.filter(season__year=2007).count(),
+            cleaned_with_entries(raw_riders(2007))[1].to_numpy().sum(),
+        )
+        self.assertEqual(top_riders(2007), standings.index[:5].tolist())
+        self.assertEqual(top_riders(2007, places=2), standings.index[:2].tolist())
+
+        # standings name Misano "SMR", weather "RSM"
+        misano = Race.objects.get(season__year=2007, code="SMR")
+        self.assertEqual(misano.circuit, "misano")
+        self.assertIsNotNone(misano.weather.ground_temp)
+        self.assertEqual(RaceWeather.objects.count(), len(standings.columns))
+
+    def test_stored_again_only_when_data_changes(self):
+        self.ingest(2019)
+        results = Result.objects.count()
+
+        standings = mock.Mock()
+        self.assertFalse(ingest_season(2019, "v1", standings, dict))
+        standings.assert_not_called()
+
+        self.assertTrue(self.ingest(2019, "v2"))
+        self.assertEqual(Season.objects.get(year=2019).data_version, "v2")
+        self.assertEqual(Result.objects.count(), results)
+
+    def test_rider_history(self):
+        for year in (2018, 2019):
+            self.ingest(year)
+        riders = ["Valentino Rossi", "Marc Márquez"]
+
+        history = rider_history(riders, ["mugello", "misano"])
+        expected = [
+            (rider, year, race, circuit_id(race, year), df.at[rider, race])
+            for year, df in [(y, Cleaning(raw_riders(y))) for y in (2018, 2019)]
+            for race in df.columns
+            if circuit_id(race, year) in ("mugello", "misano")
+            for rider in riders
+            if entries(raw_riders(year)).at[rider, race]
+        ]
+        self.assertEqual(
+            sorted(history.fillna(0).itertuples(index=False, name=None)),
+            sorted((*row[:4], 0 if np.isnan(row[4]) else row[4]) for row in expected),
+        )
+        self.assertEqual(
+            set(rider_history(riders, ["mugello"], seasons=[2019])["season"]), {2019}
+        )
+
+    def test_races_not_entered_are_not_stored(self):
+        # 2019: Bradl raced a wildcard at Jerez and stood in for Lorenzo in
+        # 3 races, finishing all of them
+        self.ingest(2019)
+        circuits = Race.objects.values_list("circuit", flat=True)
+        history = rider_history(["Stefan Bradl"], list(circuits))
+        self.assertEqual(list(history["race"]), ["SPA", "GER", "CZE", "AUT"])
+        self.assertFalse(history["position"].isna().any())
+        self.assertEqual(top_riders(2019, places=30).count("Stefan Bradl"), 1)
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command("ingest_seasons", "--from", "2018", "--to", "2019", stdout=stdout)
+        call_command("ingest_seasons", "--from", "2019", "--to", "2019", stdout=stdout)
+
+        self.assertIn("Stored 2 seasons", stdout.getvalue())
+        self.assertIn("2019: unchanged, skipped", stdout.getvalue())
+        self.assertEqual(
+            list(Season.objects.values_list("year", flat=True)), [2018, 2019]
+        )
+
+
+class WeatherTableTests(TempDirMixin, ChartsTestCase):
+    def setUp(self):
+        super().setUp()
+        MotoGP_utils.weather_memo.clear()
+
+    def cached_weather(self, year):
+        with open(CACHE_DIR / f"{year}-MotoGP-weather.json", "r") as file:
+            return json.load(file)
+
+    def test_matches_legacy_parsing_for_all_cached_seasons(self):
+        for file in sorted(CACHE_DIR.glob("*-MotoGP-weather.json")):
+            with self.subTest(file=file.name):
+                with open(file, "r") as f:
+                    weather = json.load(f)
+                table = normalize_weather(weather)
+                x, y_air_temp, y_ground_temp = legacy_weather_series(weather)
+
+                self.assertEqual(weather_labels(table), x)
+                np.testing.assert_array_equal(table["air_temp"], y_air_temp)
+                np.testing.assert_array_equal(table["ground_temp"], y_ground_temp)
+
+    def test_typed_values(self):
+        table = normalize_weather(
+            {
+                "QAT": {
+                    "track_wet": "Wet",
+                    "air_temp": "18º",
+                    "humidity": "52%",
+                    "ground_temp": "º",
+                    "clouds": "Light-Rain",
+                },
+                "ARG": {
+                    "track_wet": "",
+                    "air_temp": "27º",
+                    "humidity": "%",
+                    "ground_temp": "41º",
+                    "clouds": "Snow",
+                },
+            }
+        )
+        self.assertEqual(table["race"].tolist(), ["QAT", "ARG"])
+        np.testing.assert_array_equal(table["air_temp"], [18, 27])
+        np.testing.assert_array_equal(table["ground_temp"], [np.nan, 41])
+        np.testing.assert_array_equal(table["humidity"], [52, np.nan])
+        self.assertEqual(table["track"].tolist(), [1, -1])
+        self.assertEqual(table["clouds"].tolist(), [4, -1])
+
+    def test_file_is_versioned(self):
+        file = Path(self.tmp_dir.name) / "weather.npz"
+        table = normalize_weather(self.cached_weather(2019))
+        save_weather_table(file, table, source="v1")
+
+        np.testing.assert_array_equal(load_weather_table(file, source="v1"), table)
+        self.assertIsNone(load_weather_table(file, source="v2"))
+        with mock.patch(
+            "charts_app.utils.weather_table.WEATHER_FORMAT_VERSION",
+            WEATHER_FORMAT_VERSION + 1,
+        ):
+            self.assertIsNone(load_weather_table(file, source="v1"))
+        self.assertIsNone(load_weather_table(Path(self.tmp_dir.name) / "no.npz", "v1"))
+
+    def test_normalized_once(self):
+        gathering = GatheringReasultsFrom(2019)
+        gathering.CACHE_PATH = f"{self.tmp_dir.name}/"
+        with open(gathering.cache_files()[1], "w") as file:
+            json.dump(self.cached_weather(2019), file)
+
+        with mock.patch.object(
+            MotoGP_utils, "normalize_weather", side_effect=normalize_weather
+        ) as normalize:
+            first = gathering.weather_table(fetch=False)
+            MotoGP_utils.weather_memo.clear()
+            second = gathering.weather_table(fetch=False)
+
+        self.assertEqual(normalize.call_count, 1)
+        np.testing.assert_array_equal(first, second)
+        self.assertEqual(len(first), len(self.cached_weather(2019)))
+
+        # made again when cached weather changes
+        with open(gathering.cache_files()[1], "w") as file:
+            json.dump({"QAT": self.cached_weather(2019)["QAT"]}, file)
+        self.assertEqual(gathering.weather_table(fetch=False)["race"].tolist(), ["QAT"])
+
+    def test_migration_command(self):
+        path = Path(self.tmp_dir.name)
+        for year in (2018, 2019):
+            with open(path / f"{year}-MotoGP-weather.json", "w") as file:
+                json.dump(self.cached_weather(year), file)
+
+        stdout = StringIO()
+        for _ in range(2):
+            call_command("migrate_weather_cache", "--path", str(path), stdout=stdout)
+
+        self.assertIn("Migrated 2 weather files", stdout.getvalue())
+        self.assertIn("Migrated 0 weather files", stdout.getvalue())
+        self.assertTrue((path / "2019-MotoGP-weather.npz").exists())
+
+
+class StartupTests(SimpleTestCase):
+    # modules a worker shouldn't import before it draws a chart
+    HEAVY_MODULES = ["matplotlib", "pandas", "numpy", "requests", "lxml"]
+    # import time of views (and all it imports), with heavy modules ~1 s
+    VIEWS_BUDGET_MS = 150
+
+    def start(self, code, **env):
+        # a fresh process starting Django and loading all urls (views)
+        env = {
+            **{k: v for k, v in os.environ.items() if k != "CHARTS_PRELOAD"},
+            "DJANGO_SETTINGS_MODULE": "MotoGP_stats.settings",
+            **env,
+        }
+        return subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                f"import django; django.setup(); import MotoGP_stats.urls; {code}",
+            ],
+            cwd=Path(__file__).resolve().parent.parent,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+    def test_startup_budget(self):
+        result = self.start("pass")
+
+        # "import time: self [us] | cumulative | package", one line per module
+        imported = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and "|" in line:
+                _, cumulative, name = line.split("|")
+                if cumulative.strip().isdigit():
+                    imported[name.strip()] = int(cumulative) / 1000
+
+        self.assertFalse(set(self.HEAVY_MODULES) & set(imported))
+        self.assertLess(imported["charts_app.views"], self.VIEWS_BUDGET_MS)
+
+    def test_preload(self):
+        result = self.start(
+            "import gc, json, sys, matplotlib; print(json.dumps("
+            "[matplotlib.get_backend(), gc.get_freeze_count(), sorted(sys.modules)]))",
+            CHARTS_PRELOAD="1",
+        )
+
+        backend, frozen, modules = json.loads(result.stdout.splitlines()[-1])
+        self.assertEqual(backend, "agg")
+        self.assertGreater(frozen, 0)
+        self.assertTrue(set(self.HEAVY_MODULES) <= set(modules))
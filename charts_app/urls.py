@@ -4,4 +4,11 @@ from . import views
 
 urlpatterns = [
     path("", views.index, name="index"),
+    path("rider/", views.rider, name="rider"),
+    path("circuits/", views.circuits, name="circuits"),
+    path("circuits/<str:circuit>/", views.circuit, name="circuit"),
+    path("data/<int:year>/<str:part>/", views.season_data, name="season_data"),
+    path("jobs/<str:job_id>/", views.job_status, name="job_status"),
+    path("jobs/<str:job_id>/events/", views.job_events, name="job_events"),
+    path("metrics", views.metrics_view, name="metrics"),
 ]
@@ -1,14 +1,141 @@
-from io import StringIO
+from io import BytesIO, StringIO
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+import copy
+import hashlib
 import json
+import os
+from pathlib import Path
+import re
 import sys
-from bs4 import BeautifulSoup
-import matplotlib.pyplot as plt
-import matplotlib.ticker as ticker
+import threading
+import time
+import uuid
+import lxml.html
+import matplotlib
+from matplotlib import cbook
+from matplotlib.artist import Artist, allow_rasterization
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_mixed import MixedModeRenderer
+from matplotlib.backends.backend_svg import FigureCanvasSVG, RendererSVG
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+from matplotlib.lines import Line2D
 import numpy as np
 import pandas as pd
 import requests
 from requests.exceptions import ConnectionError, HTTPError, RequestException
 
+from charts_app.utils import pulselive
+from charts_app.utils.chart_cache import MEDIA_PATH, ChartCache
+from charts_app.utils.memo import LRUMemo
+from charts_app.utils.metrics import metrics
+from charts_app.utils.season_store import CURRENT_YEAR, SeasonStore
+from charts_app.utils.shared_cache import get_or_set_locked
+from charts_app.utils.tracks import circuit_ids
+from charts_app.utils.weather_table import (
+    load_weather_table,
+    normalize_weather,
+    save_weather_table,
+    weather_labels,
+)
+
+MIN_YEAR = 2004  # earlier data are corrupted
+
+# scraped and fetched seasons; absolute, so it doesn't depend on working dir
+CACHE_PATH = f"{Path(__file__).resolve().parent / 'cache'}/"
+
+# how often cached data of the in-progress season is checked for new races
+CURRENT_SEASON_TTL = 60 * 60
+
+
+# Optimized SVG: text as text (not glyph paths) of one font family, and
+# lines simplified harder. Set on its own renderer, not in global rcParams,
+# so charts of every format are saved at once by concurrent renders.
+# Made from RendererSVG.draw_text and FigureCanvasSVG.print_svg of
+# matplotlib 3.8 (pinned in requirements.txt), using some of their private
+# methods; ExportFormatsTests fails when an upgrade changes them.
+class MinifiedRendererSVG(RendererSVG):
+    FONT_FAMILY = "DejaVu Sans"
+    SIMPLIFY_THRESHOLD = 1.0
+
+    def draw_path(self, gc, path, transform, rgbFace=None):
+        if path.should_simplify:
+            path = copy.copy(path)
+            path.simplify_threshold = self.SIMPLIFY_THRESHOLD
+        super().draw_path(gc, path, transform, rgbFace)
+
+    def draw_text(self, gc, x, y, s, prop, angle, ismath=False, mtext=None):
+        prop = prop.copy()
+        prop.set_family(self.FONT_FAMILY)
+
+        clip_attrs = self._get_clip_attrs(gc)
+        if clip_attrs:
+            self.writer.start("g", **clip_attrs)
+        if gc.get_url() is not None:
+            self.writer.start("a", {"xlink:href": gc.get_url()})
+        self._draw_text_as_text(gc, x, y, s, prop, angle, ismath, mtext)
+        if gc.get_url() is not None:
+            self.writer.end("a")
+        if clip_attrs:
+            self.writer.end("g")
+
+
+class MinifiedFigureCanvasSVG(FigureCanvasSVG):
+    def print_svg(self, filename, *, bbox_inches_restore=None, metadata=None, **kwargs):
+        # FigureCanvasSVG.print_svg, drawing with MinifiedRendererSVG; other
+        # options of savefig (dpi, facecolor...) are of raster formats
+        svg = StringIO()
+        dpi = self.figure.dpi
+        self.figure.dpi = 72
+        width, height = self.figure.get_size_inches()
+        renderer = MixedModeRenderer(
+            self.figure,
+            width,
+            height,
+            dpi,
+            MinifiedRendererSVG(
+                width * 72, height * 72, svg, image_dpi=dpi, metadata=metadata
+            ),
+            bbox_inches_restore=bbox_inches_restore,
+        )
+        self.figure.draw(renderer)
+        renderer.finalize()
+
+        # whitespace between tags is only indentation; generic family is
+        # the fallback, where the font isn't installed
+        font = f"'{MinifiedRendererSVG.FONT_FAMILY}'"
+        content = re.sub(r">\s+<", "><", svg.getvalue())
+        content = content.replace(font, f"{font}, sans-serif")
+        with cbook.open_file_cm(filename, "w", encoding="utf-8") as fh:
+            if cbook.file_requires_unicode(fh):
+                fh.write(content)
+            else:
+                fh.write(content.encode())
+
+
+# formats charts can be saved in: extension and canvas. Optimized SVG
+# (see MinifiedRendererSVG) also drops indentation, so it's about a third
+# smaller (and half when gzipped).
+EXPORT_FORMATS = {
+    "svg": {"extension": "svg", "canvas": FigureCanvasSVG},
+    "svg-min": {"extension": "svg", "canvas": MinifiedFigureCanvasSVG},
+    "png": {"extension": "png", "canvas": FigureCanvasAgg},
+    "webp": {"extension": "webp", "canvas": FigureCanvasAgg},
+}
+
+# seasons compared in one grid of standings, at most, and panels in its rows
+MAX_COMPARED_SEASONS = 9
+GRID_COLUMNS = 3
+
+# threads loading seasons of a comparison
+SEASON_WORKERS = 4
+
+# cleaned seasons and weather shared by all requests of the process
+standings_memo = LRUMemo(max_entries=32, copy_value=pd.DataFrame.copy)
+weather_memo = LRUMemo(max_entries=32)
+
 
 class Cleaning:
     def __new__(cls, df: pd.DataFrame) -> pd.DataFrame:
@@ -50,53 +177,74 @@ class Cleaning:
         df[df.columns] = df[df.columns].apply(pd.to_numeric)
 
         # grouping duplicated indexes into one; duplicates occur
-        # when rider changes team mid season:
+        # when rider changes team mid season.
+        # groupby().first() takes the first non-null value per column
+        # (or NaN), keeps riders in order of appearance and keeps
+        # column dtypes, all in a single vectorized pass.
+        df_cleaned = df.groupby(level=0, sort=False).first()
 
-        def choose_one(series):
-            # return number, if possible, or NaN
-            if not series.dropna().empty:
-                return series.dropna().iloc[0]
-            else:
-                return np.nan
+        # plain riders names as indexes, like the original table
+        df_cleaned.index.name = None
 
-        # variables to temporarily store processed rows and indexes (names). Rows will be converted into dataframe, and names will become indexes.
-        riders_list = []
-        merged_rows_list = []
+        return df_cleaned
 
-        # for unique drivers names (skipping copies)
-        for rider in df.index.unique():
-            #
-            # select row (or rows) of data for a current rider
-            current_rows = df.loc[rider]
 
-            # merge those into a single new merged row
-            if isinstance(current_rows, pd.DataFrame):
-                merged_row = current_rows.apply(choose_one)
-            else:
-                merged_row = current_rows
+#
+# content hash of a file, computed again only when the file changes
+_file_versions = {}
 
-            # add this row to list of merged rows
-            merged_rows_list.append(merged_row)
 
-            # add rider name to list of riders
-            riders_list.append(rider)
+def file_version(file: str) -> str:
+    try:
+        stat = os.stat(file)
+    except FileNotFoundError:
+        return "missing"
 
-        # convert list of merged rows into dataframe; transpose columns to rows
-        df_cleaned = pd.concat(merged_rows_list, axis=1).transpose()
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _file_versions.get(file)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
 
-        # set indexies to riders names
-        df_cleaned.index = riders_list
+    with open(file, "rb") as f:
+        version = hashlib.sha1(f.read()).hexdigest()[:16]
+    _file_versions[file] = (stamp, version)
+    return version
 
-        # set columns names to original ones
-        df_cleaned.columns = df.columns
 
-        return df_cleaned
+#
+# riders standings table of a season's wikipedia page (utf-8): the first
+# "wikitable" with a "Bike" column. Page is parsed once by lxml, and only this
+# one table is converted to a dataframe.
+def extract_riders_table(content: bytes) -> pd.DataFrame:
+    tree = lxml.html.fromstring(content, parser=lxml.html.HTMLParser(encoding="utf-8"))
+
+    for table in tree.xpath(
+        '//table[contains(concat(" ", normalize-space(@class), " "), " wikitable ")]'
+        '[.//th[normalize-space()="Bike"]]'
+    ):
+        # remove all <sup> tags, that could be added to the numbers
+        for sup in table.xpath(".//sup"):
+            sup.drop_tree()
+
+        try:
+            df_tables = pd.read_html(
+                StringIO(lxml.html.tostring(table, encoding="unicode")),
+                match="Bike",
+                flavor="lxml",
+            )
+        except ValueError:  # 2003 wiki table is corrupted
+            sys.exit(f"\nError reading table!")
+
+        if "Bike" in df_tables[0].columns:
+            return df_tables[0]
+
+    return pd.DataFrame()
 
 
 class GatheringReasultsFrom:
     def __init__(self, year: int):
         self.year = year
-        self.CACHE_PATH = "charts_app/utils/cache/"
+        self.CACHE_PATH = CACHE_PATH
 
         if self.year < 2012:
             self.WIKI_URL = f"https://en.wikipedia.org/wiki/{self.year}_Grand_Prix_motorcycle_racing_season"
@@ -106,199 +254,568 @@ class GatheringReasultsFrom:
             )
 
     #
-    # gathering historical average of 3 previous seasons
-    def history(self, results: pd.DataFrame) -> pd.DataFrame:
-        results_hist_A = Cleaning(GatheringReasultsFrom(self.year - 3).riders())
-        results_hist_B = Cleaning(GatheringReasultsFrom(self.year - 2).riders())
-        results_hist_C = Cleaning(GatheringReasultsFrom(self.year - 1).riders())
-
-        # creating dataframe equivalent to 'results' but full of NaN.
-        # To be filled with average results from 3 prev years, where possible
-        results_hist_avrg = results.map(lambda x: np.nan)
-
-        # Filling with average results
-        for rider in results_hist_avrg.index:
-            for track in results_hist_avrg.columns:
-                try:
-                    # Trying to check if rider was on this track in all 3 previous years
-                    extracted_A = results_hist_A.at[rider, track]
-                    extracted_B = results_hist_B.at[rider, track]
-                    extracted_C = results_hist_C.at[rider, track]
-
-                    # If so, calculate average.
-                    # Important: due to >>lots<< of unfinished races, function doesn't require all 3 races to be finished. So the final mean may be calculated of 3 or just 2 results.
-                    mean_list = []
-                    for _ in [extracted_A, extracted_B, extracted_C]:
-                        if pd.notna(_):
-                            mean_list.append(_)
-                    if len(mean_list) > 1:
-                        results_hist_avrg.at[rider, track] = np.mean(mean_list)
-
-                except KeyError:
-                    # If a rider or track doesn't exist in one of the previous years (KeyError), just skip it.
-                    continue
+    # season's files in cache: riders standings and weather
+    def cache_files(self) -> tuple:
+        return (
+            f"{self.CACHE_PATH}{self.year}-MotoGP-riders.pkl",
+            f"{self.CACHE_PATH}{self.year}-MotoGP-weather.json",
+        )
+
+    #
+    # season's typed weather, made from cached weather (see weather_table.py)
+    def weather_table_file(self) -> str:
+        return f"{self.CACHE_PATH}{self.year}-MotoGP-weather.npz"
+
+    #
+    # when and how season's data was last checked for updates
+    def _read_meta(self) -> dict:
+        try:
+            with open(f"{self.CACHE_PATH}{self.year}-MotoGP-meta.json", "r") as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _update_meta(self, **values):
+        meta = self._read_meta()
+        meta.update(values)
+        meta_file = f"{self.CACHE_PATH}{self.year}-MotoGP-meta.json"
+        tmp_file = f"{meta_file}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_file, "w") as file:
+            json.dump(meta, file)
+        os.replace(tmp_file, meta_file)
+
+    #
+    # cached data has to be checked for updates: the in-progress season once
+    # per CURRENT_SEASON_TTL; past seasons never again, unless last check was
+    # made before the season ended
+    def is_stale(self, part: str) -> bool:
+        checked = self._read_meta().get(f"{part}_checked")
+        if self.year < CURRENT_YEAR:
+            return (
+                checked is not None
+                and datetime.fromtimestamp(checked).year <= self.year
+            )
+        return checked is None or time.time() - checked > CURRENT_SEASON_TTL
+
+    #
+    # season is in cache and up to date, so it won't be scraped nor fetched
+    def is_fresh(self) -> bool:
+        return all(os.path.exists(file) for file in self.cache_files()) and not (
+            self.is_stale("riders") or self.is_stale("weather")
+        )
+
+    #
+    # version of season's cached data; changes whenever cache is updated,
+    # and is the same on every server holding the same data
+    def data_version(self) -> str:
+        return ":".join(file_version(file) for file in self.cache_files())
+
+    #
+    # version of season's data as served (charts, ETags): data version, plus
+    # time of the last check of each part that's due to be checked again. So
+    # whatever was made of the in-progress season is served at most
+    # CURRENT_SEASON_TTL, until a request misses it and data is refreshed.
+    def served_version(self) -> str:
+        meta = self._read_meta()
+        return ":".join(
+            [self.data_version()]
+            + [
+                f"{part}@{meta.get(f'{part}_checked')}"
+                for part in ("riders", "weather")
+                if self.is_stale(part)
+            ]
+        )
+
+    #
+    # gathering historical average of previous seasons (3 by default)
+    def history(
+        self, results: pd.DataFrame, seasons: int = 3, min_finished: int = 2
+    ) -> pd.DataFrame:
+        #
+        # 3-D stack of previous seasons (oldest first), each aligned
+        # to the riders and tracks of 'results'. Tracks are matched by
+        # circuit, not by race code; a season's races at the same
+        # circuit are averaged. Missing riders or tracks become NaN.
+        stack = np.full((seasons, *results.shape), np.nan)
+        circuits = circuit_ids(results.columns, self.year)
+
+        # rider has to be on this track in all previous seasons
+        present = np.ones(results.shape, dtype=bool)
+
+        for i, prev_year in enumerate(range(self.year - seasons, self.year)):
+            results_hist = GatheringReasultsFrom(prev_year).standings()
+            prev_circuits = circuit_ids(results_hist.columns, prev_year)
+
+            if len(set(prev_circuits)) == len(prev_circuits):
+                by_circuit = results_hist.set_axis(prev_circuits, axis=1)
+            else:
+                by_circuit = (
+                    results_hist.astype(float).T.groupby(prev_circuits).mean().T
+                )
+
+            present &= np.outer(
+                results.index.isin(by_circuit.index),
+                np.isin(circuits, by_circuit.columns),
+            )
+            stack[i] = by_circuit.reindex(
+                index=results.index, columns=circuits
+            ).to_numpy(dtype=float)
+
+        # Important: due to >>lots<< of unfinished races, function doesn't require all races to be finished. The mean is calculated when at least 'min_finished' results (2 by default) are available.
+        finished = np.count_nonzero(~np.isnan(stack), axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nansum(stack, axis=0) / finished
+
+        results_hist_avrg = pd.DataFrame(
+            np.where(present & (finished >= min_finished), mean, np.nan),
+            index=results.index,
+            columns=results.columns,
+        )
 
         return results_hist_avrg
 
+    #
+    # gathering cleaned riders standings; memoized per version of cached data,
+    # unless it's not cached yet or has to be checked for updates first
+    def standings(self) -> pd.DataFrame:
+        version = file_version(self.cache_files()[0])
+        if version == "missing" or self.is_stale("riders"):
+            return self._standings()
+        return standings_memo.get((self.year, version), self._standings)
+
+    def _standings(self) -> pd.DataFrame:
+        #
+        # past seasons are read from precomputed store, if it was built
+        # (from the same version of cached riders)
+        if self.year < CURRENT_YEAR:
+            df_standings = SeasonStore.default().results(
+                self.year, source=file_version(self.cache_files()[0])
+            )
+            metrics.cache("store", df_standings is not None)
+            if df_standings is not None:
+                return df_standings
+
+        df_riders = self.riders()
+        with metrics.stage("cleaning"):
+            return Cleaning(df_riders)
+
     #
     # gathering riders standings
     def riders(self) -> pd.DataFrame:
-        #
+        riders_file = self.cache_files()[0]
+
         # gathering from cache
         try:
-            df_riders = pd.read_pickle(
-                f"{self.CACHE_PATH}{self.year}-MotoGP-riders.pkl"
-            )
-            print(f"Gathering {self.year} riders data from cache")
-            return df_riders
+            df_cached = pd.read_pickle(riders_file)
         except FileNotFoundError:
-            pass
+            df_cached = None
 
-        # gathering through scrapping
-        print(f"Gathering {self.year} riders data through scrapping...")
-
-        # checking URL and connection:
-        try:
-            response = requests.get(self.WIKI_URL)
-            response.raise_for_status()  # will rise HTTPError if != 200
+        fresh = df_cached is not None and not self.is_stale("riders")
+        metrics.cache("riders", fresh)
+        if fresh:
+            print(f"Gathering {self.year} riders data from cache")
+            return df_cached
+
+        # missing or outdated: taken from shared cache, if other worker has
+        # already scraped it, otherwise scraped (by one worker at a time)
+        content = get_or_set_locked(
+            os.path.basename(riders_file),
+            lambda: self._scrape_riders(df_cached),
+            timeout=self._shared_timeout(),
+        )
+        self._store_cache_file(riders_file, content, "riders")
+        return pd.read_pickle(BytesIO(content))
 
-        except ConnectionError:
-            raise ConnectionError("\nInternet connection Error!")
-        except HTTPError as e:
-            raise HTTPError(f"\nHTTP error occurred: {e}")
-        except RequestException as e:
-            raise RequestException(f"\nError during request to {self.WIKI_URL}: {e}")
+    def _scrape_riders(self, df_cached) -> bytes:
+        # pickled riders standings table
+        content = BytesIO()
 
-        # creating Soup object
-        soup = BeautifulSoup(response.content, "html.parser")
+        # gathering through scrapping; cached table is only downloaded again
+        # when the page has changed since (conditional request)
+        print(f"Gathering {self.year} riders data through scrapping...")
 
-        # remove all <sup> tags, that could be added to the numbers
-        for sup in soup.select("sup"):
-            sup.extract()
+        headers = {}
+        if df_cached is not None:
+            meta = self._read_meta()
+            if meta.get("riders_etag"):
+                headers["If-None-Match"] = meta["riders_etag"]
+            if meta.get("riders_last_modified"):
+                headers["If-Modified-Since"] = meta["riders_last_modified"]
 
-        # create list of all tables (dataframes):
         try:
-            df_tables = pd.read_html(StringIO(str(soup)), attrs={"class": "wikitable"})
-        except ValueError:  # 2003 wiki table is corrupted
-            sys.exit(f"\nError reading table!")
+            with metrics.stage("scrape"):
+                response = self._fetch_wiki(headers)
+        except RequestException:
+            if df_cached is None:
+                raise
+            print(f"\nUsing cached {self.year} riders data, page is unavailable")
+            df_cached.to_pickle(content)
+            return content.getvalue()
+
+        if response.status_code == 304:  # not modified
+            df_cached.to_pickle(content)
+            return content.getvalue()
 
         # extract riders standings table:
-        df_riders = pd.DataFrame()
-        for _ in df_tables:
-            if "Bike" in _.columns:
-                df_riders = _
-                break
+        with metrics.stage("extract"):
+            df_riders = extract_riders_table(response.content)
 
         # make sure riders standings table was found:
         if df_riders.empty:
             print(f"\nNo riders standings found!\n")
             raise ValueError
 
-        # saving file to cache
-        df_riders.to_pickle(f"{self.CACHE_PATH}{self.year}-MotoGP-riders.pkl")
-        return df_riders
+        # standings table is cumulative, so the new one replaces cached one;
+        # unless it has fewer columns (races), e.g. page is being edited
+        if df_cached is not None and len(df_riders.columns) < len(df_cached.columns):
+            print(f"\nKeeping cached {self.year} riders data, new table is shorter")
+            df_riders = df_cached
+
+        self._update_meta(
+            riders_etag=response.headers.get("ETag"),
+            riders_last_modified=response.headers.get("Last-Modified"),
+        )
+        df_riders.to_pickle(content)
+        return content.getvalue()
+
+    def _fetch_wiki(self, headers: dict) -> requests.Response:
+        # checking URL and connection:
+        try:
+            with metrics.upstream("wikipedia"):
+                response = requests.get(self.WIKI_URL, headers=headers)
+            response.raise_for_status()  # will rise HTTPError if != 200
+
+        except ConnectionError:
+            raise ConnectionError("\nInternet connection Error!")
+        except HTTPError as e:
+            raise HTTPError(f"\nHTTP error occurred: {e}")
+        except RequestException as e:
+            raise RequestException(f"\nError during request to {self.WIKI_URL}: {e}")
+
+        return response
 
     #
-    # gathering weather data
+    # gathering weather data; memoized like standings
     def weather(self) -> dict:
+        version = file_version(self.cache_files()[1])
+        if version == "missing" or self.is_stale("weather"):
+            return self._weather()
+        return weather_memo.get((self.year, version), self._weather)
+
+    def _weather(self) -> dict:
         if self.year < 2005:
             print("\nNo weather data available before 2005.")
 
+        # gathering from precomputed store (past seasons only), built from
+        # the same version of cached weather
+        if self.year < CURRENT_YEAR:
+            races_weather = SeasonStore.default().weather(
+                self.year, source=file_version(self.cache_files()[1])
+            )
+            metrics.cache("store", races_weather is not None)
+            if races_weather is not None:
+                return races_weather
+
+        weather_file = self.cache_files()[1]
+
         # gathering from cache
         try:
-            with open(f"{self.CACHE_PATH}{self.year}-MotoGP-weather.json", "r") as file:
-                races_weather = json.load(file)
-                print(f"\nGathering {self.year} weather data from cache")
-                return races_weather
-        except FileNotFoundError or json.JSONDecodeError:
-            pass
+            with open(weather_file, "r") as file:
+                races_cached = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            races_cached = None
+
+        fresh = races_cached is not None and not self.is_stale("weather")
+        metrics.cache("weather", fresh)
+        if fresh:
+            print(f"\nGathering {self.year} weather data from cache")
+            return races_cached
+
+        # missing or outdated: taken from shared cache, if other worker has
+        # already fetched it, otherwise fetched (by one worker at a time)
+        content = get_or_set_locked(
+            os.path.basename(weather_file),
+            lambda: self._fetch_weather(races_cached),
+            timeout=self._shared_timeout(),
+        )
+        self._store_cache_file(weather_file, content, "weather")
+        races_weather = json.loads(content)
+
+        # normalized once, when cached
+        save_weather_table(
+            self.weather_table_file(),
+            normalize_weather(races_weather),
+            source=file_version(weather_file),
+        )
+        return races_weather
 
-        # gathering from API
-        # API info: https://github.com/micheleberardi/racingmike_motogp_import
-        def fetch_api_data(url):
-            try:
-                response = requests.get(url)
-                response.raise_for_status()  # will rise HTTPError if != 200
-                data = response.json()
-                return data
-
-            except ConnectionError:
-                raise ConnectionError("\nInternet connection Error!")
-            except HTTPError as e:
-                raise HTTPError(
-                    f"\nError connecting to {url} \ncode: {response.status_code}"
-                )
-            except json.JSONDecodeError:
-                raise ValueError(f"\nInvalid JSON response from url {url}")
-            except RequestException as e:
-                raise RequestException(f"\nError during request to {url}: {e}")
+    #
+    # typed weather of season's races: normalized once when weather is
+    # cached, so charts only read its arrays; memoized like weather. With
+    # fetch=False only cached weather is read (empty when not cached).
+    def weather_table(self, fetch=True) -> np.ndarray:
+        weather_file = self.cache_files()[1]
+        if fetch and (
+            file_version(weather_file) == "missing" or self.is_stale("weather")
+        ):
+            self.weather()
+
+        version = file_version(weather_file)
+        if version == "missing":
+            return normalize_weather({})
+        return weather_memo.get(
+            (self.year, version, "table"), lambda: self._weather_table(version)
+        )
 
+    def _weather_table(self, version: str) -> np.ndarray:
+        table = load_weather_table(self.weather_table_file(), source=version)
+        metrics.cache("weather_table", table is not None)
+        if table is None:
+            # cached before weather was typed (or by other version), see
+            # "manage.py migrate_weather_cache"
+            with open(self.cache_files()[1], "r") as file:
+                table = normalize_weather(json.load(file))
+            save_weather_table(self.weather_table_file(), table, source=version)
+        return table
+
+    def _fetch_weather(self, races_cached) -> bytes:
+        # weather as json
+        #
+        # gathering from API; only races missing in cache are fetched,
+        # sessions of all events concurrently
         print(
             f"\nGathering  {self.year} weather data through API. It may take a while..."
         )
+        try:
+            with metrics.stage("crawl"):
+                races_new = pulselive.default_client().season_weather(
+                    self.year, known=races_cached or {}
+                )
+        except (RequestException, ValueError):
+            if races_cached is None:
+                raise
+            print(f"\nUsing cached {self.year} weather data, API is unavailable")
+            races_new = {}
 
-        # list of dictionaries - to store race names and weather
-        races_weather = {}
-
-        # 1. find Season (year) id
-        url = "https://api.motogp.pulselive.com/motogp/v1/results/seasons"
-        all_seasons = fetch_api_data(url)
-
-        for item in all_seasons:
-            if item["year"] == self.year:
-                season_id = item["id"]
-
-        # 2. find right Category (MotoGP) id for a given Season (year)
-        url = f"https://api.motogp.pulselive.com/motogp/v1/results/categories?seasonUuid={season_id}"
-        all_categories = fetch_api_data(url)
-
-        for item in all_categories:
-            if item["name"] == "MotoGP™":
-                category_id = item["id"]
-
-        # 3. find Event (race week) id for a given Season (year)
-        url = f"https://api.motogp.pulselive.com/motogp/v1/results/events?seasonUuid={season_id}&isFinished=true"
-        all_events = fetch_api_data(url)
-
-        for event in all_events:
-            # if race week (not alphanum test week)
-            if event["short_name"].isalpha():
-                event_id = event["id"]
-                short_name = event["short_name"]
-
-                url = f"https://api.motogp.pulselive.com/motogp/v1/results/sessions?eventUuid={event_id}&categoryUuid={category_id}"
-                all_sessions = fetch_api_data(url)
-
-                # 4. find weather
-                for session in all_sessions:
-                    if session["type"] == "RAC":  # looking for a race session
-                        races_weather.update(
-                            {
-                                short_name: {
-                                    "track_wet": session["condition"]["track"],
-                                    "air_temp": session["condition"]["air"],
-                                    "humidity": session["condition"]["humidity"],
-                                    "ground_temp": session["condition"]["ground"],
-                                    "clouds": session["condition"]["weather"],
-                                }
-                            }
-                        )
+        races_weather = {**(races_cached or {}), **races_new}
+        return json.dumps(races_weather).encode()
 
-        # saving file to cache
-        with open(f"{self.CACHE_PATH}{self.year}-MotoGP-weather.json", "w") as file:
-            json.dump(races_weather, file)
+    #
+    # shared cache keeps the in-progress season only until it's checked again
+    def _shared_timeout(self):
+        return CURRENT_SEASON_TTL if self.year >= CURRENT_YEAR else None
 
-        return races_weather
+    #
+    # saving file to cache; replaced at once, so readers never see half of it
+    def _store_cache_file(self, file: str, content: bytes, part: str):
+        try:
+            with open(file, "rb") as f:
+                unchanged = f.read() == content
+        except FileNotFoundError:
+            unchanged = False
+
+        if not unchanged:
+            tmp_file = f"{file}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(content)
+            os.replace(tmp_file, file)
+
+        self._update_meta(**{f"{part}_checked": time.time()})
+
+
+def weather_series(weather: np.ndarray) -> tuple:
+    #
+    # x axis labels (race, clouds, humidity, track) and air and ground
+    # temperatures of each race, from typed weather; NaN for corrupted
+    # temperatures
+    return weather_labels(weather), weather["air_temp"], weather["ground_temp"]
+
+
+def save_figure(fig: Figure, output_path, output_format="svg", dpi=72, clear=True):
+    # saves a chart in one of EXPORT_FORMATS and releases its artists
+    # (unless the figure is reused, see ChartTemplate)
+    export = EXPORT_FORMATS[output_format]
+    try:
+        fig.savefig(
+            output_path,
+            format=export["extension"],
+            dpi=72 if export["extension"] == "svg" else dpi,
+        )
+    finally:
+        if clear:
+            # explicitly release all artists of this render
+            fig.clear()
+
+
+# Numbers centered on data points (e.g. in markers), of one size and
+# color, drawn as one artist instead of a Text each. Every number is still
+# drawn as text by the renderer (a <text> in optimized SVG), placed as
+# ax.text(x, y, number, horizontalalignment="center",
+# verticalalignment="center") would; not clipped, as ax.text.
+class MarkerNumbers(Artist):
+    zorder = 3  # as text, above lines and markers
+
+    def __init__(self, x, y, numbers, size: float, color="white"):
+        super().__init__()
+        self._offsets = np.column_stack([x, y])
+        self._numbers = list(numbers)
+        self._prop = FontProperties(size=size)
+        self._color = color
+
+    @allow_rasterization
+    def draw(self, renderer):
+        if not self.get_visible() or not self._numbers:
+            return
+        renderer.open_group("text", self.get_gid())
+        gc = renderer.new_gc()
+        gc.set_foreground(self._color)
+        gc.set_alpha(self.get_alpha())
+
+        # a line of text is as high as "lp", baseline at its descent
+        _, height, descent = renderer.get_text_width_height_descent(
+            "lp", self._prop, ismath=False
+        )
+        widths = {}
+        canvas_height = renderer.get_canvas_width_height()[1]
+        points = self.get_transform().transform(self._offsets)
+        for (x, y), number in zip(points, self._numbers):
+            if number not in widths:
+                widths[number] = renderer.get_text_width_height_descent(
+                    number, self._prop, ismath=False
+                )[0]
+            renderer.draw_text(
+                gc,
+                x - widths[number] / 2,
+                # renderers take text's y from the top
+                canvas_height - (y - height / 2 + descent),
+                number,
+                self._prop,
+                0,
+            )
+
+        gc.restore()
+        renderer.close_group("text")
+        self.stale = False
+
+
+# Figure and axes of charts with their static styling (titles, labels,
+# ticks, grids) and layout, made once and reused by every render; only
+# data artists are added, and removed again after saving. Bottom panel is
+# either the weather or riders' weather performance, each with its own
+# axes. Layout is computed on first render of each panel.
+class ChartTemplate:
+    # templates not drawn by any thread at the moment, shared by all
+    # threads of the process
+    _free = []
+    _lock = threading.Lock()
+
+    @classmethod
+    @contextmanager
+    def acquire(cls):
+        # a figure can't be drawn by two threads at once, so each render
+        # takes a free template, or makes one when all are drawn
+        with cls._lock:
+            template = cls._free.pop() if cls._free else None
+        if template is None:
+            template = cls()
+        try:
+            yield template
+        finally:
+            with cls._lock:
+                cls._free.append(template)
+
+    def __init__(self):
+        # size in pixels / dpi; figure is created directly (not through
+        # pyplot), so it's not shared with other threads
+        self.fig = Figure(figsize=(1000 / 72, 600 / 72))
+        grid = self.fig.add_gridspec(2, 1, height_ratios=[3, 1])
+        self.ax_riders = self.fig.add_subplot(grid[0])
+        self.ax_weather = self.fig.add_subplot(grid[1])
+        self.ax_performance = self.fig.add_subplot(grid[1])
+        self.layouts = {}  # {bottom panel: subplot parameters}
+
+        # 1. riders standings on the top
+        ax = self.ax_riders
+        # expand margins for riders names
+        ax.margins(x=0.1)
+        ax.tick_params(axis="x", labelrotation=30, labelsize=9)
+        ax.set_ylabel("Place")
+        ax.tick_params(axis="y", labelsize=9)
+        ax.grid(axis="x", alpha=0.3)
+        # set range, to show values in increments of 1
+        ax.set_yticks(range(0, 20))
+        ax.invert_yaxis()
+
+        # 2. weather detail on the bottom
+        ax = self.ax_weather
+        ax.margins(x=0.1)
+        ax.set_title("Weather", fontsize=16, pad=10)
+        ax.tick_params(axis="x", labelrotation=0, labelsize=8)
+        ax.set_ylabel("Temperature [C]")
+        ax.tick_params(axis="y", labelsize=9)
+        ax.grid(axis="x", alpha=0.3)
+
+        # or riders' performance in the wet, dry and heat over all seasons
+        ax = self.ax_performance
+        ax.set_title(
+            "Mean place in dry and wet races, all seasons", fontsize=16, pad=10
+        )
+        ax.tick_params(axis="x", labelsize=8)
+        ax.set_ylabel("Place")
+        ax.tick_params(axis="y", labelsize=9)
+        ax.invert_yaxis()
+
+    def save(self, panel: str, output_path, output_format="svg", dpi=72):
+        # saves the chart with its data drawn, 'panel': "weather" or
+        # "performance" at the bottom
+        fig = self.fig
+        canvas = EXPORT_FORMATS[output_format]["canvas"]
+        # exact type: optimized SVG's canvas is a subclass of SVG's one
+        if type(fig.canvas) is not canvas:
+            canvas(fig)
+
+        self.ax_weather.set_visible(panel == "weather")
+        self.ax_performance.set_visible(panel == "performance")
+
+        # limits of this render's data only (data limits keep removed
+        # artists until recomputed), Y axis of standings expanded to all its
+        # ticks
+        for ax in (self.ax_riders, self.ax_weather, self.ax_performance):
+            ax.relim()
+            ax.autoscale_view()
+        ymin, ymax = self.ax_riders.get_ybound()
+        self.ax_riders.set_ybound(min(ymin, 0), max(ymax, 19))
+
+        if panel in self.layouts:
+            fig.subplots_adjust(**self.layouts[panel])
+            save_figure(fig, output_path, output_format, dpi, clear=False)
+            return
+
+        # tight layout, computed while saving, is kept for next renders.
+        # Without a layout engine, figure is drawn once per save, not twice
+        fig.set_layout_engine("tight")
+        try:
+            save_figure(fig, output_path, output_format, dpi, clear=False)
+        finally:
+            fig.set_layout_engine(None)
+        self.layouts[panel] = {
+            name: getattr(fig.subplotpars, name)
+            for name in ("left", "bottom", "right", "top", "wspace", "hspace")
+        }
 
 
 class Plotting:
     def __new__(
         cls,
         df: pd.DataFrame,
-        weather: dict,
+        weather: np.ndarray,  # typed weather, see weather_table.py
         year: int,
         show_riders_pos=[1, 5],  # default: from 1st to 5th rider
         df_hist=pd.DataFrame(),
+        output_path=MEDIA_PATH / "plot.svg",
+        output_format="svg",  # one of EXPORT_FORMATS
+        dpi=72,  # raster formats only
+        df_weather_performance=pd.DataFrame(),  # shown instead of weather
     ) -> None:
         #
         # limit range of riders to show
@@ -317,235 +834,575 @@ class Plotting:
             print("\nPlot is most readable up to 20 riders")
 
         # setting colormap of the plot
-        cmap = plt.colormaps["tab10"]  # colormap 10 colors long
+        cmap = matplotlib.colormaps["tab10"]  # colormap 10 colors long
         colors = cmap(range(nr_of_riders))
 
-        # setting plot layout, size (in pixels / dpi) and proportions
-        plt.subplots(
-            2,
-            1,
-            figsize=(1000 / 72, 600 / 72),
-            gridspec_kw={"height_ratios": [3, 1]},
-            layout="tight",
-        )
-
-        # 1. first plot:
-        # riders standings on the top
-        plt.subplot(2, 1, 1)
-
-        current_pass = 0  # counter
-
-        # plot riders standings
-        for rider in df.index:
-            # colormap has 10 colors, so for 11-th rider we change line style and restart colors
-            if current_pass < 10:
-                linestyle = "-"
-                color = colors[current_pass]
-            elif current_pass < 20:
-                linestyle = "-."
-                color = colors[current_pass - 10]
-            else:
-                linestyle = ":"
-                color = colors[current_pass - 20]
-
-            # a) plot historical results
-            if not df_hist.empty:
-                plt.plot(
-                    df_hist.columns,
-                    df_hist.loc[rider],
-                    marker="o",
-                    ms=15,
-                    markeredgewidth=0,
-                    linewidth=4,
-                    alpha=0.1,
-                    color=color,
-                    linestyle=linestyle,
+        with ChartTemplate.acquire() as template:
+            artists = []  # of this render, removed from the template after it
+            try:
+                # 1. first plot:
+                # riders standings on the top
+                ax = template.ax_riders
+                races = np.arange(len(df.columns))
+                positions = df.to_numpy(dtype=float)
+                history = None if df_hist.empty else df_hist.to_numpy(dtype=float)
+
+                current_pass = 0  # counter
+                marker_colors = []
+                legend_handles = []
+
+                # plot riders standings; markers and numbers of all riders
+                # are drawn together, after the lines
+                for rider, rider_positions in zip(df.index, positions):
+                    # colormap has 10 colors, so for 11-th rider we change line style and restart colors
+                    if current_pass < 10:
+                        linestyle = "-"
+                        color = colors[current_pass]
+                    elif current_pass < 20:
+                        linestyle = "-."
+                        color = colors[current_pass - 10]
+                    else:
+                        linestyle = ":"
+                        color = colors[current_pass - 20]
+                    marker_colors.append(color)
+
+                    # a) plot historical results
+                    if history is not None:
+                        artists += ax.plot(
+                            races,
+                            history[current_pass],
+                            linewidth=4,
+                            alpha=0.1,
+                            color=color,
+                            linestyle=linestyle,
+                        )
+                    # b) plot current season results for each rider
+                    artists += ax.plot(
+                        races, rider_positions, color=color, linestyle=linestyle
+                    )
+                    legend_handles.append(
+                        Line2D(
+                            [], [], marker="o", ms=11, color=color, linestyle=linestyle
+                        )
+                    )
+
+                    # add small riders names on the plot
+                    # only when driver finished his first race (if not NaN)
+                    if not np.isnan(rider_positions[0]):
+                        artists.append(
+                            ax.text(
+                                # position x,y
+                                -0.3,
+                                rider_positions[0],
+                                # last name
+                                f"{selected_rider_pos}. {str(rider).split()[-1]}",
+                                size=7,
+                                stretch="extra-condensed",
+                                horizontalalignment="right",
+                            )
+                        )
+                    selected_rider_pos += 1
+                    current_pass += 1
+
+                # markers of all riders (skipping NaN: unfinished race), each
+                # rider's in his color. Not clipped, they are inside the axes
+                # anyway, and SVG would get a group for every clipped marker
+                rider_nrs, race_nrs = np.nonzero(~np.isnan(positions))
+                finished = positions[rider_nrs, race_nrs]
+                if history is not None:
+                    hist_rider_nrs, hist_race_nrs = np.nonzero(~np.isnan(history))
+                    artists.append(
+                        ax.scatter(
+                            hist_race_nrs,
+                            history[hist_rider_nrs, hist_race_nrs],
+                            s=15**2,
+                            color=[marker_colors[nr] for nr in hist_rider_nrs],
+                            linewidths=0,
+                            alpha=0.1,
+                            zorder=2,
+                            clip_on=False,
+                        )
+                    )
+                rider_colors = [marker_colors[nr] for nr in rider_nrs]
+                artists.append(
+                    ax.scatter(
+                        race_nrs,
+                        finished,
+                        s=11**2,
+                        color=rider_colors,
+                        edgecolors=rider_colors,
+                        linewidths=1,
+                        zorder=2,
+                        clip_on=False,
+                    )
                 )
-            # b) plot current season results for each rider
-            plt.plot(
-                df.columns,
-                df.loc[rider],
-                marker="o",
-                ms=11,
-                color=color,
-                linestyle=linestyle,
-                label=f"{selected_rider_pos}. {rider}",
-            )
-
-            # add small numbers on each marker
-            for x, y in zip(df.columns, df.loc[rider]):
-                # skip number when NaN (unfinished race)
-                if np.isnan(y):
-                    continue
-
-                plt.text(
-                    x,
-                    y,
-                    str(round(y)),
-                    size=7,
-                    color="white",
-                    horizontalalignment="center",
-                    verticalalignment="center",
+                # add small numbers on each marker
+                artists.append(
+                    ax.add_artist(
+                        MarkerNumbers(
+                            race_nrs, finished, [str(round(y)) for y in finished], 7
+                        )
+                    )
                 )
 
-            # add small riders names on the plot
-            # only when driver finished his first race (if not NaN)
-            if not np.isnan(df.loc[rider].iloc[0]):
-                plt.text(
-                    # position x,y
-                    *np.array((-0.3, df.loc[rider].iloc[0])),
-                    # last name
-                    f"{selected_rider_pos}. {str(rider).split()[-1]}",
-                    size=7,
-                    stretch="extra-condensed",
-                    horizontalalignment="right",
+                ax.set_xticks(races, df.columns)
+                ax.set_title(f"Riders' standings {year}", fontsize=22, pad=10)
+                artists.append(
+                    ax.legend(
+                        legend_handles,
+                        [
+                            f"{pos}. {rider}"
+                            for pos, rider in enumerate(
+                                df.index, start=show_riders_pos[0]
+                            )
+                        ],
+                        fontsize=9,
+                    )
                 )
-            selected_rider_pos += 1
-            current_pass += 1
-
-        # expand margins for riders names
-        plt.margins(x=0.1)
-        plt.title(f"Riders' standings {year}", fontsize=22, pad=10)
-        plt.legend(fontsize=9)
-        plt.xticks(rotation=30, fontsize=9)
-        plt.ylabel("Place")
-        plt.yticks(fontsize=9)
-        plt.grid(axis="x", alpha=0.3)
-
-        # set Y axis to integer values
-        ax = plt.gca()
-        ax.yaxis.set_major_locator(ticker.MaxNLocator(integer=True))
-
-        # set range, to show values in increments of 1
-        ax.set_yticks(range(0, 20))
-        ax.invert_yaxis()
-
-        # 2. second plot:
-        # weather detail on the bottom
-        plt.subplot(2, 1, 2)
 
-        x = []
-        y_air_temp = []
-        y_ground_temp = []
-
-        for w in weather:
-            # preparing values for x axis
-            air_temp = weather[w]["air_temp"]
-            clouds = weather[w]["clouds"]
-            ground_temp = weather[w]["ground_temp"]
-            humidity = weather[w]["humidity"]
-            track_wet = weather[w]["track_wet"]
+                # 2. second plot:
+                # weather detail on the bottom, or riders' performance in the
+                # wet, dry and heat over all seasons
+                if not df_weather_performance.empty:
+                    ax = template.ax_performance
+                    performance = df_weather_performance.reindex(df.index)
+                    x = np.arange(nr_of_riders)
+
+                    artists.append(
+                        ax.bar(
+                            x - 0.2,
+                            performance["mean_dry"],
+                            width=0.4,
+                            label="dry",
+                            color="deepskyblue",
+                        )
+                    )
+                    artists.append(
+                        ax.bar(
+                            x + 0.2,
+                            performance["mean_wet"],
+                            width=0.4,
+                            label="wet",
+                            color="lightslategrey",
+                        )
+                    )
+
+                    # adding places lost per +10ºC of track temperature
+                    for a, slope in zip(x, performance["temp_slope"]):
+                        if np.isnan(slope):
+                            continue
+                        artists.append(
+                            ax.text(
+                                a,
+                                0.5,
+                                f"{slope:+.1f} / +10ºC",
+                                size=7,
+                                horizontalalignment="center",
+                                verticalalignment="top",
+                            )
+                        )
 
-            clouds = "Hv-Rain" if clouds == "Heavy-Rain" else clouds
-            clouds = "Lt-Rain" if clouds == "Light-Rain" else clouds
-            clouds = "Prt-Cloud" if clouds == "Partly-Cloudy" else clouds
+                    ax.set_xticks(
+                        x,
+                        [
+                            f"{pos}. {str(rider).split()[-1]}"
+                            for pos, rider in enumerate(
+                                df.index, start=show_riders_pos[0]
+                            )
+                        ],
+                    )
+                    artists.append(ax.legend(fontsize=9))
+                    panel = "performance"
+                else:
+                    ax = template.ax_weather
+                    labels, y_air_temp, y_ground_temp = weather_series(weather)
+                    # races by number, labels as ticks: categories of
+                    # strings would be kept by the axis for next renders
+                    x = np.arange(len(labels))
+
+                    # plotting ground temperatures
+                    artists += ax.plot(
+                        x,
+                        y_ground_temp,
+                        marker="o",
+                        ms=10,
+                        label="ground temp",
+                        color="lightslategrey",
+                    )
+
+                    # plotting air temperatures
+                    artists += ax.plot(
+                        x,
+                        y_air_temp,
+                        marker="o",
+                        ms=10,
+                        label="air temp",
+                        color="deepskyblue",
+                    )
+
+                    # adding small numbers for ground and air temperatures,
+                    # skipping NaN (corrupted data)
+                    temps = np.concatenate([y_ground_temp, y_air_temp])
+                    known = ~np.isnan(temps)
+                    artists.append(
+                        ax.add_artist(
+                            MarkerNumbers(
+                                np.tile(x, 2)[known],
+                                temps[known],
+                                [f"{b:.0f}" for b in temps[known]],
+                                6,
+                            )
+                        )
+                    )
 
-            # adding text values to x axis
-            x.append(f"{w}\n{clouds}\n{humidity}\n{track_wet}")
+                    ax.set_xticks(x, labels, horizontalalignment="left")
+                    artists.append(ax.legend(fontsize=9))
+                    panel = "weather"
 
-            # adding values to y axis of both air and ground temperatures
-            try:
-                y_ground_temp.append(int(ground_temp[:-1]))
-            except ValueError:
-                # add NaN for corrupted data
-                y_ground_temp.append(np.nan)
+                template.save(panel, output_path, output_format, dpi)
+            finally:
+                # leave the template as it was for the next render
+                for artist in artists:
+                    artist.remove()
 
-            try:
-                y_air_temp.append(int(air_temp[:-1]))
-            except ValueError:
-                # add NaN for corrupted data
-                y_air_temp.append(np.nan)
-
-        # plotting ground temperatures
-        plt.plot(
-            x,
-            y_ground_temp,
-            marker="o",
-            ms=10,
-            label="ground temp",
-            color="lightslategrey",
-        )
 
-        # plotting air temperatures
-        plt.plot(
-            x, y_air_temp, marker="o", ms=10, label="air temp", color="deepskyblue"
+class ComparisonPlotting:
+    def __new__(
+        cls,
+        seasons: dict,  # {year: cleaned standings}
+        show_riders_pos=[1, 5],  # default: from 1st to 5th rider
+        output_path=MEDIA_PATH / "plot.svg",
+        output_format="svg",  # one of EXPORT_FORMATS
+        dpi=72,  # raster formats only
+    ) -> None:
+        #
+        # standings of several seasons in a grid of panels, one per season,
+        # sharing Y axis (places), styling and one legend; a rider has the
+        # same color and line style in every season
+        years = sorted(seasons)
+        columns = min(len(years), GRID_COLUMNS)
+        rows = -(-len(years) // columns)
+
+        # riders to show of each season, colored in order they first appear
+        shown = {
+            year: seasons[year].iloc[show_riders_pos[0] - 1 : show_riders_pos[1]]
+            for year in years
+        }
+        riders = list(dict.fromkeys(r for year in years for r in shown[year].index))
+        cmap = matplotlib.colormaps["tab10"]  # colormap 10 colors long
+        styles = {
+            rider: (cmap(nr % 10), ("-", "-.", ":")[nr // 10 % 3])
+            for nr, rider in enumerate(riders)
+        }
+
+        # as wide as a chart of one season. Margins are fixed, in pixels
+        # (title, tick labels, legend below), instead of a layout engine
+        # measuring every tick label, so the grid is drawn once
+        legend_columns = max(min(len(riders), 6), 1)
+        legend_rows = -(-len(riders) // legend_columns)
+        bottom = 40 + 16 * legend_rows
+        height = 50 + rows * 170 + (rows - 1) * 60 + bottom
+        panel_width = (1000 - 55 - 15 - (columns - 1) * 15) / columns
+        fig = Figure(figsize=(1000 / 72, height / 72))
+        EXPORT_FORMATS[output_format]["canvas"](fig)
+        grid = fig.add_gridspec(
+            rows,
+            columns,
+            left=55 / 1000,
+            right=1 - 15 / 1000,
+            top=1 - 50 / height,
+            bottom=bottom / height,
+            hspace=60 / 170,
+            wspace=15 / panel_width,
         )
+        axes = grid.subplots(sharey=True, squeeze=False).ravel()
+
+        for ax, year in zip(axes, years):
+            df = shown[year]
+            races = np.arange(len(df.columns))
+            positions = df.to_numpy(dtype=float)
+
+            for rider, rider_positions in zip(df.index, positions):
+                color, linestyle = styles[rider]
+                ax.plot(
+                    races,
+                    rider_positions,
+                    color=color,
+                    linestyle=linestyle,
+                    label=rider,
+                )
 
-        # adding small numbers for ground temperature
-        for a, b in zip(x, y_ground_temp):
-            # skip number when NaN (corrupted data)
-            if np.isnan(b):
-                continue
-            plt.text(
-                a,
-                b,
-                b,
-                size=6,
-                color="white",
-                horizontalalignment="center",
-                verticalalignment="center",
+            # markers of all riders of the season at once
+            rider_nrs, race_nrs = np.nonzero(~np.isnan(positions))
+            finished = positions[rider_nrs, race_nrs]
+            colors = [styles[df.index[nr]][0] for nr in rider_nrs]
+            ax.scatter(
+                race_nrs,
+                finished,
+                s=8**2,
+                color=colors,
+                edgecolors=colors,
+                linewidths=1,
+                zorder=2,
+                clip_on=False,
             )
-
-        # adding small numbers for air temperature
-        for c, d in zip(x, y_air_temp):
-            # skip number when NaN (corrupted data)
-            if np.isnan(d):
-                continue
-            plt.text(
-                c,
-                d,
-                d,
-                size=6,
-                color="white",
-                horizontalalignment="center",
-                verticalalignment="center",
+            ax.add_artist(
+                MarkerNumbers(race_nrs, finished, [str(round(y)) for y in finished], 5)
             )
 
-        plt.margins(x=0.1)
-        plt.title("Weather", fontsize=16, pad=10)
-        plt.legend(fontsize=9)
-        plt.xticks(rotation=0, fontsize=8, ha="left")
-        plt.ylabel("Temperature [C]")
-        plt.yticks(fontsize=9)
-        plt.grid(axis="x", alpha=0.3)
+            # title at a fixed place: nothing is drawn above panels
+            ax.set_title(str(year), fontsize=12, y=1)
+            # styled before ticks are made, not each tick after
+            ax.tick_params(axis="x", labelrotation=90, labelsize=6)
+            ax.tick_params(axis="y", labelsize=7)
+            ax.grid(axis="x", alpha=0.3)
+            ax.set_xticks(races, df.columns)
+            ax.margins(x=0.05)
+
+        # shared Y axis: places, in increments of 1
+        axes[0].set_yticks(range(0, 20))
+        axes[0].invert_yaxis()
+        for ax in axes[::columns]:
+            ax.set_ylabel("Place")
+        # empty panels of the last row
+        for ax in axes[len(years) :]:
+            ax.set_visible(False)
+
+        fig.suptitle(f"Riders' standings {years[0]}–{years[-1]}", fontsize=18)
+        fig.legend(
+            [
+                Line2D([], [], marker="o", ms=8, color=color, linestyle=linestyle)
+                for color, linestyle in styles.values()
+            ],
+            riders,
+            loc="lower center",
+            ncols=legend_columns,
+            fontsize=8,
+        )
+
+        save_figure(fig, output_path, output_format, dpi)
+
+
+#
+# key of a rendered chart in ChartCache: normalized parameters plus versions
+# of every season's data the chart is drawn from
+def chart_key(
+    year=2023,
+    show_average_hist_results=False,
+    show_riders_pos=[1, 5],
+    hist_seasons=3,
+    output_format="svg",
+    dpi=72,
+    weather_performance=None,  # version of analysis shown, None: weather
+    compare_to=None,  # last season of a comparison grid, None: one season
+) -> str:
+    if output_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    dpi = int(dpi) if EXPORT_FORMATS[output_format]["extension"] != "svg" else None
+
+    if compare_to is not None and compare_to != year:
+        # standings only, no history nor weather
+        seasons = compared_seasons(year, compare_to)
+        return ChartCache.key(
+            compare=[seasons[0], seasons[-1]],
+            riders=sorted(int(pos) for pos in show_riders_pos),
+            format=output_format,
+            dpi=dpi,
+            data={s: GatheringReasultsFrom(s).served_version() for s in seasons},
+        )
 
-        plt.savefig("charts_app/media/charts_app/plot.svg")
-        # plt.show()
+    show_average_hist_results = (
+        bool(show_average_hist_results) and year >= MIN_YEAR + hist_seasons
+    )
+    seasons = [year]
+    if show_average_hist_results:
+        seasons += range(year - hist_seasons, year)
 
+    return ChartCache.key(
+        year=year,
+        hist=show_average_hist_results,
+        hist_seasons=hist_seasons if show_average_hist_results else None,
+        riders=sorted(int(pos) for pos in show_riders_pos),
+        format=output_format,
+        dpi=dpi,
+        weather_performance=weather_performance,
+        data={s: GatheringReasultsFrom(s).served_version() for s in seasons},
+    )
 
-def plot_chart(year=2023, show_average_hist_results=False, show_riders_pos=[1, 5]):
 
-    MIN_YEAR = 2004  # earlier data are corrupted
+def gather_chart_data(
+    year=2023, show_average_hist_results=False, hist_seasons=3, progress=None
+) -> tuple:
+    # standings, historical averages (empty when not shown) and typed weather
+    # of a chart
+    if progress is None:
+        progress = lambda stage: None
 
     if year < MIN_YEAR:
         raise ValueError("Year must be >= 2004")
 
     # do not plot historic data out of safe range
-    if year < MIN_YEAR + 3:
+    if year < MIN_YEAR + hist_seasons:
         show_average_hist_results = False
 
     # gathering weather data
-    weather = GatheringReasultsFrom(year).weather()
+    progress("weather")
+    with metrics.stage("weather"):
+        weather = GatheringReasultsFrom(year).weather_table()
 
     # gathering riders standings
-    results = GatheringReasultsFrom(year).riders()
-    results = Cleaning(results)
+    progress("riders")
+    with metrics.stage("riders"):
+        results = GatheringReasultsFrom(year).standings()
 
-    if year >= MIN_YEAR + 3 and show_average_hist_results:
+    if year >= MIN_YEAR + hist_seasons and show_average_hist_results:
         # gathering historical riders standings
-        results_hist_avrg = GatheringReasultsFrom(year).history(results)
+        progress("history")
+        with metrics.stage("history"):
+            results_hist_avrg = GatheringReasultsFrom(year).history(
+                results, seasons=hist_seasons
+            )
     else:
-        results_hist_avrg = pd.DataFrame  # empty dataframe
+        results_hist_avrg = pd.DataFrame()  # empty dataframe
 
-    # plotting
-    Plotting(
-        df=results,
-        weather=weather,
-        year=year,
-        show_riders_pos=show_riders_pos,
-        df_hist=results_hist_avrg,
+    return results, results_hist_avrg, weather
+
+
+def compared_seasons(year: int, compare_to: int) -> list:
+    # years of a comparison grid, from the earlier to the later one
+    first, last = sorted((int(year), int(compare_to)))
+    if first < MIN_YEAR or last > CURRENT_YEAR:
+        raise ValueError(f"Seasons must be between {MIN_YEAR} and {CURRENT_YEAR}")
+    if last - first + 1 > MAX_COMPARED_SEASONS:
+        raise ValueError(f"At most {MAX_COMPARED_SEASONS} seasons can be compared")
+    return list(range(first, last + 1))
+
+
+def gather_seasons(years) -> dict:
+    #
+    # cleaned standings of several seasons at once, {year: standings}.
+    # Seasons are loaded (memoized, from season store or cache files) and
+    # cleaned in parallel threads, as reading files and most of pandas
+    # release the GIL
+    with ThreadPoolExecutor(
+        max_workers=min(len(years), SEASON_WORKERS), thread_name_prefix="season"
+    ) as executor:
+        standings = executor.map(
+            lambda year: GatheringReasultsFrom(year).standings(), years
+        )
+        return dict(zip(years, standings))
+
+
+def chart_data(
+    year=2023,
+    show_average_hist_results=False,
+    show_riders_pos=[1, 5],
+    hist_seasons=3,
+    weather_performance=None,  # riders' weather performance, shown instead
+) -> dict:
+    #
+    # data plot_chart draws, for charts drawn by the browser instead;
+    # NaN (unfinished race, corrupted data) as None, so it's valid JSON
+    def values(row) -> list:
+        return [None if np.isnan(value) else float(value) for value in row]
+
+    results, results_hist_avrg, weather = gather_chart_data(
+        year, show_average_hist_results, hist_seasons
+    )
+    riders = results.index[show_riders_pos[0] - 1 : show_riders_pos[1]]
+    x, y_air_temp, y_ground_temp = weather_series(weather)
+    if weather_performance is not None and not weather_performance.empty:
+        performance = weather_performance.reindex(riders)
+    else:
+        performance = None
+
+    return {
+        "year": year,
+        "races": results.columns.tolist(),
+        "riders": [
+            {
+                "position": position,
+                "name": rider,
+                "results": values(results.loc[rider]),
+                "history": (
+                    values(results_hist_avrg.loc[rider])
+                    if not results_hist_avrg.empty
+                    else None
+                ),
+            }
+            for position, rider in enumerate(riders, start=show_riders_pos[0])
+        ],
+        "weather": {
+            "labels": x,
+            "air_temp": values(y_air_temp),
+            "ground_temp": values(y_ground_temp),
+        },
+        "weather_performance": (
+            {
+                column: values(performance[column])
+                for column in ("mean_dry", "mean_wet", "temp_slope")
+            }
+            if performance is not None
+            else None
+        ),
+    }
+
+
+def plot_chart(
+    year=2023,
+    show_average_hist_results=False,
+    show_riders_pos=[1, 5],
+    hist_seasons=3,
+    output_path=MEDIA_PATH / "plot.svg",
+    progress=None,  # called with name of each stage, e.g. to report it
+    output_format="svg",
+    dpi=72,
+    weather_performance=None,  # riders' weather performance, shown instead
+    compare_to=None,  # last season of a comparison grid, None: one season
+):
+    if progress is None:
+        progress = lambda stage: None
+
+    if compare_to is not None and compare_to != year:
+        # standings of all seasons in one grid
+        progress("riders")
+        with metrics.stage("riders"):
+            seasons = gather_seasons(compared_seasons(year, compare_to))
+
+        progress("plotting")
+        with metrics.stage("plotting"):
+            ComparisonPlotting(
+                seasons,
+                show_riders_pos=show_riders_pos,
+                output_path=output_path,
+                output_format=output_format,
+                dpi=int(dpi),
+            )
+        return
+
+    results, results_hist_avrg, weather = gather_chart_data(
+        year, show_average_hist_results, hist_seasons, progress
     )
 
+    # plotting
+    progress("plotting")
+    with metrics.stage("plotting"):
+        Plotting(
+            df=results,
+            weather=weather,
+            year=year,
+            show_riders_pos=show_riders_pos,
+            df_hist=results_hist_avrg,
+            output_path=output_path,
+            output_format=output_format,
+            dpi=int(dpi),
+            df_weather_performance=(
+                weather_performance
+                if weather_performance is not None
+                else pd.DataFrame()
+            ),
+        )
+
 
 if __name__ == "__main__":
     plot_chart()
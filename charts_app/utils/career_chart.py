@@ -0,0 +1,84 @@
+import matplotlib
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+from charts_app.utils.MotoGP_utils import EXPORT_FORMATS, save_figure
+from charts_app.utils.results_index import ResultsIndex
+
+
+class CareerPlotting:
+    def __new__(
+        cls,
+        career: pd.DataFrame,
+        rider: str,
+        output_path,
+        output_format="svg",  # one of EXPORT_FORMATS
+        dpi=72,  # raster formats only
+    ) -> None:
+        #
+        # career: rider's finishes (season, race, position), as given by
+        # ResultsIndex.career()
+        fig = Figure(figsize=(1000 / 72, 600 / 72), layout="tight")
+        EXPORT_FORMATS[output_format]["canvas"](fig)
+        ax_finishes, ax_seasons = fig.subplots(
+            2, 1, gridspec_kw={"height_ratios": [3, 1]}
+        )
+
+        cmap = matplotlib.colormaps["tab10"]
+        x = np.arange(len(career))
+        seasons = career.groupby("season", sort=True)["position"]
+
+        # 1. first plot:
+        # every race of the career, colored by season, with season's mean
+        ax = ax_finishes
+        for nr, (season, positions) in enumerate(seasons):
+            color = cmap(nr % 10)
+            season_x = x[career["season"].to_numpy() == season]
+            ax.plot(season_x, positions, marker="o", ms=4, linestyle="", color=color)
+            if positions.notna().any():
+                ax.hlines(
+                    positions.mean(),
+                    season_x[0],
+                    season_x[-1],
+                    color=color,
+                    linewidth=2,
+                    alpha=0.6,
+                )
+
+        starts = [x[career["season"].to_numpy() == s][0] for s in seasons.groups]
+        ax.set_xticks(starts, [str(s) for s in seasons.groups])
+        ax.set_title(f"{rider}: career", fontsize=22, pad=10)
+        ax.tick_params(axis="x", labelrotation=30, labelsize=9)
+        ax.set_ylabel("Place")
+        ax.tick_params(axis="y", labelsize=9)
+        ax.grid(axis="x", alpha=0.3)
+        ax.set_yticks(range(0, 25, 2))
+        ax.invert_yaxis()
+        ax.margins(x=0.02)
+
+        # 2. second plot:
+        # races started and finished per season
+        ax = ax_seasons
+        years = list(seasons.groups)
+        ax.bar(years, seasons.size(), color="lightslategrey", label="races")
+        ax.bar(years, seasons.count(), color="deepskyblue", label="finished")
+        ax.set_title("Seasons", fontsize=16, pad=10)
+        ax.legend(fontsize=9)
+        ax.set_xticks(years, [str(year) for year in years])
+        ax.tick_params(axis="x", labelrotation=30, labelsize=8)
+        ax.tick_params(axis="y", labelsize=9)
+
+        save_figure(fig, output_path, output_format, dpi)
+
+
+def plot_career(
+    rider: str, output_path, output_format="svg", dpi=72, index=None
+) -> None:
+    # career chart of a rider from the results index
+    index = index or ResultsIndex.default()
+    career = index.career(rider)
+    if career is None:
+        raise ValueError(f"No rider {rider} in cached seasons")
+
+    CareerPlotting(career, rider, output_path, output_format, int(dpi))
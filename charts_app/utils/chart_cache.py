@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+
+from charts_app.utils.metrics import metrics
+from charts_app.utils.shared_cache import get_or_set_locked, shared_get
+
+MEDIA_PATH = Path(__file__).resolve().parent.parent / "media" / "charts_app"
+CHARTS_DIR = "charts"
+
+# how long a rendered chart is kept in the shared cache, for other workers
+SHARED_CHART_TIMEOUT = 60 * 60
+
+
+# Rendered charts, stored under a name derived from the chart's parameters
+# and the version of the data it was drawn from. Least recently used charts
+# are removed when there are too many of them or they take too much space.
+# Charts are also shared with other workers through the Django cache, for
+# a while only (shared_timeout), so what's evicted here doesn't stay there.
+# Each chart is stored with its format's extension (svg by default).
+class ChartCache:
+    def __init__(
+        self,
+        path=MEDIA_PATH,
+        max_entries: int = 200,
+        max_bytes: int = 50 * 1024 * 1024,
+        extension: str = "svg",
+        shared_timeout: float = SHARED_CHART_TIMEOUT,
+    ):
+        self.media_path = Path(path)
+        self.path = self.media_path / CHARTS_DIR
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.shared_timeout = shared_timeout
+
+    @staticmethod
+    def key(**params) -> str:
+        # same parameters (in any order) give the same key
+        normalized = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(normalized.encode()).hexdigest()[:32]
+
+    def _file_name(self, key: str, extension=None) -> str:
+        return f"{key}.{extension or self.extension}"
+
+    def _file(self, key: str, extension=None) -> Path:
+        return self.path / self._file_name(key, extension)
+
+    def _media_name(self, name: str) -> str:
+        # file name relative to MEDIA_URL
+        return f"{CHARTS_DIR}/{name}"
+
+    def get(self, key: str, extension=None):
+        # media name of a cached chart, or None
+        name = self._file_name(key, extension)
+        try:
+            # mark as recently used
+            os.utime(self.path / name)
+        except FileNotFoundError:
+            # rendered by other worker/server?
+            content = shared_get(f"chart:{name}")
+            metrics.cache("render_shared", content is not None)
+            if content is None:
+                metrics.cache("render", False)
+                return None
+            self._write(name, content)
+        metrics.cache("render", True)
+        return self._media_name(name)
+
+    def put(self, key: str, render, extension=None) -> str:
+        # render(path) has to write the chart to a given path. Chart is
+        # rendered once by any of the workers sharing the Django cache.
+        name = self._file_name(key, extension)
+        content = get_or_set_locked(
+            f"chart:{name}",
+            lambda: self._render(name, render),
+            timeout=self.shared_timeout,
+        )
+        self._write(name, content)
+
+        self.evict()
+        return self._media_name(name)
+
+    def _tmp_file(self, name: str) -> Path:
+        # unique temporary name, so concurrent renders don't overwrite each other
+        key, extension = name.rsplit(".", 1)
+        return self.path / f".{key}.{uuid.uuid4().hex}.{extension}"
+
+    def _render(self, name: str, render) -> bytes:
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        tmp_file = self._tmp_file(name)
+        try:
+            render(tmp_file)
+            return tmp_file.read_bytes()
+        finally:
+            tmp_file.unlink(missing_ok=True)
+
+    def _write(self, name: str, content: bytes):
+        # replacing is atomic, so a half written chart is never served
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_file = self._tmp_file(name)
+        tmp_file.write_bytes(content)
+        os.replace(tmp_file, self.path / name)
+
+    def evict(self):
+        # charts of all formats share the limits
+        charts = []
+        for file in self.path.glob("*.*"):
+            if file.name.startswith("."):  # still being rendered
+                continue
+            try:
+                stat = file.stat()
+            except FileNotFoundError:  # removed by other process
+                continue
+            charts.append((stat.st_mtime_ns, stat.st_size, file))
+
+        # newest first
+        charts.sort(reverse=True)
+
+        total_bytes = 0
+        for nr, (_, size, file) in enumerate(charts):
+            total_bytes += size
+            # the newest chart is always kept
+            if nr and (nr >= self.max_entries or total_bytes > self.max_bytes):
+                file.unlink(missing_ok=True)
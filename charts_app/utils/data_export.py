@@ -0,0 +1,84 @@
+import hashlib
+
+import pandas as pd
+
+from charts_app.utils.MotoGP_utils import MIN_YEAR, GatheringReasultsFrom
+
+# data of a season available for export
+PARTS = ("standings", "history", "weather")
+
+
+def parse_range(value, size: int) -> slice:
+    # "3-7" (1-based, inclusive), "3" or empty (everything) as a slice;
+    # values in wrong order are swapped, like in the chart's form
+    if not value:
+        return slice(0, size)
+    first, _, last = str(value).partition("-")
+    try:
+        first, last = int(first), int(last or first)
+    except ValueError:
+        raise ValueError(f"Range must be like 1-5: {value}")
+    if first < 1 or last < 1:
+        raise ValueError(f"Range must start at 1: {value}")
+    first, last = sorted([first, last])
+    return slice(first - 1, last)
+
+
+def seasons_of(year: int, part: str, hist_seasons: int = 3) -> list:
+    # seasons the part is computed from
+    if part == "history":
+        return [year, *range(year - hist_seasons, year)]
+    return [year]
+
+
+def data_version(year: int, part: str, hist_seasons: int = 3) -> str:
+    # version of cached data the part is computed from (as served, so it
+    # changes when data is due to be checked); None when some of it isn't
+    # gathered yet (the version will change once it is)
+    versions = [
+        GatheringReasultsFrom(season).served_version()
+        for season in seasons_of(year, part, hist_seasons)
+    ]
+    if any("missing" in version for version in versions):
+        return None
+    return hashlib.sha1(f"{part}:{','.join(versions)}".encode()).hexdigest()[:16]
+
+
+def season_frame(
+    year: int, part: str, riders=None, races=None, hist_seasons: int = 3
+) -> pd.DataFrame:
+    #
+    # standings and history: riders (in standings order) x races;
+    # weather: races x conditions. 'riders' and 'races' are ranges
+    # of positions and race numbers, e.g. "1-5".
+    if part not in PARTS:
+        raise ValueError(f"Unknown data: {part}")
+    if year < MIN_YEAR:
+        raise ValueError(f"Year must be >= {MIN_YEAR}")
+
+    season = GatheringReasultsFrom(year)
+
+    if part == "weather":
+        df = pd.DataFrame.from_dict(season.weather(), orient="index")
+        df.index.name = "race"
+        return df.iloc[parse_range(races, len(df))]
+
+    df = season.standings()
+    if part == "history":
+        if year < MIN_YEAR + hist_seasons:
+            raise ValueError(f"No {hist_seasons} seasons before {year}")
+        df = season.history(df, seasons=hist_seasons)
+
+    df.index.name = "rider"
+    return df.iloc[parse_range(riders, len(df)), parse_range(races, df.shape[1])]
+
+
+def columnar(df: pd.DataFrame) -> dict:
+    # compact JSON: labels once, then one array per column; NaN as null
+    values = df.astype(object).where(df.notna(), None)
+    return {
+        "index_name": df.index.name,
+        "index": df.index.tolist(),
+        "columns": df.columns.tolist(),
+        "data": [values.iloc[:, i].tolist() for i in range(df.shape[1])],
+    }
@@ -0,0 +1,4 @@
+# Resolutions charts can be saved at in raster formats, kept apart from
+# matplotlib (MotoGP_utils.EXPORT_FORMATS), so the form offers them
+# without importing it
+RASTER_DPIS = (72, 144, 216)  # 1x, 2x and 3x of 1000 x 600 px
@@ -0,0 +1,49 @@
+import copy
+import threading
+from collections import OrderedDict
+
+
+# Process-wide, size-bounded memo of least recently used values, e.g.
+# cleaned seasons shared by all requests. Callers always get a copy, so
+# they can modify it (inplace=True) without changing the memoized value.
+class LRUMemo:
+    def __init__(self, max_entries: int = 32, copy_value=copy.deepcopy):
+        self.max_entries = max_entries
+        self.copy_value = copy_value
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        # memoized value of a key, or computed by compute() and memoized
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self.copy_value(self._entries[key])
+            self.misses += 1
+
+        # computed outside the lock, so other keys aren't blocked meanwhile
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return self.copy_value(value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
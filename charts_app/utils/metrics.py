@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger("charts_app.metrics")
+
+# upper bounds of histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# help texts of exported metrics, also their order
+HELP = {
+    "motogp_stage_seconds": "Time spent in a stage of chart pipeline",
+    "motogp_upstream_seconds": "Latency of requests to upstream services",
+    "motogp_cache_total": "Cache lookups by layer and result",
+}
+
+_DISABLED = nullcontext()
+
+
+# Process-wide timings and counters of the chart pipeline: stages (scrape,
+# API crawl, cleaning, history, plotting...), cache hits and misses of
+# riders/weather/render layers and upstream request latencies. Logged to
+# "charts_app.metrics" (DEBUG) and exported in Prometheus text format.
+# When disabled (CHARTS_METRICS=0), stage() and timer() return a shared
+# no-op context and nothing is recorded. Worker processes of RenderPool
+# keep their own metrics, which aren't exported.
+class Metrics:
+    def __init__(self, enabled: bool = True, buckets=BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._counters = defaultdict(float)
+            # {(name, labels): [count per bucket..., count, sum]}
+            self._histograms = {}
+
+    @staticmethod
+    def _labels(labels: dict) -> tuple:
+        return tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name, self._labels(labels)] += value
+
+    def observe(self, name: str, seconds: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, self._labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 2)
+            for nr, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[nr] += 1
+            histogram[-2] += 1
+            histogram[-1] += seconds
+
+    def timer(self, name: str, **labels):
+        # context timing its block into a histogram
+        if not self.enabled:
+            return _DISABLED
+        return self._timer(name, labels)
+
+    @contextmanager
+    def _timer(self, name: str, labels: dict):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe(name, seconds, **labels)
+            logger.debug(
+                "%s %s: %.3fs",
+                name,
+                " ".join(f"{k}={v}" for k, v in sorted(labels.items())),
+                seconds,
+            )
+
+    def stage(self, name: str):
+        # context timing a stage of the chart pipeline
+        return self.timer("motogp_stage_seconds", stage=name)
+
+    def upstream(self, service: str):
+        # context timing a request to an upstream service
+        return self.timer("motogp_upstream_seconds", service=service)
+
+    def cache(self, layer: str, hit: bool):
+        self.inc("motogp_cache_total", layer=layer, result="hit" if hit else "miss")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {k: list(v) for k, v in self._histograms.items()},
+            }
+
+    def render(self, gauges=()) -> str:
+        # Prometheus text format; 'gauges' are extra (name, labels, value)
+        def labels_text(labels) -> str:
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+        snapshot = self.snapshot()
+        series = defaultdict(list)
+        kinds = {}
+        for (name, labels), value in sorted(snapshot["counters"].items()):
+            kinds[name] = "counter"
+            series[name].append(f"{name}{labels_text(labels)} {value:g}")
+        for (name, labels), histogram in sorted(snapshot["histograms"].items()):
+            kinds[name] = "histogram"
+            for bound, count in zip([*self.buckets, "+Inf"], histogram[:-1]):
+                bucket_labels = labels_text([*labels, ("le", bound)])
+                series[name].append(f"{name}_bucket{bucket_labels} {count}")
+            series[name].append(f"{name}_sum{labels_text(labels)} {histogram[-1]:g}")
+            series[name].append(f"{name}_count{labels_text(labels)} {histogram[-2]}")
+        for name, labels, value in gauges:
+            kinds.setdefault(name, "gauge")
+            series[name].append(f"{name}{labels_text(self._labels(labels))} {value:g}")
+
+        lines = []
+        names = [name for name in HELP if name in series]
+        for name in names + sorted(series.keys() - set(names)):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {kinds[name]}")
+            lines += series[name]
+        return "\n".join(lines) + "\n"
+
+
+# metrics of this process
+metrics = Metrics(enabled=os.environ.get("CHARTS_METRICS", "1") != "0")
@@ -0,0 +1,144 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, HTTPError, RequestException
+from urllib3.util.retry import Retry
+
+from charts_app.utils.metrics import metrics
+
+# API info: https://github.com/micheleberardi/racingmike_motogp_import
+API_URL = "https://api.motogp.pulselive.com/motogp/v1/results/"
+
+
+# Client of the pulselive results API. Sessions of all events are fetched
+# concurrently through one connection-pooled session; failed requests are
+# retried with exponential backoff. Seasons and categories don't change,
+# so they are fetched once and shared by all years.
+class PulseliveClient:
+    def __init__(
+        self,
+        api_url: str = API_URL,
+        max_workers: int = 8,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: float = 10,
+    ):
+        self.api_url = api_url
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=max_workers, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._seasons = None
+        self._categories = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, endpoint: str, **params):
+        url = f"{self.api_url}{endpoint}"
+        try:
+            with metrics.upstream("pulselive"):
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()  # will rise HTTPError if != 200
+            return response.json()
+
+        except ConnectionError:
+            raise ConnectionError("\nInternet connection Error!")
+        except HTTPError:
+            raise HTTPError(
+                f"\nError connecting to {url} \ncode: {response.status_code}"
+            )
+        except json.JSONDecodeError:
+            raise ValueError(f"\nInvalid JSON response from url {url}")
+        except RequestException as e:
+            raise RequestException(f"\nError during request to {url}: {e}")
+
+    def season_id(self, year: int) -> str:
+        with self._lock:
+            if self._seasons is None:
+                self._seasons = {
+                    item["year"]: item["id"] for item in self.fetch("seasons")
+                }
+        try:
+            return self._seasons[year]
+        except KeyError:
+            raise ValueError(f"\nNo {year} season in results API")
+
+    def category_id(self, season_id: str, name: str = "MotoGP™") -> str:
+        with self._lock:
+            if season_id not in self._categories:
+                self._categories[season_id] = {
+                    item["name"]: item["id"]
+                    for item in self.fetch("categories", seasonUuid=season_id)
+                }
+        try:
+            return self._categories[season_id][name]
+        except KeyError:
+            raise ValueError(f"\nNo {name} category in season {season_id}")
+
+    def events(self, year: int) -> list:
+        # finished race weeks (test weeks have alphanumeric names)
+        all_events = self.fetch(
+            "events", seasonUuid=self.season_id(year), isFinished="true"
+        )
+        return [event for event in all_events if event["short_name"].isalpha()]
+
+    def race_weather(self, event: dict, category_id: str):
+        # weather of event's race, or None if there was no race
+        all_sessions = self.fetch(
+            "sessions", eventUuid=event["id"], categoryUuid=category_id
+        )
+        races_weather = None
+        for session in all_sessions:
+            if session["type"] == "RAC":  # looking for a race session
+                races_weather = {
+                    "track_wet": session["condition"]["track"],
+                    "air_temp": session["condition"]["air"],
+                    "humidity": session["condition"]["humidity"],
+                    "ground_temp": session["condition"]["ground"],
+                    "clouds": session["condition"]["weather"],
+                }
+        return races_weather
+
+    def season_weather(self, year: int, known=()) -> dict:
+        # {event short name: weather} of all finished races, in season order;
+        # sessions of 'known' events are not fetched again
+        category_id = self.category_id(self.season_id(year))
+        events = [
+            event for event in self.events(year) if event["short_name"] not in known
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            all_weather = executor.map(
+                lambda event: self.race_weather(event, category_id), events
+            )
+
+        races_weather = {}
+        for event, weather in zip(events, all_weather):
+            if weather is not None:
+                races_weather[event["short_name"]] = weather
+        return races_weather
+
+
+_default_client = None
+
+
+def default_client() -> PulseliveClient:
+    # one client (and connection pool) per process
+    global _default_client
+    if _default_client is None:
+        _default_client = PulseliveClient()
+    return _default_client
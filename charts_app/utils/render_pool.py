@@ -0,0 +1,42 @@
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+
+# Optional pool of worker processes drawing charts in parallel. Each worker
+# has its own matplotlib state, so N charts can be rendered at once
+# without sharing anything but the cache files.
+class RenderPool:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # workers are started on first use; "spawn" doesn't copy threads
+        # and locks of the (possibly threaded) server process
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def submit(self, output_path, *args, **kwargs) -> Future:
+        # same arguments as plot_chart; imported here, not when the server
+        # starts (workers import it by name anyway)
+        from charts_app.utils.MotoGP_utils import plot_chart
+
+        return self._get_executor().submit(
+            plot_chart, *args, output_path=str(output_path), **kwargs
+        )
+
+    def render(self, output_path, *args, **kwargs):
+        return self.submit(output_path, *args, **kwargs).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,403 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from charts_app.utils import tracks
+from charts_app.utils.MotoGP_utils import (
+    MIN_YEAR,
+    Cleaning,
+    GatheringReasultsFrom,
+    file_version,
+)
+from charts_app.utils.season_store import CURRENT_YEAR
+from charts_app.utils.weather_table import WET
+
+INDEX_PATH = Path(__file__).resolve().parent / "cache" / "results_index"
+INDEX_VERSION = 3
+
+# one record per rider per race of the season; postings files are sorted
+# by rider and by circuit
+POSTINGS_DTYPE = np.dtype(
+    [
+        ("rider", "<i4"),
+        ("circuit", "<i2"),
+        ("season", "<i2"),
+        ("race", "<i2"),
+        ("position", "<f8"),
+        ("entered", "?"),
+    ]
+)
+
+
+# Finishes of every rider in every season, by rider (careers across
+# seasons) and by circuit (all results at a circuit, with its aggregates).
+# Each season is indexed into its own file, tagged with the version of the
+# cached data it was made from; when a season changes only that one is
+# indexed again. Postings of all seasons are then merged into two files,
+# sorted by rider and by circuit, with every rider's and circuit's range
+# (and circuit's aggregates) kept in a JSON index, so a lookup is a single
+# slice of a memory-mapped file.
+#
+# Merged postings and their index are written to a directory of their own
+# and switched to at once by replacing a file naming it (CURRENT), like
+# season store's builds, so postings are always mapped with their index.
+class ResultsIndex:
+    POSTINGS_FILE = "postings.npy"
+    CIRCUIT_POSTINGS_FILE = "circuit_postings.npy"
+    INDEX_FILE = "index.json"
+    CURRENT_FILE = "CURRENT"
+
+    _default = None
+
+    def __init__(self, path=INDEX_PATH):
+        self.path = Path(path)
+        # (stamp of CURRENT, index, postings, circuit postings) of the
+        # loaded build
+        self._build = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "ResultsIndex":
+        # one shared index per process
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def _load(self):
+        #
+        # index and mapped postings (by rider, by circuit) of the current
+        # build, (re)loaded when index was (re)built; None when not built.
+        # Kept in one attribute, replaced at once, so a thread never reads
+        # the index of one build with postings of another
+        build = self._build
+        try:
+            stat = os.stat(self.path / self.CURRENT_FILE)
+            stamp = (stat.st_ino, stat.st_mtime_ns)
+            if build is None or build[0] != stamp:
+                with open(self.path / self.CURRENT_FILE, "r") as file:
+                    build_path = self.path / file.read().strip()
+                with open(build_path / self.INDEX_FILE, "r") as file:
+                    index = json.load(file)
+                if index.get("version") != INDEX_VERSION:
+                    return None
+                build = self._build = (
+                    stamp,
+                    index,
+                    np.load(build_path / self.POSTINGS_FILE, mmap_mode="r"),
+                    np.load(build_path / self.CIRCUIT_POSTINGS_FILE, mmap_mode="r"),
+                )
+        except FileNotFoundError:
+            # not built, or replaced meanwhile (read again next time)
+            self._build = None
+            return None
+        return build[1:]
+
+    def riders(self) -> list:
+        build = self._load()
+        if build is None:
+            return []
+        index, _, _ = build
+        return sorted(index["riders"])
+
+    def seasons(self) -> dict:
+        # {year: version of data it was indexed from}
+        build = self._load()
+        if build is None:
+            return {}
+        index, _, _ = build
+        return {
+            int(year): season["version"] for year, season in index["seasons"].items()
+        }
+
+    @staticmethod
+    def _records(index: dict, records, with_rider: bool = False) -> pd.DataFrame:
+        seasons = index["seasons"]
+        columns = {}
+        if with_rider:
+            rider_ids = index["rider_ids"]
+            columns["rider"] = [rider_ids[rider] for rider in records["rider"]]
+        columns["season"] = records["season"].astype(int)
+        columns["race"] = [
+            seasons[str(season)]["races"][race]
+            for season, race in zip(records["season"], records["race"])
+        ]
+        columns["position"] = np.asarray(records["position"])
+        return pd.DataFrame(columns)
+
+    def career(self, rider: str):
+        # rider's finishes (season, race, position) of races entered, in
+        # season and race order, or None for unknown rider
+        build = self._load()
+        if build is None or rider not in build[0]["riders"]:
+            return None
+        index, postings, _ = build
+        start, stop = index["riders"][rider]
+        records = postings[start:stop]
+        return self._records(index, records[records["entered"]])
+
+    def circuits(self) -> dict:
+        # {circuit: aggregates of all its races}
+        build = self._load()
+        if build is None:
+            return {}
+        index, _, _ = build
+        return {
+            circuit: {k: v for k, v in stats.items() if k != "range"}
+            for circuit, stats in index["circuits"].items()
+        }
+
+    def circuit_results(self, circuit: str, since: int = None):
+        # finishes (rider, season, race, position) of all riders entered
+        # at a circuit, in season and race order, or None for unknown circuit
+        build = self._load()
+        if build is None or circuit not in build[0]["circuits"]:
+            return None
+        index, _, circuit_postings = build
+        start, stop = index["circuits"][circuit]["range"]
+        records = circuit_postings[start:stop]
+        records = records[records["entered"]]
+        if since is not None:
+            # records are sorted by season
+            records = records[np.searchsorted(records["season"], since) :]
+        return self._records(index, records, with_rider=True)
+
+    def _season_file(self, year: int) -> Path:
+        return self.path / f"season-{year}.npy"
+
+    def update(self, versions: dict, standings, weather=None) -> list:
+        #
+        # versions: {year: version of its data}, standings(year): riders
+        # table as cached (not cleaned), weather(year): typed races weather
+        # (optional). Seasons with a new version are indexed again, those
+        # not in 'versions' are dropped. Returns years indexed again.
+        with self._lock:
+            build = self._load()
+            index = build[0] if build is not None else {"seasons": {}}
+            seasons = {
+                year: season
+                for year, season in index["seasons"].items()
+                if int(year) in versions
+            }
+            for year in index["seasons"].keys() - seasons.keys():
+                self._season_file(int(year)).unlink(missing_ok=True)
+            rider_ids = {r: nr for nr, r in enumerate(index.get("rider_ids", []))}
+            circuit_ids = {c: nr for nr, c in enumerate(index.get("circuit_ids", []))}
+
+            changed = [
+                year
+                for year, version in sorted(versions.items())
+                if seasons.get(str(year), {}).get("version") != version
+            ]
+            if not changed and len(seasons) == len(index["seasons"]):
+                return []
+
+            self.path.mkdir(parents=True, exist_ok=True)
+            for year in changed:
+                df, entered = cleaned_with_entries(standings(year))
+                n_riders, n_races = df.shape
+                circuits = tracks.circuit_ids(df.columns, year)
+
+                chunk = np.empty(n_riders * n_races, dtype=POSTINGS_DTYPE)
+                chunk["rider"] = np.repeat(
+                    [rider_ids.setdefault(r, len(rider_ids)) for r in df.index],
+                    n_races,
+                )
+                chunk["circuit"] = np.tile(
+                    [circuit_ids.setdefault(c, len(circuit_ids)) for c in circuits],
+                    n_riders,
+                )
+                chunk["season"] = year
+                chunk["race"] = np.tile(np.arange(n_races), n_riders)
+                chunk["position"] = df.to_numpy(dtype=float).ravel()
+                chunk["entered"] = entered.to_numpy(dtype=bool).ravel()
+
+                self._write(self._season_file(year), lambda f: np.save(f, chunk))
+                seasons[str(year)] = {
+                    "version": versions[year],
+                    "races": [str(race) for race in df.columns],
+                    "weather": season_weather(weather(year), year) if weather else {},
+                }
+
+            chunks = [np.load(self._season_file(int(year))) for year in seasons]
+            if chunks:
+                postings = np.concatenate(chunks)
+            else:
+                postings = np.empty(0, POSTINGS_DTYPE)
+
+            # by rider, then season and race
+            by_rider = postings[
+                np.lexsort((postings["race"], postings["season"], postings["rider"]))
+            ]
+            # by circuit, then season, race and rider
+            by_circuit = postings[
+                np.lexsort(
+                    (
+                        postings["rider"],
+                        postings["race"],
+                        postings["season"],
+                        postings["circuit"],
+                    )
+                )
+            ]
+
+            riders = list(rider_ids)
+            circuits = list(circuit_ids)
+            new_index = {
+                "version": INDEX_VERSION,
+                "seasons": seasons,
+                "rider_ids": riders,
+                "circuit_ids": circuits,
+                "riders": {
+                    riders[i]: [start, stop]
+                    for i, start, stop in ranges(by_rider["rider"])
+                },
+                "circuits": {
+                    circuits[i]: circuit_stats(by_circuit[start:stop], seasons)
+                    | {"range": [start, stop]}
+                    for i, start, stop in ranges(by_circuit["circuit"])
+                },
+            }
+
+            # written to a new directory, then switched to by replacing CURRENT
+            build = f"build-{uuid.uuid4().hex}"
+            (self.path / build).mkdir()
+            np.save(self.path / build / self.POSTINGS_FILE, by_rider)
+            np.save(self.path / build / self.CIRCUIT_POSTINGS_FILE, by_circuit)
+            with open(self.path / build / self.INDEX_FILE, "w") as file:
+                json.dump(new_index, file)
+
+            try:
+                with open(self.path / self.CURRENT_FILE, "r") as file:
+                    previous = file.read().strip()
+            except FileNotFoundError:
+                previous = None
+            self._write(
+                self.path / self.CURRENT_FILE, lambda f: f.write(build.encode())
+            )
+
+            # previous build is kept for readers switching from it just now;
+            # older ones are removed (mapped files stay readable until unmapped)
+            for old_build in self.path.glob("build-*"):
+                if old_build.name not in (build, previous):
+                    shutil.rmtree(old_build, ignore_errors=True)
+            return changed
+
+    @staticmethod
+    def _write(file: Path, write):
+        # replaced at once, so readers never see half of it
+        tmp_file = file.with_name(f".{file.name}.{uuid.uuid4().hex}")
+        with open(tmp_file, "wb") as f:
+            write(f)
+        os.replace(tmp_file, file)
+
+
+def ranges(keys) -> list:
+    # (key, start, stop) of every run of equal keys in a sorted array
+    ids, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    return [
+        (int(i), int(start), int(start + count))
+        for i, start, count in zip(ids, starts, counts)
+    ]
+
+
+def entries(riders: pd.DataFrame) -> pd.DataFrame:
+    #
+    # races every rider entered, from a riders table before Cleaning: races
+    # not finished are marked (Ret, DNS...), races not entered are blank.
+    # Both are NaN once cleaned. Rows and columns as in the table, with
+    # riders who changed team mid season grouped into one row.
+    df = riders.iloc[:-2].set_index("Rider")
+    return df.notna().groupby(level=0, sort=False).any()
+
+
+def cleaned_with_entries(riders: pd.DataFrame) -> tuple:
+    # cleaned standings of a riders table (as cached), and races every
+    # rider entered in the same rows and columns
+    entered = entries(riders)
+    df = Cleaning(riders)
+    return df, entered.reindex(index=df.index, columns=df.columns, fill_value=False)
+
+
+def season_weather(races_weather: np.ndarray, year: int) -> dict:
+    # {circuit: [[air temp, ground temp, wet], ...]} of a season's races,
+    # from typed weather; temperatures None when corrupted
+    by_circuit = {}
+    for race in races_weather:
+        by_circuit.setdefault(tracks.circuit_id(race["race"], year), []).append(
+            [
+                None if np.isnan(race["air_temp"]) else int(race["air_temp"]),
+                None if np.isnan(race["ground_temp"]) else int(race["ground_temp"]),
+                bool(race["track"] == WET),
+            ]
+        )
+    return by_circuit
+
+
+def circuit_stats(records, seasons: dict) -> dict:
+    # aggregates of all results at a circuit: finishes, share of entries
+    # not finished (retired, not started...) and weather ranges. Riders not
+    # entered in a race (e.g. wildcards of other races) are left out.
+    positions = np.asarray(records["position"])[np.asarray(records["entered"])]
+    finished = positions[~np.isnan(positions)]
+    circuit_seasons = sorted(set(records["season"].tolist()))
+    races = set(zip(records["season"].tolist(), records["race"].tolist()))
+
+    circuit = tracks.circuit_id(
+        seasons[str(records["season"][0])]["races"][records["race"][0]],
+        int(records["season"][0]),
+    )
+    weather = [
+        race
+        for year in circuit_seasons
+        for race in seasons[str(year)].get("weather", {}).get(circuit, [])
+    ]
+
+    def temp_range(values) -> list:
+        values = [value for value in values if value is not None]
+        return [min(values), max(values)] if values else None
+
+    return {
+        "name": tracks.CIRCUITS.get(circuit, circuit),
+        "seasons": [circuit_seasons[0], circuit_seasons[-1]],
+        "races": len(races),
+        "entries": len(positions),
+        "mean_position": float(finished.mean()) if len(finished) else None,
+        "median_position": float(np.median(finished)) if len(finished) else None,
+        "dnf_rate": (
+            float(1 - len(finished) / len(positions)) if len(positions) else None
+        ),
+        "air_temp": temp_range(race[0] for race in weather),
+        "ground_temp": temp_range(race[1] for race in weather),
+        "wet_races": sum(race[2] for race in weather),
+    }
+
+
+def season_versions() -> dict:
+    # {year: version of riders and weather data} of all cached seasons
+    versions = {}
+    for year in range(MIN_YEAR, CURRENT_YEAR + 1):
+        gathering = GatheringReasultsFrom(year)
+        if file_version(gathering.cache_files()[0]) != "missing":
+            versions[year] = gathering.data_version()
+    return versions
+
+
+def refresh_results_index(index=None) -> list:
+    #
+    # index of cached seasons; seasons changed since are indexed again,
+    # from their cached files (nothing is scraped)
+    def standings(year: int) -> pd.DataFrame:
+        riders_file = GatheringReasultsFrom(year).cache_files()[0]
+        return pd.read_pickle(riders_file)
+
+    def weather(year: int) -> np.ndarray:
+        return GatheringReasultsFrom(year).weather_table(fetch=False)
+
+    index = index or ResultsIndex.default()
+    return index.update(season_versions(), standings, weather)
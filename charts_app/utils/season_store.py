@@ -0,0 +1,205 @@
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+STORE_PATH = Path(__file__).resolve().parent / "cache" / "season_store"
+STORE_VERSION = 1
+
+# the in-progress season changes after every race, so it's never stored
+CURRENT_YEAR = datetime.now().year
+
+# long format: one record per rider per race of a season
+RESULTS_DTYPE = np.dtype(
+    [("season", "<i2"), ("rider", "<i4"), ("race", "<i2"), ("position", "<f8")]
+)
+
+
+# Consolidated, already cleaned results and weather of all past seasons.
+# Results are kept in a single long-format numpy file (season, rider, race,
+# position) that is memory-mapped, so reading a season is a slice of the map.
+# Riders and races names, offsets of every season and weather live in a small
+# JSON index next to it. Built by "manage.py build_season_store".
+#
+# Every build is written to a directory of its own and switched to at once,
+# by replacing a file naming it (CURRENT), so results are always mapped with
+# the index they were built with. Seasons keep the version of the cached
+# files they were built from, and aren't read once those files change.
+class SeasonStore:
+    RESULTS_FILE = "results.npy"
+    INDEX_FILE = "index.json"
+    CURRENT_FILE = "CURRENT"
+
+    _default = None
+
+    def __init__(self, path=STORE_PATH):
+        self.path = Path(path)
+        # (stamp of CURRENT, index, mapped results) of the loaded build
+        self._build = None
+
+    @classmethod
+    def default(cls) -> "SeasonStore":
+        # one shared store per process
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def _load(self):
+        #
+        # index and mapped results of the current build, (re)loaded when
+        # store was (re)built; None when not built. They're kept in one
+        # attribute, replaced at once, so a thread never reads the index of
+        # one build with results of another
+        build = self._build
+        try:
+            stat = os.stat(self.path / self.CURRENT_FILE)
+            stamp = (stat.st_ino, stat.st_mtime_ns)
+            if build is None or build[0] != stamp:
+                with open(self.path / self.CURRENT_FILE, "r") as file:
+                    build_path = self.path / file.read().strip()
+                with open(build_path / self.INDEX_FILE, "r") as file:
+                    index = json.load(file)
+                if index.get("version") != STORE_VERSION:
+                    return None
+                results = np.load(build_path / self.RESULTS_FILE, mmap_mode="r")
+                build = self._build = (stamp, index, results)
+        except FileNotFoundError:
+            # not built, or replaced meanwhile (read again next time)
+            self._build = None
+            return None
+        return build[1:]
+
+    def seasons(self) -> list:
+        build = self._load()
+        if build is None:
+            return []
+        index, _ = build
+        return sorted(int(year) for year in index["seasons"])
+
+    def results(self, year: int, source=None):
+        # cleaned riders standings of a season, or None if not stored (or
+        # stored from other version of cached riders, 'source')
+        build = self._load()
+        if build is None:
+            return None
+        index, results = build
+        season = index["seasons"].get(str(year))
+        if season is None or "races" not in season:
+            return None
+        if source is not None and season.get("riders_source") != source:
+            return None
+
+        races = season["races"]
+        records = results[season["start"] : season["stop"]]
+
+        # records are stored rider by rider, in standings order
+        positions = records["position"].reshape(-1, len(races))
+        riders = [index["riders"][i] for i in records["rider"][:: len(races)]]
+
+        df = pd.DataFrame(positions, index=riders, columns=races)
+
+        # races that everybody finished were integers before cleaning
+        finished = ~np.isnan(positions).any(axis=0)
+        if finished.any():
+            df = df.astype({race: "int64" for race in df.columns[finished]})
+        return df
+
+    def weather(self, year: int, source=None):
+        # weather of a season's races, or None if not stored (or stored from
+        # other version of cached weather, 'source')
+        build = self._load()
+        if build is None:
+            return None
+        index, _ = build
+        season = index["seasons"].get(str(year))
+        if season is None:
+            return None
+        if source is not None and season.get("weather_source") != source:
+            return None
+        return season.get("weather")
+
+    @classmethod
+    def build(
+        cls, results: dict, weather: dict, path=STORE_PATH, sources=None
+    ) -> "SeasonStore":
+        #
+        # results: {year: cleaned DataFrame}, weather: {year: dict},
+        # sources: {year: {"riders": version, "weather": version}} of cached
+        # files they were made from
+        path = Path(path)
+        sources = sources or {}
+        path.mkdir(parents=True, exist_ok=True)
+
+        riders_ids = {}
+        seasons = {}
+        chunks = []
+        offset = 0
+
+        for year in sorted(set(results) | set(weather)):
+            season = {}
+
+            if year in results:
+                df = results[year]
+                n_riders, n_races = df.shape
+
+                chunk = np.empty(n_riders * n_races, dtype=RESULTS_DTYPE)
+                chunk["season"] = year
+                chunk["rider"] = np.repeat(
+                    [riders_ids.setdefault(r, len(riders_ids)) for r in df.index],
+                    n_races,
+                )
+                chunk["race"] = np.tile(np.arange(n_races), n_riders)
+                chunk["position"] = df.to_numpy(dtype=float).ravel()
+                chunks.append(chunk)
+
+                season.update(
+                    races=[str(race) for race in df.columns],
+                    start=offset,
+                    stop=offset + len(chunk),
+                )
+                offset += len(chunk)
+
+            if year in weather:
+                season["weather"] = weather[year]
+
+            for part, source in sources.get(year, {}).items():
+                season[f"{part}_source"] = source
+
+            seasons[str(year)] = season
+
+        index = {
+            "version": STORE_VERSION,
+            "riders": list(riders_ids),
+            "seasons": seasons,
+        }
+        records = np.concatenate(chunks) if chunks else np.empty(0, RESULTS_DTYPE)
+
+        # written to a new directory, then switched to by replacing CURRENT
+        build = f"build-{uuid.uuid4().hex}"
+        (path / build).mkdir()
+        np.save(path / build / cls.RESULTS_FILE, records)
+        with open(path / build / cls.INDEX_FILE, "w") as file:
+            json.dump(index, file)
+
+        try:
+            with open(path / cls.CURRENT_FILE, "r") as file:
+                previous = file.read().strip()
+        except FileNotFoundError:
+            previous = None
+        tmp_current = path / f"{cls.CURRENT_FILE}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_current, "w") as file:
+            file.write(build)
+        os.replace(tmp_current, path / cls.CURRENT_FILE)
+
+        # previous build is kept for readers switching from it just now;
+        # older ones are removed (mapped files stay readable until unmapped)
+        for old_build in path.glob("build-*"):
+            if old_build.name not in (build, previous):
+                shutil.rmtree(old_build, ignore_errors=True)
+
+        return cls(path)
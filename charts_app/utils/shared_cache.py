@@ -0,0 +1,111 @@
+import contextlib
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.exceptions import ImproperlyConfigured
+
+# prefix of all keys, so the cache can be shared with other apps
+KEY_PREFIX = "motogp"
+
+_MISSING = object()
+
+
+def shared_cache():
+    # Django cache shared by all workers (settings.MOTOGP_CACHE, "default"
+    # if not set); None when used outside of Django
+    if not settings.configured and not os.environ.get("DJANGO_SETTINGS_MODULE"):
+        return None
+    try:
+        return caches[getattr(settings, "MOTOGP_CACHE", "default")]
+    except ImproperlyConfigured:
+        return None
+
+
+def shared_get(key: str, default=None):
+    cache = shared_cache()
+    if cache is None:
+        return default
+    return cache.get(f"{KEY_PREFIX}:{key}", default)
+
+
+def _file_lock(cache: FileBasedCache, lock_key: str, lock_timeout: float):
+    # FileBasedCache.add() is has_key() and then set(), so workers checking
+    # at once would all take the lock; a lock file next to cache's files is
+    # created (O_EXCL) by one of them only
+    os.makedirs(cache._dir, exist_ok=True)
+    lock_file = os.path.join(
+        cache._dir, f"{hashlib.md5(lock_key.encode()).hexdigest()}.lock"
+    )
+    try:
+        fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        # left by a worker killed while holding it
+        try:
+            if time.time() - os.stat(lock_file).st_mtime > lock_timeout:
+                os.unlink(lock_file)
+        except FileNotFoundError:
+            pass
+        return None
+    os.write(fd, str(os.getpid()).encode())
+    os.close(fd)
+
+    def release():
+        # unless broken meanwhile, as held too long
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(lock_file)
+
+    return release
+
+
+def _lock(cache, lock_key: str, lock_timeout: float):
+    # release() of the lock of a key, None when other worker holds it
+    if isinstance(cache, FileBasedCache):
+        return _file_lock(cache, lock_key, lock_timeout)
+    if cache.add(lock_key, os.getpid(), lock_timeout):
+        return lambda: cache.delete(lock_key)
+    return None
+
+
+def get_or_set_locked(
+    key: str, compute, timeout=None, lock_timeout: float = 300, poll: float = 0.2
+):
+    #
+    # cached value of a key, or computed by compute() and cached. While one
+    # worker computes a missing key (e.g. scrapes a season), other workers
+    # wait for its result instead of computing it too (stampede lock).
+    # The lock is cache.add(), atomic in memcached, redis and database
+    # backends, and in local memory per process; with the file based cache
+    # it's a lock file, atomic per host.
+    cache = shared_cache()
+    if cache is None:
+        return compute()
+
+    key = f"{KEY_PREFIX}:{key}"
+    lock_key = f"{key}:lock"
+    deadline = time.monotonic() + lock_timeout
+
+    while True:
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        release = _lock(cache, lock_key, lock_timeout)
+        if release is not None:
+            try:
+                # computed meanwhile by the worker that held the lock
+                value = cache.get(key, _MISSING)
+                if value is _MISSING:
+                    value = compute()
+                    cache.set(key, value, timeout)
+                return value
+            finally:
+                release()
+
+        # lock holder didn't finish in time (e.g. was killed)
+        if time.monotonic() > deadline:
+            return compute()
+        time.sleep(poll)
@@ -0,0 +1,98 @@
+# Canonical circuits of race codes. Wikipedia tables and pulselive events
+# name races by grand prix, not by circuit: the same circuit has several
+# codes (QAT and DOH in 2021, RSM, SMR and EMI) and some codes moved between
+# circuits over the years (GBR, POR).
+
+CIRCUITS = {
+    "losail": "Losail International Circuit",
+    "jerez": "Circuito de Jerez",
+    "le-mans": "Bugatti Circuit, Le Mans",
+    "mugello": "Autodromo Internazionale del Mugello",
+    "catalunya": "Circuit de Barcelona-Catalunya",
+    "assen": "TT Circuit Assen",
+    "sachsenring": "Sachsenring",
+    "donington": "Donington Park",
+    "silverstone": "Silverstone Circuit",
+    "brno": "Automotodrom Brno",
+    "misano": "Misano World Circuit",
+    "aragon": "MotorLand Aragón",
+    "motegi": "Mobility Resort Motegi",
+    "phillip-island": "Phillip Island Grand Prix Circuit",
+    "sepang": "Sepang International Circuit",
+    "valencia": "Circuit Ricardo Tormo",
+    "estoril": "Autódromo do Estoril",
+    "portimao": "Autódromo Internacional do Algarve",
+    "red-bull-ring": "Red Bull Ring",
+    "termas": "Termas de Río Hondo",
+    "cota": "Circuit of the Americas",
+    "laguna-seca": "Laguna Seca",
+    "indianapolis": "Indianapolis Motor Speedway",
+    "shanghai": "Shanghai International Circuit",
+    "istanbul": "Istanbul Park",
+    "jacarepagua": "Autódromo Internacional Nelson Piquet",
+    "welkom": "Phakisa Freeway",
+    "buriram": "Chang International Circuit",
+    "mandalika": "Mandalika International Street Circuit",
+    "buddh": "Buddh International Circuit",
+}
+
+# {race code: circuit}, or {race code: [(first year, last year, circuit)]}
+# for codes used at different circuits (last year None: still used)
+TRACK_CODES = {
+    "QAT": "losail",
+    "DOH": "losail",
+    "SPA": "jerez",
+    "ANC": "jerez",
+    "FRA": "le-mans",
+    "ITA": "mugello",
+    "CAT": "catalunya",
+    "NED": "assen",
+    "GER": "sachsenring",
+    "GBR": [(2004, 2009, "donington"), (2010, None, "silverstone")],
+    "CZE": "brno",
+    "RSM": "misano",
+    "SMR": "misano",
+    "EMI": "misano",
+    "ARA": "aragon",
+    "TER": "aragon",
+    "JPN": "motegi",
+    "AUS": "phillip-island",
+    "MAL": "sepang",
+    "VAL": "valencia",
+    "EUR": [(2020, 2020, "valencia")],
+    "POR": [(2004, 2012, "estoril"), (2020, None, "portimao")],
+    "ALR": "portimao",
+    "AUT": "red-bull-ring",
+    "STY": "red-bull-ring",
+    "ARG": "termas",
+    "AME": "cota",
+    "USA": "laguna-seca",
+    "INP": "indianapolis",
+    "CHN": "shanghai",
+    "TUR": "istanbul",
+    "RIO": "jacarepagua",
+    "RSA": "welkom",
+    "THA": "buriram",
+    "INA": "mandalika",
+    "IND": "buddh",
+}
+
+
+def circuit_id(code, year: int) -> str:
+    # circuit of a race code in a season; codes not in the table are their
+    # own circuit ("code:XYZ"), so they still match the same code
+    circuit = TRACK_CODES.get(str(code))
+    if isinstance(circuit, list):
+        circuit = next(
+            (
+                name
+                for first, last, name in circuit
+                if first <= year and (last is None or year <= last)
+            ),
+            None,
+        )
+    return circuit or f"code:{code}"
+
+
+def circuit_ids(codes, year: int) -> list:
+    return [circuit_id(code, year) for code in codes]
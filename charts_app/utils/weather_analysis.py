@@ -0,0 +1,237 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from charts_app.utils import tracks
+from charts_app.utils.MotoGP_utils import GatheringReasultsFrom
+from charts_app.utils.results_index import cleaned_with_entries, season_versions
+from charts_app.utils.weather_table import DRY, WET
+
+ANALYSIS_FILE = Path(__file__).resolve().parent / "cache" / "weather_performance.pkl"
+ANALYSIS_VERSION = 2
+
+# fewer races than that are too few to tell anything
+MIN_WET_RACES = 3
+MIN_TEMP_RACES = 10
+
+
+def races_weather(year: int, races, weather: np.ndarray) -> pd.DataFrame:
+    #
+    # typed weather of a season's races (as named in standings), all NaN
+    # for races without weather. Standings and weather of a season name
+    # some races differently (SMR and RSM), so races are joined by circuit
+    # and their order at that circuit in the season (two races at Red Bull
+    # Ring).
+    def race_keys(codes) -> pd.MultiIndex:
+        circuits = pd.Series(tracks.circuit_ids(codes, year))
+        return pd.MultiIndex.from_arrays(
+            [circuits, circuits.groupby(circuits).cumcount()]
+        )
+
+    weather_df = pd.DataFrame(weather).drop(columns="race")
+    weather_df.index = race_keys(weather["race"])
+    weather_df = weather_df.reindex(race_keys(races))
+    weather_df.index = pd.Index(races)
+    return weather_df
+
+
+def race_records(
+    year: int, standings: pd.DataFrame, weather: np.ndarray, entered=None
+) -> pd.DataFrame:
+    # long format: one record per rider per race of a season entered (all
+    # races when 'entered', like standings, isn't given), joined with the
+    # race's typed weather
+    races = races_weather(year, standings.columns, weather)
+
+    n_riders, n_races = standings.shape
+    # mixed (Wet-Dry) and unknown conditions are neither
+    wet = races["track"].map({WET: 1.0, DRY: 0.0}).to_numpy(float)
+    records = pd.DataFrame(
+        {
+            "rider": np.repeat(standings.index.to_numpy(), n_races),
+            "season": year,
+            "race": np.tile(standings.columns.astype(str), n_riders),
+            "position": standings.to_numpy(dtype=float).ravel(),
+            "wet": np.tile(wet, n_riders),
+            "air_temp": np.tile(races["air_temp"].to_numpy(float), n_riders),
+            "ground_temp": np.tile(races["ground_temp"].to_numpy(float), n_riders),
+        }
+    )
+    if entered is None:
+        return records
+    return records[entered.to_numpy(dtype=bool).ravel()].reset_index(drop=True)
+
+
+def rider_performance(records: pd.DataFrame) -> pd.DataFrame:
+    #
+    # per rider over all seasons, in one group-by of precomputed columns:
+    # - mean place in dry and wet races and their difference (wet_delta >
+    #   0: rider finishes further back in the wet),
+    # - share of dry and wet races entered that were finished,
+    # - places lost per +10ºC of track temperature in dry races
+    #   (temp_slope): least squares slope of place against track
+    #   temperature, with places taken relative to rider's mean of the
+    #   season, so a season's form doesn't count as temperature.
+    position = records["position"]
+    finished = position.notna()
+    dry = records["wet"] == 0
+    wet = records["wet"] == 1
+
+    season_mean = position.groupby([records["rider"], records["season"]]).transform(
+        "mean"
+    )
+    # dry finished races with known temperature
+    temp = records["ground_temp"].where(dry & finished)
+    relative = (position - season_mean).where(temp.notna())
+
+    sums = (
+        pd.DataFrame(
+            {
+                "races": 1,
+                "dry_races": dry,
+                "wet_races": wet,
+                "dry_finished": dry & finished,
+                "wet_finished": wet & finished,
+                "dry_places": position.where(dry, 0).fillna(0),
+                "wet_places": position.where(wet, 0).fillna(0),
+                "temp_races": temp.notna(),
+                "x": temp.fillna(0),
+                "y": relative.fillna(0),
+                "xx": (temp**2).fillna(0),
+                "xy": (temp * relative).fillna(0),
+            }
+        )
+        .groupby(records["rider"], sort=False)
+        .sum()
+    )
+
+    n = sums["temp_races"]
+    slope = (n * sums["xy"] - sums["x"] * sums["y"]) / (n * sums["xx"] - sums["x"] ** 2)
+    performance = pd.DataFrame(
+        {
+            "races": sums["races"],
+            "dry_races": sums["dry_races"],
+            "wet_races": sums["wet_races"],
+            "mean_dry": sums["dry_places"] / sums["dry_finished"],
+            "mean_wet": sums["wet_places"] / sums["wet_finished"],
+            "finished_dry": sums["dry_finished"] / sums["dry_races"],
+            "finished_wet": sums["wet_finished"] / sums["wet_races"],
+            "temp_races": n,
+            "temp_slope": 10 * slope.where(n >= MIN_TEMP_RACES),
+        }
+    )
+    too_few_wet = sums["wet_finished"] < MIN_WET_RACES
+    performance.loc[too_few_wet, ["mean_wet", "finished_wet"]] = np.nan
+    performance["wet_delta"] = performance["mean_wet"] - performance["mean_dry"]
+    performance.index.name = "rider"
+    return performance.replace([np.inf, -np.inf], np.nan)
+
+
+# Riders' weather performance over all cached seasons, analysed in batch
+# ("manage.py analyze_weather", and after warming up cache) and kept in a
+# file, tagged with version of the data it was analysed from. Analysed
+# again only when one of the seasons changes.
+class WeatherPerformance:
+    _default = None
+
+    def __init__(self, path=ANALYSIS_FILE):
+        self.path = Path(path)
+        self._mtime = None
+        self._analysis = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls) -> "WeatherPerformance":
+        # one shared analysis per process
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def _load(self) -> bool:
+        # (re)load analysis, when it was made again
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._analysis = self._mtime = None
+            return False
+
+        if mtime != self._mtime:
+            analysis = pd.read_pickle(self.path)
+            if analysis.get("version") != ANALYSIS_VERSION:
+                return False
+            self._analysis = analysis
+            self._mtime = mtime
+        return True
+
+    def data_version(self):
+        # version of data analysed, None when not analysed yet
+        if not self._load():
+            return None
+        return self._analysis["data_version"]
+
+    def riders(self, riders=None) -> pd.DataFrame:
+        # performance of given riders (all when None); empty when not
+        # analysed yet, NaN rows for riders without data
+        if not self._load():
+            return pd.DataFrame()
+        performance = self._analysis["riders"]
+        if riders is None:
+            return performance.copy()
+        return performance.reindex(riders)
+
+    def update(self, versions: dict, standings, weather) -> bool:
+        #
+        # versions: {year: version of its data}, standings(year): riders
+        # table as cached (not cleaned), weather(year): typed races weather.
+        # Returns True when analysed again.
+        data_version = hashlib.sha1(
+            json.dumps(sorted(versions.items())).encode()
+        ).hexdigest()
+
+        with self._lock:
+            if self._load() and self._analysis["data_version"] == data_version:
+                return False
+
+            records = []
+            for year in sorted(versions):
+                df, entered = cleaned_with_entries(standings(year))
+                records.append(race_records(year, df, weather(year), entered))
+            if records:
+                performance = rider_performance(pd.concat(records, ignore_index=True))
+            else:
+                performance = pd.DataFrame()
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex}")
+            pd.to_pickle(
+                {
+                    "version": ANALYSIS_VERSION,
+                    "data_version": data_version,
+                    "riders": performance,
+                },
+                tmp_file,
+            )
+            # replaced at once, so readers never see half of it
+            os.replace(tmp_file, self.path)
+            return True
+
+
+def refresh_weather_performance(analysis=None) -> bool:
+    #
+    # analysis of cached seasons, made again when one of them changed since,
+    # from their cached files (nothing is scraped)
+    def standings(year: int) -> pd.DataFrame:
+        riders_file = GatheringReasultsFrom(year).cache_files()[0]
+        return pd.read_pickle(riders_file)
+
+    def weather(year: int) -> np.ndarray:
+        return GatheringReasultsFrom(year).weather_table(fetch=False)
+
+    analysis = analysis or WeatherPerformance.default()
+    return analysis.update(season_versions(), standings, weather)
@@ -0,0 +1,119 @@
+import math
+import os
+import uuid
+
+import numpy as np
+
+# version of typed weather files; files of other versions are made again
+WEATHER_FORMAT_VERSION = 1
+
+# categories of clouds and track conditions, stored as their number in
+# these tuples; -1: missing or unknown
+CLOUDS = (
+    "Clear",
+    "Sunny",
+    "Partly-Cloudy",
+    "Cloudy",
+    "Light-Rain",
+    "Raining",
+    "Heavy-Rain",
+)
+TRACK_CONDITIONS = ("Dry", "Wet", "Wet-Dry")
+DRY, WET, WET_DRY = range(len(TRACK_CONDITIONS))
+
+# short names of clouds on the chart
+CLOUDS_LABELS = {
+    "Heavy-Rain": "Hv-Rain",
+    "Light-Rain": "Lt-Rain",
+    "Partly-Cloudy": "Prt-Cloud",
+}
+
+# one record per race, in season order; NaN for missing or corrupted values
+WEATHER_DTYPE = np.dtype(
+    [
+        ("race", "<U8"),
+        ("air_temp", "<f4"),
+        ("ground_temp", "<f4"),
+        ("humidity", "<f4"),
+        ("clouds", "<i1"),
+        ("track", "<i1"),
+    ]
+)
+
+
+def _numbers(values) -> np.ndarray:
+    # "25º", "52%" -> 25.0, 52.0; NaN when corrupted (e.g. "º")
+    numbers = np.full(len(values), np.nan, dtype="<f4")
+    for nr, value in enumerate(values):
+        try:
+            numbers[nr] = float(str(value)[:-1])
+        except ValueError:
+            pass
+    return numbers
+
+
+def _codes(values, categories) -> np.ndarray:
+    codes = {category: nr for nr, category in enumerate(categories)}
+    return np.array([codes.get(value, -1) for value in values], dtype="<i1")
+
+
+def normalize_weather(races_weather: dict) -> np.ndarray:
+    #
+    # typed weather of a season's races, from weather as fetched
+    # ({race: {"air_temp": "25º", "clouds": "Partly-Cloudy", ...}})
+    races = list(races_weather.values())
+    table = np.empty(len(races), dtype=WEATHER_DTYPE)
+    table["race"] = list(races_weather)
+    for field in ("air_temp", "ground_temp", "humidity"):
+        table[field] = _numbers([race.get(field, "") for race in races])
+    table["clouds"] = _codes([race.get("clouds") for race in races], CLOUDS)
+    table["track"] = _codes([race.get("track_wet") for race in races], TRACK_CONDITIONS)
+    return table
+
+
+def save_weather_table(file, table: np.ndarray, source: str):
+    # saved with the version of weather it was made from ('source');
+    # replaced at once, so readers never see half of it
+    tmp_file = f"{file}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_file, "wb") as f:
+        np.savez(
+            f, version=WEATHER_FORMAT_VERSION, source=np.array(source), races=table
+        )
+    os.replace(tmp_file, file)
+
+
+def load_weather_table(file, source: str):
+    # typed weather made from given version of weather, None when missing,
+    # made from other version or in other format
+    try:
+        with np.load(file) as data:
+            if data["version"] != WEATHER_FORMAT_VERSION or data["source"] != source:
+                return None
+            return data["races"]
+    except (FileNotFoundError, KeyError, ValueError, OSError):
+        return None
+
+
+def weather_labels(table: np.ndarray) -> list:
+    # x axis labels of the chart: race, clouds, humidity, track. Unknown
+    # codes (-1) are the last, empty, names
+    clouds = [CLOUDS_LABELS.get(name, name) for name in CLOUDS] + [""]
+    tracks = list(TRACK_CONDITIONS) + [""]
+    humidity = [
+        "" if math.isnan(value) else f"{value:.0f}"
+        for value in table["humidity"].tolist()
+    ]
+    return [
+        f"{race}\n{clouds[cloud]}\n{humidity}%\n{tracks[track]}"
+        for race, cloud, humidity, track in zip(
+            table["race"].tolist(),
+            table["clouds"].tolist(),
+            humidity,
+            table["track"].tolist(),
+        )
+    ]
+
+
+def label(code, categories) -> str:
+    # category of a code, "" when unknown
+    return categories[code] if 0 <= code < len(categories) else ""
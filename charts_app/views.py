@@ -1,13 +1,91 @@
+import asyncio
+import json
+import sys
 from datetime import datetime
 
+from asgiref.sync import sync_to_async
 from django import forms
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.conf import settings
-from charts_app.utils.MotoGP_utils import plot_chart
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_safe
+from charts_app.jobs import JOB_TIMEOUT, ChartJobs
+from charts_app.utils.chart_cache import ChartCache
+from charts_app.utils.formats import RASTER_DPIS
+from charts_app.utils.metrics import metrics
+from charts_app.utils.render_pool import RenderPool
+from charts_app.utils.shared_cache import get_or_set_locked
+
+# Charts and data are made with matplotlib, pandas and numpy (and scraped
+# with requests and lxml), imported on first use: a worker starts and shows
+# the form without them. CHARTS_PRELOAD imports them when the server starts
+# instead (charts_app.preload).
 
 CURRENT_YEAR = datetime.now().year
 MIN_YEAR = 2004  # earlier data incomplete or corrupted
 
+# rendered charts, shared by all requests
+chart_cache = ChartCache()
+
+# optional pool of processes drawing charts
+if settings.CHARTS_RENDER_WORKERS:
+    render_pool = RenderPool(settings.CHARTS_RENDER_WORKERS)
+else:
+    render_pool = None
+
+
+# charts rendered in background (async mode)
+chart_jobs = ChartJobs(settings.CHARTS_JOB_WORKERS)
+
+
+def plot_chart(*args, **kwargs):
+    from charts_app.utils.MotoGP_utils import plot_chart
+
+    return plot_chart(*args, **kwargs)
+
+
+def chart_data(*args, **kwargs):
+    from charts_app.utils.MotoGP_utils import chart_data
+
+    return chart_data(*args, **kwargs)
+
+
+def chart_key(*args, **kwargs):
+    from charts_app.utils.MotoGP_utils import chart_key
+
+    return chart_key(*args, **kwargs)
+
+
+def render_chart(output_path, *args, progress=None, **kwargs):
+    # same arguments as plot_chart
+    if render_pool is None:
+        plot_chart(*args, output_path=output_path, progress=progress, **kwargs)
+    else:
+        # stages aren't reported from other processes
+        if progress is not None:
+            progress("plotting")
+        render_pool.render(output_path, *args, **kwargs)
+
+
+def media_url(chart_file: str) -> str:
+    return f"/{settings.MEDIA_URL.lstrip('/')}{chart_file}"
+
+
+def job_state(job: dict) -> dict:
+    # job as reported to the client
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "chart_url": media_url(job["chart_file"]) if job["chart_file"] else None,
+        "error": job["error"],
+        "status_url": reverse("job_status", args=[job["id"]]),
+        "events_url": reverse("job_events", args=[job["id"]]),
+    }
+
 
 class ParametersForm(forms.Form):
 
@@ -20,6 +98,16 @@ class ParametersForm(forms.Form):
         initial=CURRENT_YEAR,
     )
 
+    # several seasons side by side, from year chosen to this one (either
+    # earlier or later)
+    compare_to = forms.TypedChoiceField(
+        label="Compare seasons up to",
+        choices=[("", "–")] + years_list,
+        coerce=int,
+        empty_value=None,
+        required=False,
+    )
+
     # checkbox
     hist_results = forms.BooleanField(
         label="Show average prev. 3 years results",
@@ -27,6 +115,12 @@ class ParametersForm(forms.Form):
         required=False,
     )
 
+    # riders' wet/dry and temperature performance instead of weather
+    weather_performance = forms.BooleanField(
+        label="Show riders' performance in wet, dry and heat",
+        required=False,
+    )
+
     # riders to show
     places_from = forms.IntegerField(
         label="Show places from",
@@ -46,6 +140,35 @@ class ParametersForm(forms.Form):
         initial=5,
     )
 
+    # format of chart drawn by the server
+    output_format = forms.ChoiceField(
+        label="Format",
+        choices=[
+            ("svg", "SVG"),
+            ("svg-min", "SVG (optimized)"),
+            ("png", "PNG"),
+            ("webp", "WebP"),
+        ],
+        initial="svg",
+        required=False,
+    )
+
+    dpi = forms.TypedChoiceField(
+        label="Resolution",
+        choices=[(dpi, f"{dpi // 72}x") for dpi in RASTER_DPIS],
+        coerce=int,
+        initial=72,
+        required=False,
+    )
+
+    # chart drawn by the server (image) or by the browser (from data)
+    render_mode = forms.ChoiceField(
+        label="Draw chart",
+        choices=[("server", "as image"), ("client", "in browser")],
+        initial=settings.CHARTS_RENDER_MODE,
+        required=False,
+    )
+
 
 def index(request):
 
@@ -74,10 +197,104 @@ def index(request):
         else:
             show_riders_pos = [places_to, places_from]
 
+        # riders' weather performance (analysis of all cached seasons, made
+        # in batch by "manage.py analyze_weather") instead of weather of the
+        # season; weather is shown while it's not analysed yet
+        weather_performance = weather_performance_version = None
+        if request.POST.get("weather_performance"):
+            from charts_app.utils.weather_analysis import WeatherPerformance
+
+            analysis = WeatherPerformance.default()
+            weather_performance_version = analysis.data_version()
+            if weather_performance_version is not None:
+                weather_performance = analysis.riders()
+
+        # format of the image (PNG and WebP at chosen resolution)
+        output_format = request.POST.get("output_format") or "svg"
+
         if year in range(MIN_YEAR, CURRENT_YEAR + 1):
 
             try:
-                plot_chart(year, show_average_hist_results, show_riders_pos)
+                dpi = int(request.POST.get("dpi") or 72)
+                if dpi not in RASTER_DPIS:
+                    raise ValueError(f"Resolution must be one of {RASTER_DPIS}")
+
+                # grid of seasons' standings instead of one season
+                if request.POST.get("compare_to"):
+                    compare_to = int(request.POST["compare_to"])
+                else:
+                    compare_to = None
+
+                key = chart_key(
+                    year,
+                    show_average_hist_results,
+                    show_riders_pos,
+                    output_format=output_format,
+                    dpi=dpi,
+                    weather_performance=weather_performance_version,
+                    compare_to=compare_to,
+                )
+
+                # browser draws the chart: only its data is sent, gathered
+                # once per chart key (which includes the data version).
+                # Grids of seasons are drawn by the server only
+                render_mode = request.POST.get("render_mode") or (
+                    settings.CHARTS_RENDER_MODE
+                )
+                if render_mode == "client" and compare_to is None:
+                    data = get_or_set_locked(
+                        f"chart-data:{key}",
+                        lambda: chart_data(
+                            year,
+                            show_average_hist_results,
+                            show_riders_pos,
+                            weather_performance=weather_performance,
+                        ),
+                    )
+                    return render(
+                        request,
+                        "charts_app/index.html",
+                        {
+                            "MEDIA_URL": settings.MEDIA_URL,
+                            "form": ParametersForm(request.POST),
+                            "chart_data": data,
+                        },
+                    )
+
+                # serve chart from cache, plot only when it's not there
+                from charts_app.utils.MotoGP_utils import EXPORT_FORMATS
+
+                extension = EXPORT_FORMATS[output_format]["extension"]
+                chart_file = chart_cache.get(key, extension)
+
+                def render_job(progress=None):
+                    return chart_cache.put(
+                        key,
+                        lambda path: render_chart(
+                            path,
+                            year,
+                            show_average_hist_results,
+                            show_riders_pos,
+                            progress=progress,
+                            output_format=output_format,
+                            dpi=dpi,
+                            weather_performance=weather_performance,
+                            compare_to=compare_to,
+                        ),
+                        extension,
+                    )
+
+                # async mode: chart is rendered in background, client is
+                # given a job to follow
+                if request.POST.get("async"):
+                    if chart_file is not None:
+                        job = chart_jobs.done(chart_file)
+                    else:
+                        job = chart_jobs.submit(key, render_job)
+                    return JsonResponse(job_state(job), status=202)
+
+                if chart_file is None:
+                    chart_file = render_job()
 
                 # render and fill form with entered data
                 return render(
@@ -86,6 +303,7 @@ def index(request):
                     {
                         "MEDIA_URL": settings.MEDIA_URL,
                         "form": ParametersForm(request.POST),
+                        "chart_file": chart_file,
                     },
                 )
             except ValueError:
@@ -107,3 +325,197 @@ def index(request):
             "charts_app/index.html",
             {"MEDIA_URL": settings.MEDIA_URL, "form": ParametersForm()},
         )
+
+
+def job_status(request, job_id):
+    job = chart_jobs.get(job_id)
+    if job is None:
+        raise Http404("No such job")
+    return JsonResponse(job_state(job))
+
+
+async def job_events(request, job_id):
+    # server-sent events with job's state, sent whenever it changes,
+    # until the chart is done or failed
+    job = await sync_to_async(chart_jobs.get)(job_id)
+    if job is None:
+        raise Http404("No such job")
+
+    async def events():
+        last_state = None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + JOB_TIMEOUT
+
+        while loop.time() < deadline:
+            job = await sync_to_async(chart_jobs.get)(job_id)
+            if job is None:
+                break
+
+            state = job_state(job)
+            if state != last_state:
+                yield f"data: {json.dumps(state)}\n\n"
+                last_state = state
+            if job["status"] in ("done", "failed"):
+                break
+
+            await asyncio.sleep(0.25)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@gzip_page
+@require_safe
+def season_data(request, year, part):
+    #
+    # read-only data of a season: ?riders=1-5 (standings positions),
+    # ?races=3-8 (race numbers), ?format=json (default) or csv
+    from charts_app.utils import data_export
+    from charts_app.utils.MotoGP_utils import CURRENT_SEASON_TTL
+
+    if part not in data_export.PARTS:
+        raise Http404("No such data")
+    if year not in range(MIN_YEAR, CURRENT_YEAR + 1):
+        raise Http404("No such data")
+
+    output_format = request.GET.get("format", "json")
+    if output_format not in ("json", "csv"):
+        return JsonResponse({"error": "format must be json or csv"}, status=400)
+    riders, races = request.GET.get("riders"), request.GET.get("races")
+
+    # ETag of the data version and the slice of it, so repeated requests
+    # are answered with 304 without gathering anything
+    def etag():
+        version = data_export.data_version(year, part)
+        if version is None:
+            return None
+        return '"{}"'.format(
+            ChartCache.key(
+                version=version, riders=riders, races=races, format=output_format
+            )
+        )
+
+    response = get_conditional_response(request, etag=etag())
+    if response is not None:
+        return response
+
+    try:
+        df = data_export.season_frame(year, part, riders=riders, races=races)
+    except ValueError as e:
+        return JsonResponse({"error": str(e).strip()}, status=400)
+
+    if output_format == "csv":
+        response = HttpResponse(df.to_csv(), content_type="text/csv; charset=utf-8")
+        response["Content-Disposition"] = f'inline; filename="{year}-{part}.csv"'
+    else:
+        response = JsonResponse(
+            {"season": year, "part": part, **data_export.columnar(df)},
+            json_dumps_params={"separators": (",", ":")},
+        )
+
+    # data has been gathered now, so its version is known
+    tag = etag()
+    if tag is not None:
+        response["ETag"] = tag
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=CURRENT_SEASON_TTL if year == CURRENT_YEAR else 24 * 60 * 60,
+    )
+    return response
+
+
+@require_safe
+def metrics_view(request):
+    # Prometheus metrics of this worker process; seasons are memoized only
+    # once charts are (imported and) drawn
+    gauges = []
+    MotoGP_utils = sys.modules.get("charts_app.utils.MotoGP_utils")
+    if MotoGP_utils is not None:
+        for name, memo in [
+            ("standings", MotoGP_utils.standings_memo),
+            ("weather", MotoGP_utils.weather_memo),
+        ]:
+            for stat, value in memo.stats().items():
+                gauges.append((f"motogp_memo_{stat}", {"memo": name}, value))
+
+    return HttpResponse(
+        metrics.render(gauges), content_type="text/plain; version=0.0.4"
+    )
+
+
+@require_safe
+def rider(request):
+    #
+    # career of a rider (?name=) across all cached seasons: chart, or its
+    # data with ?format=json. Read from the results index, built in batch
+    # ("manage.py index_results"); no riders until it's built
+    from charts_app.utils import data_export
+    from charts_app.utils.career_chart import plot_career
+    from charts_app.utils.results_index import ResultsIndex
+
+    index = ResultsIndex.default()
+    name = request.GET.get("name", "").strip()
+    context = {"riders": index.riders(), "name": name}
+
+    if not name:
+        return render(request, "charts_app/rider.html", context)
+
+    career = index.career(name)
+    if career is None:
+        if request.GET.get("format") == "json":
+            raise Http404("No such rider")
+        context["error_msg"] = f"No rider {name} in cached seasons"
+        return render(request, "charts_app/rider.html", context, status=404)
+
+    if request.GET.get("format") == "json":
+        return JsonResponse(
+            {"rider": name, **data_export.columnar(career.set_index("season"))},
+            json_dumps_params={"separators": (",", ":")},
+        )
+
+    # chart is drawn again only when one of the seasons changed
+    key = ChartCache.key(rider=name, seasons=index.seasons())
+    chart_file = chart_cache.get(key) or chart_cache.put(
+        key, lambda path: plot_career(name, path, index=index)
+    )
+    context["chart_url"] = media_url(chart_file)
+    return render(request, "charts_app/rider.html", context)
+
+
+@require_safe
+def circuits(request):
+    # aggregates of every circuit in cached seasons
+    from charts_app.utils.results_index import ResultsIndex
+
+    index = ResultsIndex.default()
+    return JsonResponse({"circuits": index.circuits()})
+
+
+@gzip_page
+@require_safe
+def circuit(request, circuit):
+    #
+    # aggregates and all riders' finishes at a circuit, e.g. all riders at
+    # Mugello since 2004 (?since=2004)
+    from charts_app.utils import data_export
+    from charts_app.utils.results_index import ResultsIndex
+
+    index = ResultsIndex.default()
+    try:
+        since = int(request.GET["since"]) if request.GET.get("since") else None
+    except ValueError:
+        return JsonResponse({"error": "since must be a year"}, status=400)
+
+    results = index.circuit_results(circuit, since=since)
+    if results is None:
+        raise Http404("No such circuit")
+    return JsonResponse(
+        {
+            "circuit": circuit,
+            **index.circuits()[circuit],
+            "results": data_export.columnar(results.set_index("season")),
+        },
+        json_dumps_params={"separators": (",", ":")},
+    )